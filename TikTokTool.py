@@ -15,38 +15,149 @@ Change Log  :
 2023/08/04 02:09:31 : async download
 2023/12/26 18:01:56 : Switch to f2
 2024/04/05 00:56:22 : Update to 1.6 with f2 0.0.1.5
+2026/10/19 : --profile
+2026/10/19 : platform from argv/env, lazy imports
 -------------------------------------------------
 """
 
-import f2
+import os
 import sys
-import time
-from f2.cli.cli_console import RichConsoleManager as RCManager
+import argparse
 
+# 平台名称，序号与交互菜单一致
+PLATFORMS = ("douyin", "tiktok")
 
-if __name__ == "__main__":
-    RCManager = RCManager()
+# 通过环境变量选择平台，用于批处理任务
+PLATFORM_ENV = "TIKTOK_TOOL_PLATFORM"
 
-    if len(sys.argv) <= 1:
-        RCManager.rich_console.print(
-            "[bold red]请通过命令行启动并提供必要的参数, 输入[bold green] TikTokTool -h [/bold green]查看不同平台帮助。[/bold red]"
-        )
+USAGE = """用法: TikTokTool.py [douyin|tiktok|1|2] [--platform {douyin,tiktok}] [--profile DIR] [f2参数...]
 
-        RCManager.rich_console.print(
-            f"[bold white]F2 Version:{f2.__version__}[/bold white]"
-        )
-        time.sleep(3)
-        sys.exit(1)
+平台可以通过第一个参数、--platform 或环境变量 %s 指定，都没有时在终端中询问。
+指定平台后的参数原样交给 f2，查看各平台的参数:
+  python TikTokTool.py douyin -h
+  python TikTokTool.py tiktok -h
 
-    from f2.apps.douyin.cli import douyin
-    from f2.apps.tiktok.cli import tiktok
+  --platform {douyin,tiktok}   选择平台
+  --profile DIR                性能分析，报告写入指定目录
+  --profile-mode MODE          cprofile 或 sampling，默认cprofile
+  --profile-interval MS        采样间隔(毫秒)，默认5
+""" % PLATFORM_ENV
+
+
+def pop_tool_args(argv):
+    """取出平台和 --profile 相关参数，其余参数原样交给 f2"""
+    # 关闭缩写匹配，避免吞掉 f2 中前缀相同的参数
+    parser = argparse.ArgumentParser(add_help=False, allow_abbrev=False)
+    parser.add_argument("--platform", choices=PLATFORMS)
+    parser.add_argument("--profile", metavar="DIR")
+    parser.add_argument("--profile-mode", default="cprofile")
+    parser.add_argument("--profile-interval", type=float, default=5)
+    args, rest = parser.parse_known_args(argv)
+
+    # 兼容 "TikTokTool.py 1 --vid ..." 这样在第一个参数中选择平台的写法
+    if rest and rest[0] in PLATFORMS + ("1", "2"):
+        selector = rest.pop(0)
+        args.platform = PLATFORMS[int(selector) - 1] if selector.isdigit() else selector
+    return args, rest
+
+
+def resolve_platform(args):
+    """参数优先，其次环境变量，无效的环境变量视为未指定"""
+    if args.platform:
+        return args.platform
+    value = os.environ.get(PLATFORM_ENV, "").strip().lower()
+    if value in ("1", "2"):
+        return PLATFORMS[int(value) - 1]
+    return value if value in PLATFORMS else None
 
-    clis = [douyin, tiktok]
 
-    selected = RCManager.rich_prompt.ask(
+def f2_version():
+    """读取已安装的 f2 版本，不导入 f2"""
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+    except ImportError:
+        # Python 3.7
+        return "未知"
+    try:
+        return version("f2")
+    except PackageNotFoundError:
+        return "未安装"
+
+
+def ask_platform():
+    """在终端中询问平台"""
+    from f2.cli.cli_console import RichConsoleManager as RCManager
+
+    selected = RCManager().rich_prompt.ask(
         "[bold yellow]1.Douyin 2.TikTok:[/bold yellow]",
-        choices=[str(i) for i in range(1, len(clis) + 1)],
+        choices=[str(i) for i in range(1, len(PLATFORMS) + 1)],
     )
+    return PLATFORMS[int(selected) - 1]
+
+
+def load_cli(platform):
+    """只导入选中平台的 f2 命令行"""
+    if platform == "douyin":
+        from f2.apps.douyin.cli import douyin
+
+        return douyin
+    from f2.apps.tiktok.cli import tiktok
+
+    return tiktok
+
+
+def start_profiler(args):
+    # 性能分析模块位于 search/fixed，只在需要时导入
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "search", "fixed"))
+    from profiling import Profiler
+
+    return Profiler(args.profile, args.profile_mode, args.profile_interval).start()
+
+
+def main():
+    tool_args, rest = pop_tool_args(sys.argv[1:])
+    platform = resolve_platform(tool_args)
+    interactive = sys.stdin.isatty()
+
+    if not rest and not platform:
+        print("请通过命令行启动并提供必要的参数, 输入 TikTokTool -h 查看不同平台帮助。", file=sys.stderr)
+        # 双击运行时显示版本并留出阅读提示的时间，批处理中直接退出
+        if interactive:
+            import time
+
+            print(f"F2 Version:{f2_version()}", file=sys.stderr)
+            time.sleep(3)
+        return 1
+
+    if not platform:
+        if "-h" in rest or "--help" in rest:
+            print(USAGE)
+            return 0
+        if not interactive:
+            print(
+                f"未指定平台，请使用 douyin/tiktok 参数、--platform 或环境变量 {PLATFORM_ENV}",
+                file=sys.stderr,
+            )
+            return 2
+
+    profiler = start_profiler(tool_args) if tool_args.profile else None
+    sys.argv = sys.argv[:1] + rest
 
     # 调用相应的 CLI 函数
-    clis[int(selected) - 1]()
+    try:
+        try:
+            cli = load_cli(platform or ask_platform())
+        except ImportError as e:
+            print(f"无法导入f2: {e}，请先安装依赖: pip install -r requirements.txt", file=sys.stderr)
+            return 1
+        cli()
+    finally:
+        # f2 的命令行结束时会调用 sys.exit
+        if profiler:
+            profiler.stop()
+            print(f"性能分析报告已保存到 {tool_args.profile}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
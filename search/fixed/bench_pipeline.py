@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 搜索 → 签名 → 请求 → 解析 → 下载 的端到端性能测试
+              针对本地回放服务运行 DouyinSearcher，按并发数和结果数扫描，输出各阶段耗时、吞吐、峰值内存和CPU，
+              可以与保存的基线比较，某个阶段变慢超过阈值时返回非零
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import resource
+import platform
+import statistics
+import subprocess
+import tempfile
+
+from rich.console import Console
+from rich.table import Table
+
+console = Console()
+
+# 各阶段耗时(秒)，越小越好
+STAGES = ("sign", "fetch", "parse", "search", "download", "total")
+
+# 吞吐指标，越大越好
+RATES = ("items_per_sec", "bytes_per_sec")
+
+# 耗时差小于该值时不算退化，避免毫秒级的抖动
+MIN_DELTA = 0.05
+
+
+def _timed(func, timings, stage):
+    """包装方法，累计耗时"""
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings[stage] += time.perf_counter() - started
+    return wrapper
+
+
+def _timed_iter(func, timings, stage):
+    """包装生成器，只累计生成器内部执行的时间"""
+    def wrapper(*args, **kwargs):
+        iterator = func(*args, **kwargs)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                timings[stage] += time.perf_counter() - started
+                return
+            timings[stage] += time.perf_counter() - started
+            yield item
+    return wrapper
+
+
+def run_once(base_url, count, concurrency, connections):
+    """在子进程中运行一次完整流程，返回指标"""
+    from cdn_hosts import HostScoreboard, host_of
+    from download_pool import DownloadPool
+    from search_douyin import DouyinSearcher
+
+    logging.getLogger('douyin_search').setLevel(logging.ERROR)
+    with tempfile.TemporaryDirectory() as tmp:
+        # download_videos 会在当前目录写 douyin_videos.txt
+        os.chdir(tmp)
+        searcher = DouyinSearcher(
+            use_local_server=True,
+            manifest_path=os.path.join(tmp, "manifest.db"),
+            base_url=base_url,
+            signer_url=base_url,
+            page_delay=(0, 0),
+        )
+        timings = {"sign": 0.0, "parse": 0.0}
+        searcher._generate_signature = _timed(searcher._generate_signature, timings, "sign")
+        searcher._iter_search_page = _timed_iter(searcher._iter_search_page, timings, "parse")
+
+        started = time.perf_counter()
+        videos = searcher.search("bench", max_count=count)
+        search_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        # 与 download_videos 自建的下载池相同，只是评分不写入 host_scores.json，避免回放服务的地址影响实际下载
+        with DownloadPool(
+            concurrency=concurrency,
+            host_overrides={host_of(searcher.base_url): 1},
+            headers={"User-Agent": searcher.headers["User-Agent"]},
+            connections=connections,
+            scoreboard=HostScoreboard(path=None),
+        ) as pool:
+            results = searcher.download_videos(
+                videos,
+                download_dir=os.path.join(tmp, "out"),
+                save_to_file=False,
+                pool=pool,
+            )
+        download_time = time.perf_counter() - started
+
+        nbytes = 0
+        for root, _, files in os.walk(os.path.join(tmp, "out")):
+            nbytes += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+        searcher.manifest.close()
+        os.chdir("/")
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # Linux上ru_maxrss单位为KB，macOS上为字节
+    rss = usage.ru_maxrss if platform.system() == "Darwin" else usage.ru_maxrss * 1024
+    total = search_time + download_time
+    return {
+        "sign": timings["sign"],
+        "fetch": max(0.0, search_time - timings["sign"] - timings["parse"]),
+        "parse": timings["parse"],
+        "search": search_time,
+        "download": download_time,
+        "total": total,
+        "items": len(videos),
+        "failed": sum(1 for r in results if not r["success"]),
+        "bytes": nbytes,
+        "items_per_sec": len(videos) / total if total else 0,
+        "bytes_per_sec": nbytes / download_time if download_time else 0,
+        "peak_rss_mb": rss / 1024 / 1024,
+        "cpu_sec": usage.ru_utime + usage.ru_stime,
+    }
+
+
+def run_config(base_url, count, concurrency, connections, repeat):
+    """每次在新的子进程中运行，峰值内存和CPU互不影响，取中位数"""
+    runs = []
+    for _ in range(repeat):
+        with tempfile.NamedTemporaryFile("r", suffix=".json", delete=False) as f:
+            result_file = f.name
+        try:
+            subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", base_url,
+                 "--child-args", json.dumps([count, concurrency, connections]), "--result-file", result_file],
+                check=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            with open(result_file, "r", encoding="utf-8") as f:
+                runs.append(json.load(f))
+        finally:
+            os.remove(result_file)
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+
+def compare(results, baseline, threshold):
+    """
+    与基线比较
+
+    Returns:
+        list: 退化项 (配置, 指标, 基线值, 当前值)
+    """
+    regressions = []
+    previous = {entry["config"]: entry["metrics"] for entry in baseline.get("results", [])}
+    for entry in results:
+        old = previous.get(entry["config"])
+        if not old:
+            continue
+        new = entry["metrics"]
+        for stage in STAGES:
+            if stage in old and new[stage] > old[stage] * (1 + threshold) and new[stage] - old[stage] > MIN_DELTA:
+                regressions.append((entry["config"], stage, old[stage], new[stage]))
+        for rate in RATES:
+            if old.get(rate) and new[rate] < old[rate] * (1 - threshold):
+                regressions.append((entry["config"], rate, old[rate], new[rate]))
+    return regressions
+
+
+def print_results(results):
+    table = Table(title="端到端性能")
+    columns = ["配置", "签名(s)", "请求(s)", "解析(s)", "下载(s)", "总计(s)",
+               "作品/s", "MB/s", "峰值内存(MB)", "CPU(s)", "失败"]
+    for column in columns:
+        table.add_column(column)
+    for entry in results:
+        m = entry["metrics"]
+        table.add_row(
+            entry["config"], f"{m['sign']:.3f}", f"{m['fetch']:.3f}", f"{m['parse']:.3f}",
+            f"{m['download']:.3f}", f"{m['total']:.3f}", f"{m['items_per_sec']:.1f}",
+            f"{m['bytes_per_sec'] / 1024 / 1024:.1f}", f"{m['peak_rss_mb']:.0f}", f"{m['cpu_sec']:.2f}",
+            str(int(m["failed"]))
+        )
+    console.print(table)
+
+
+def _int_list(text):
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端性能测试")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 4, 8], help="下载并发数列表，默认1,4,8")
+    parser.add_argument("--counts", type=_int_list, default=[20, 50], help="搜索结果数列表，默认20,50")
+    parser.add_argument("--connections", type=int, default=1, help="单个文件的连接数，默认1")
+    parser.add_argument("--repeat", type=int, default=3, help="每个配置的运行次数，取中位数，默认3")
+    parser.add_argument("--media-size", default="1M", help="最高清晰度视频的大小，默认1M")
+    parser.add_argument("--latency", type=float, default=20, help="回放服务每个请求的延迟(毫秒)，默认20")
+    parser.add_argument("--bandwidth", help="回放服务每个响应的带宽上限，如 4M，默认不限速")
+    parser.add_argument("--output", default="bench_pipeline.json", help="结果文件，默认bench_pipeline.json")
+    parser.add_argument("--baseline", help="基线结果文件，指定时进行比较")
+    parser.add_argument("--threshold", type=float, default=0.2, help="允许的退化比例，默认0.2")
+    # 子进程内部使用
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--child-args", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        count, concurrency, connections = json.loads(args.child_args)
+        metrics = run_once(args.child, count, concurrency, connections)
+        with open(args.result_file, "w", encoding="utf-8") as f:
+            json.dump(metrics, f)
+        return 0
+
+    from download_pool import parse_rate
+    from replay_server import ReplayServer
+
+    logging.getLogger('douyin_search').setLevel(logging.ERROR)
+    results = []
+    with ReplayServer(items=max(args.counts), media_size=parse_rate(args.media_size),
+                      latency=args.latency / 1000, bandwidth=args.bandwidth) as server:
+        server.catalog.warm()
+        for count in args.counts:
+            for concurrency in args.concurrency:
+                config = f"n{count}_c{concurrency}"
+                console.print(f"[cyan]运行 {config}...[/cyan]")
+                metrics = run_config(server.base_url, count, concurrency, args.connections, args.repeat)
+                results.append({"config": config, "count": count, "concurrency": concurrency, "metrics": metrics})
+
+    report = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "settings": {
+            "connections": args.connections,
+            "repeat": args.repeat,
+            "media_size": args.media_size,
+            "latency_ms": args.latency,
+            "bandwidth": args.bandwidth,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print_results(results)
+    console.print(f"[bold green]结果已保存到 {args.output}[/bold green]")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if not regressions:
+        console.print(f"[bold green]与基线 {args.baseline} 相比没有超过 {args.threshold:.0%} 的退化[/bold green]")
+        return 0
+    for config, metric, old, new in regressions:
+        console.print(f"[bold red]{config} {metric}: {old:.3f} -> {new:.3f}[/bold red]")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 进度输出的逐条开销测试
+              模拟下载池的逐块更新和搜索结果的逐条打印，比较直接调用rich、节流的rich进度条和无界面的JSON进度行
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import io
+import sys
+import time
+import argparse
+import threading
+
+from rich.console import Console
+from rich.progress import Progress
+from rich.table import Table
+import progress_output
+from progress_output import ThrottledProgress, JsonProgress
+
+console = Console()
+
+
+def _terminal():
+    """渲染到内存中的终端，计入rich的渲染开销但不污染输出"""
+    return Console(file=io.StringIO(), force_terminal=True, width=120)
+
+
+def run_updates(progress, files, chunks, threads):
+    """每个线程下载 files 个文件，每个文件 chunks 次更新，与下载池的调用方式相同"""
+    def worker():
+        for i in range(files):
+            task_id = progress.add_task(f"file {i}", total=chunks)
+            for _ in range(chunks):
+                progress.update(task_id, advance=1)
+                progress.update(total_task, advance=1)
+            progress.remove_task(task_id)
+
+    with progress:
+        # rich 的 add_task 会把多余的参数存入 task.fields
+        total_task = progress.add_task("总进度", total=None, summary=True)
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        started = time.perf_counter()
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        return time.perf_counter() - started
+
+
+def run_listing(items, headless):
+    """逐条打印搜索结果"""
+    videos = [{"desc": f"作品描述 {i} " * 5, "author": f"作者{i}", "like_count": i} for i in range(items)]
+    output = _terminal()
+    started = time.perf_counter()
+    if headless:
+        progress_output.emit("results", count=len(videos))
+    else:
+        for idx, video in enumerate(videos):
+            output.print(f"[{idx+1}] {video['desc'][:50]}... - 作者: {video['author']} - 点赞: {video['like_count']}")
+    return time.perf_counter() - started
+
+
+class _Null:
+    """不显示进度，作为基准"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def add_task(self, description, total=None, summary=False):
+        return 0
+
+    def update(self, task_id, advance=0, total=None, description=None):
+        pass
+
+    def remove_task(self, task_id):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="进度输出开销测试")
+    parser.add_argument("--files", type=int, default=50, help="每个线程的文件数，默认50")
+    parser.add_argument("--chunks", type=int, default=1000, help="每个文件的更新次数，默认1000")
+    parser.add_argument("--threads", type=int, default=4, help="并发线程数，默认4")
+    parser.add_argument("--items", type=int, default=2000, help="逐条打印的搜索结果数，默认2000")
+    args = parser.parse_args()
+
+    progress_output.configure(stream=io.StringIO())
+    updates = args.files * args.chunks * args.threads * 2
+
+    cases = [
+        ("不显示", lambda: _Null()),
+        ("rich Progress 逐次更新", lambda: Progress(console=_terminal())),
+        ("节流的 rich 进度条", lambda: ThrottledProgress(output=_terminal())),
+        ("无界面 JSON 进度行", lambda: JsonProgress("bench", interval=1.0)),
+    ]
+    rows = []
+    for name, factory in cases:
+        elapsed = run_updates(factory(), args.files, args.chunks, args.threads)
+        rows.append((name, elapsed))
+
+    baseline = rows[0][1]
+    table = Table(title=f"进度更新 ({args.threads} 线程，共 {updates} 次)")
+    for column in ["方式", "总耗时(ms)", "每次更新(µs)", "额外开销(µs)"]:
+        table.add_column(column)
+    for name, elapsed in rows:
+        table.add_row(name, f"{elapsed * 1000:.1f}", f"{elapsed / updates * 1e6:.2f}",
+                      f"{(elapsed - baseline) / updates * 1e6:.2f}")
+    console.print(table)
+
+    table = Table(title=f"逐条打印 {args.items} 个搜索结果")
+    for column in ["方式", "总耗时(ms)", "每条(µs)"]:
+        table.add_column(column)
+    for name, headless in (("rich 逐条打印", False), ("无界面 汇总一行", True)):
+        progress_output.configure(headless=headless)
+        elapsed = run_listing(args.items, headless)
+        table.add_row(name, f"{elapsed * 1000:.1f}", f"{elapsed / args.items * 1e6:.2f}")
+    progress_output.configure(headless=False)
+    console.print(table)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 断点续传下载的本地验证与测速
+              启动一个会主动断开连接的本地HTTP服务，验证续传后的文件是否完整，并测量吞吐量
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import sys
+import time
+import random
+import hashlib
+import logging
+import argparse
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from rich.console import Console
+from rich.table import Table
+from range_download import RangeDownloader
+
+console = Console()
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """支持Range的文件服务，每次响应在发送随机字节数后断开连接"""
+
+    payload = b""
+    drop_after = 0
+    disconnects = 0
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        size = len(self.payload)
+        start, end = 0, size - 1
+        status = 200
+
+        range_header = self.headers.get("Range")
+        if range_header and range_header.startswith("bytes="):
+            first, _, last = range_header[6:].partition("-")
+            start = int(first)
+            end = int(last) if last else size - 1
+            status = 206
+
+        body = self.payload[start:end + 1]
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", '"bench"')
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+
+        # 发送一部分后直接断开，模拟网络中断
+        limit = len(body)
+        if self.drop_after:
+            limit = min(limit, random.randint(self.drop_after // 2, self.drop_after))
+        self.wfile.write(body[:limit])
+        if limit < len(body):
+            with self.lock:
+                FlakyHandler.disconnects += 1
+            self.close_connection = True
+            self.connection.shutdown(2)
+
+
+class SimulatedCrash(Exception):
+    """模拟进程在下载中途被杀掉"""
+
+
+class QuietServer(ThreadingHTTPServer):
+    """客户端断开导致的写入错误是预期行为，不打印堆栈"""
+
+    def handle_error(self, request, client_address):
+        pass
+
+
+def start_server(payload, drop_after):
+    FlakyHandler.payload = payload
+    FlakyHandler.drop_after = drop_after
+    server = QuietServer(("127.0.0.1", 0), FlakyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_case(name, url, path, expected, md5, **kwargs):
+    """下载一次并校验内容，返回结果行"""
+    FlakyHandler.disconnects = 0
+    received = [0]
+
+    def on_progress(nbytes):
+        received[0] += nbytes
+
+    downloader = RangeDownloader(max_retries=1000, on_progress=on_progress, **kwargs)
+    started = time.perf_counter()
+    result = downloader.download(url, path, expected_size=len(FlakyHandler.payload), expected_hash=md5)
+    elapsed = time.perf_counter() - started
+
+    with open(path, "rb") as f:
+        ok = hashlib.sha256(f.read()).hexdigest() == expected and result["verified"]
+    os.remove(path)
+    return [name, "通过" if ok else "失败", str(FlakyHandler.disconnects),
+            f"{received[0] / 1024 / 1024:.1f}", f"{result['size'] / 1024 / 1024 / elapsed:.1f}"], ok
+
+
+def run_restart_case(url, path, expected, md5, size):
+    """第一次下载到一半时中止，第二次应从记录的位置继续"""
+    FlakyHandler.disconnects = 0
+    received = [0]
+
+    def crash_halfway(nbytes):
+        received[0] += nbytes
+        if received[0] >= size // 2:
+            raise SimulatedCrash()
+
+    try:
+        RangeDownloader(max_retries=1000, on_progress=crash_halfway).download(url, path)
+    except SimulatedCrash:
+        pass
+
+    first = received[0]
+    received[0] = 0
+    started = time.perf_counter()
+    downloader = RangeDownloader(max_retries=1000, on_progress=lambda n: received.__setitem__(0, received[0] + n))
+    result = downloader.download(url, path, expected_size=size, expected_hash=md5)
+    elapsed = time.perf_counter() - started
+
+    with open(path, "rb") as f:
+        ok = hashlib.sha256(f.read()).hexdigest() == expected and result["resumed"] and result["verified"]
+    # 第二次只应下载剩余部分，允许重下最后一个未保存的检查点
+    ok = ok and received[0] <= size - first + 2 * 1024 * 1024
+    os.remove(path)
+    return ["重启后续传", "通过" if ok else "失败", str(FlakyHandler.disconnects),
+            f"{(first + received[0]) / 1024 / 1024:.1f}", f"{result['size'] / 1024 / 1024 / elapsed:.1f}"], ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="断点续传下载的本地验证与测速")
+    parser.add_argument("--size", type=int, default=64, help="测试文件大小(MB)，默认64")
+    parser.add_argument("--drop-after", type=int, default=4096, help="每个响应最多发送多少KB后断开，0表示不断开，默认4096")
+    parser.add_argument("--connections", type=int, default=4, help="并行下载的连接数，默认4")
+    args = parser.parse_args()
+
+    # 断开重试是预期行为，不输出每次重试的警告
+    logging.getLogger('douyin_search').setLevel(logging.ERROR)
+
+    size = args.size * 1024 * 1024
+    payload = os.urandom(size)
+    expected = hashlib.sha256(payload).hexdigest()
+    md5 = hashlib.md5(payload).hexdigest()
+    server = start_server(payload, args.drop_after * 1024)
+    url = f"http://127.0.0.1:{server.server_address[1]}/video.mp4"
+
+    table = Table(title=f"断点续传测试 ({args.size}MB)")
+    for column in ["场景", "校验", "断开次数", "接收(MB)", "吞吐(MB/s)"]:
+        table.add_column(column)
+
+    all_ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "video.mp4")
+        cases = [
+            run_case("单连接", url, path, expected, md5),
+            run_case(f"{args.connections}连接并行", url, path, expected, md5,
+                     connections=args.connections, parallel_threshold=0),
+            run_restart_case(url, path, expected, md5, size),
+        ]
+        for row, ok in cases:
+            table.add_row(*row)
+            all_ok = all_ok and ok
+
+    server.shutdown()
+    console.print(table)
+    return 0 if all_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: msgspec 类型化解码与 json.loads 后构造结构的对比测试
+              用 API/*.json 的作品放大成列表页，比较每个作品的解码与字段提取耗时
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+from rich.console import Console
+from rich.table import Table
+import schemas
+from bench_stream_json import API_DIR, build_page
+
+console = Console()
+
+
+def run_fallback(payload):
+    page = schemas.from_dict(schemas.AwemeListPage, json.loads(payload))
+    return [schemas.video_info(aweme) for aweme in page.aweme_list]
+
+
+def run_typed(payload):
+    page = schemas.decode(payload, schemas.AwemeListPage)
+    return [schemas.video_info(aweme) for aweme in page.aweme_list]
+
+
+def best_of(func, payload, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = func(payload)
+        best = min(best, time.perf_counter() - started)
+    return results, best
+
+
+def check_fixtures():
+    """所有接口样例都能按对应结构解码"""
+    cases = {
+        "user_post_info_video.json": schemas.AwemeListPage,
+        "user_post_info_image.json": schemas.AwemeListPage,
+        "user_post_detail.json": schemas.AwemeDetailPage,
+        "user_profile_info.json": schemas.UserProfilePage,
+    }
+    for name, cls in cases.items():
+        with open(os.path.join(API_DIR, name), "rb") as f:
+            payload = f.read()
+        typed = schemas.decode(payload, cls)
+        if typed != schemas.from_dict(cls, json.loads(payload)):
+            console.print(f"[bold red]{name}: 两种解码方式结果不一致[/bold red]")
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="类型化结构解码测试")
+    parser.add_argument("--items", type=int, default=2000, help="列表页中的作品数，默认2000")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数，取最短耗时，默认3")
+    args = parser.parse_args()
+
+    if not schemas.HAS_MSGSPEC:
+        console.print("[bold yellow]未安装msgspec，类型化解码使用json.loads后构造结构[/bold yellow]")
+
+    ok = check_fixtures()
+    payload = build_page(args.items)
+    console.print(f"[bold green]测试数据: {args.items} 个作品，{len(payload) / 1024 / 1024:.1f}MB[/bold green]")
+
+    baseline, baseline_time = best_of(run_fallback, payload, args.repeat)
+    rows = [("json.loads + 结构", baseline_time)]
+    if schemas.HAS_MSGSPEC:
+        results, elapsed = best_of(run_typed, payload, args.repeat)
+        if results != baseline:
+            console.print("[bold red]msgspec 结构: 提取结果与 json.loads 后构造的不一致[/bold red]")
+            ok = False
+        rows.append(("msgspec 结构", elapsed))
+
+    table = Table(title="作品解码与字段提取")
+    for column in ["方式", "总耗时(ms)", "每个作品(µs)", "相对"]:
+        table.add_column(column)
+    for name, elapsed in rows:
+        table.add_row(name, f"{elapsed * 1000:.1f}", f"{elapsed / args.items * 1e6:.1f}",
+                      f"{baseline_time / elapsed:.2f}x")
+    console.print(table)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: TikTokTool.py 启动耗时测试
+              在子进程中用 python -X importtime 运行帮助、无参数、缺少平台等不需要联网的调用，
+              记录总耗时、导入耗时和导入最慢的模块，结果按版本号保存，可以与以前版本的结果比较
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+
+from rich.console import Console
+from rich.table import Table
+
+console = Console()
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 测试的调用: (名称, 参数)
+CASES = (
+    ("help", ["-h"]),
+    ("no_args", []),
+    ("missing_platform", ["-c", "conf.yaml"]),
+    ("douyin_help", ["douyin", "-h"]),
+)
+
+# 耗时差小于该值(毫秒)时不算退化，避免进程启动的抖动
+MIN_DELTA_MS = 20
+
+
+def parse_importtime(stderr, exclude=()):
+    """
+    解析 -X importtime 的输出
+
+    Args:
+        stderr (str): 子进程的标准错误输出
+        exclude (set, optional): 不计入的顶层模块，如解释器启动时就导入的 site. Defaults to ().
+
+    Returns:
+        tuple: (导入总耗时(毫秒), 模块数, [(模块, 累计耗时(毫秒)), ...] 顶层导入按累计耗时排序)
+    """
+    total_us = 0
+    modules = 0
+    top = []
+    skipping = False
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        if not fields[0].strip().isdigit():
+            # 表头
+            continue
+        self_us, cumulative_us, name = int(fields[0]), int(fields[1]), fields[2]
+        # 缩进表示被其他模块导入
+        if name.startswith(" ") and not name.startswith("  "):
+            skipping = name.strip() in exclude
+            if not skipping:
+                top.append((name.strip(), cumulative_us / 1000))
+        if skipping:
+            continue
+        total_us += self_us
+        modules += 1
+    top.sort(key=lambda item: -item[1])
+    return total_us / 1000, modules, top
+
+
+def startup_modules():
+    """空解释器启动时就导入的顶层模块，与脚本无关"""
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", "pass"],
+                               stdin=subprocess.DEVNULL, capture_output=True, text=True)
+    return {name for name, _ in parse_importtime(completed.stderr)[2]}
+
+
+def run_case(script, argv, repeat, exclude):
+    """运行 repeat 次，取中位数"""
+    env = dict(os.environ)
+    env.pop("TIKTOK_TOOL_PLATFORM", None)
+    walls, imports = [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", script] + argv,
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            cwd=os.path.dirname(script),
+            env=env,
+        )
+        walls.append((time.perf_counter() - started) * 1000)
+        import_ms, modules, top = parse_importtime(completed.stderr, exclude)
+        imports.append(import_ms)
+    return {
+        "wall_ms": round(statistics.median(walls), 1),
+        "import_ms": round(statistics.median(imports), 1),
+        "modules": modules,
+        "exit_code": completed.returncode,
+        "top_imports": [[name, round(ms, 1)] for name, ms in top[:5]],
+    }
+
+
+def baseline_wall_ms(repeat):
+    """空解释器的启动耗时，用于扣除进程本身的开销"""
+    walls = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], stdin=subprocess.DEVNULL)
+        walls.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(walls), 1)
+
+
+def read_version():
+    try:
+        with open(os.path.join(ROOT, "version"), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return "unknown"
+
+
+def compare(results, baseline, threshold):
+    """
+    与基线比较
+
+    Returns:
+        list: 退化项 (调用, 指标, 基线值, 当前值)
+    """
+    regressions = []
+    previous = baseline.get("results", {})
+    for name, new in results.items():
+        old = previous.get(name)
+        if not old:
+            continue
+        for metric in ("wall_ms", "import_ms"):
+            if new[metric] > old[metric] * (1 + threshold) and new[metric] - old[metric] > MIN_DELTA_MS:
+                regressions.append((name, metric, old[metric], new[metric]))
+    return regressions
+
+
+def print_results(results, interpreter_ms):
+    table = Table(title=f"TikTokTool.py 启动耗时（空解释器 {interpreter_ms:.1f} ms，导入不含解释器启动时的模块）")
+    for column in ["调用", "总耗时(ms)", "导入(ms)", "模块数", "退出码", "最慢的导入"]:
+        table.add_column(column)
+    for name, m in results.items():
+        slowest = ", ".join(f"{module} {ms:.0f}ms" for module, ms in m["top_imports"][:3])
+        table.add_row(name, f"{m['wall_ms']:.1f}", f"{m['import_ms']:.1f}", str(m["modules"]),
+                      str(m["exit_code"]), slowest)
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TikTokTool.py 启动耗时测试")
+    parser.add_argument("--script", default=os.path.join(ROOT, "TikTokTool.py"),
+                        help="要测试的脚本，可指向旧版本的 TikTokTool.py，默认仓库根目录的 TikTokTool.py")
+    parser.add_argument("--repeat", type=int, default=5, help="每个调用的运行次数，取中位数，默认5")
+    parser.add_argument("--output", default="bench_startup.json", help="结果文件，默认bench_startup.json")
+    parser.add_argument("--baseline", help="基线结果文件（如上个版本的结果），指定时进行比较")
+    parser.add_argument("--threshold", type=float, default=0.2, help="允许的退化比例，默认0.2")
+    args = parser.parse_args()
+
+    script = os.path.abspath(args.script)
+    interpreter_ms = baseline_wall_ms(args.repeat)
+    exclude = startup_modules()
+    results = {}
+    for name, argv in CASES:
+        console.print(f"[cyan]运行 {name}...[/cyan]")
+        results[name] = run_case(script, argv, args.repeat, exclude)
+
+    report = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "version": read_version(),
+        "python": platform.python_version(),
+        "script": script,
+        "repeat": args.repeat,
+        "interpreter_ms": interpreter_ms,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print_results(results, interpreter_ms)
+    console.print(f"[bold green]结果已保存到 {args.output}[/bold green]")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if not regressions:
+        console.print(f"[bold green]与基线 {args.baseline}（版本 {baseline.get('version')}）相比没有超过 "
+                      f"{args.threshold:.0%} 的退化[/bold green]")
+        return 0
+    for name, metric, old, new in regressions:
+        console.print(f"[bold red]{name} {metric}: {old:.1f} -> {new:.1f}[/bold red]")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 流式JSON解析与 response.json() 的对比测试
+              用仓库中 API/*.json 的作品放大成数千条的列表页，比较峰值内存、首个作品耗时和总耗时
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+from rich.console import Console
+from rich.table import Table
+from search_douyin import DouyinSearcher
+from stream_json import ItemStream
+
+console = Console()
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "API")
+FIXTURES = ("user_post_info_video.json", "user_post_info_image.json")
+
+
+def build_page(count):
+    """把接口样例中的作品复制成count条，返回UTF-8编码的JSON"""
+    awemes = []
+    page = None
+    for name in FIXTURES:
+        with open(os.path.join(API_DIR, name), "r", encoding="utf-8") as f:
+            page = json.load(f)
+        awemes.extend(page["aweme_list"])
+
+    items = []
+    for i in range(count):
+        aweme = dict(awemes[i % len(awemes)])
+        aweme["aweme_id"] = str(7000000000000000000 + i)
+        items.append(aweme)
+    page = dict(page, aweme_list=items)
+    return json.dumps(page, ensure_ascii=False).encode("utf-8")
+
+
+def chunked(payload, size):
+    """模拟 response.iter_content() 分块到达"""
+    for i in range(0, len(payload), size):
+        yield payload[i:i + size]
+
+
+def extract(aweme):
+    return DouyinSearcher._extract_video_info(None, aweme)
+
+
+def run_full(payload, chunk_size):
+    """等价于 response.json()：先拼出完整响应，再解析整棵树"""
+    started = time.perf_counter()
+    body = b"".join(chunked(payload, chunk_size))
+    data = json.loads(body)
+    first = None
+    results = []
+    for aweme in data["aweme_list"]:
+        results.append(extract(aweme))
+        if first is None:
+            first = time.perf_counter() - started
+    return results, first, time.perf_counter() - started
+
+
+def run_stream(payload, chunk_size):
+    """逐个解析作品，提取后丢弃"""
+    started = time.perf_counter()
+    first = None
+    results = []
+    for aweme in ItemStream(chunked(payload, chunk_size)):
+        results.append(extract(aweme))
+        if first is None:
+            first = time.perf_counter() - started
+    return results, first, time.perf_counter() - started
+
+
+def measure(func, payload, chunk_size, repeat):
+    """返回 (结果, 首个作品耗时, 最短总耗时, 峰值内存)"""
+    best_total = best_first = float("inf")
+    for _ in range(repeat):
+        results, first, total = func(payload, chunk_size)
+        best_total = min(best_total, total)
+        best_first = min(best_first, first)
+
+    tracemalloc.start()
+    func(payload, chunk_size)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return results, best_first, best_total, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流式JSON解析测试")
+    parser.add_argument("--items", type=int, default=2000, help="列表页中的作品数，默认2000")
+    parser.add_argument("--chunk-size", type=int, default=64, help="每次到达的数据块大小(KB)，默认64")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数，取最短耗时，默认3")
+    args = parser.parse_args()
+
+    payload = build_page(args.items)
+    chunk_size = args.chunk_size * 1024
+    console.print(f"[bold green]测试数据: {args.items} 个作品，{len(payload) / 1024 / 1024:.1f}MB[/bold green]")
+
+    full = measure(run_full, payload, chunk_size, args.repeat)
+    stream = measure(run_stream, payload, chunk_size, args.repeat)
+
+    table = Table(title="JSON解析对比")
+    for column in ["方式", "首个作品(ms)", "总耗时(ms)", "峰值内存(MB)"]:
+        table.add_column(column)
+    for name, (_, first, total, peak) in (("response.json()", full), ("ItemStream", stream)):
+        table.add_row(name, f"{first * 1000:.1f}", f"{total * 1000:.1f}", f"{peak / 1024 / 1024:.1f}")
+    console.print(table)
+
+    if full[0] != stream[0]:
+        console.print("[bold red]两种方式提取的结果不一致[/bold red]")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 用户作品抓取的性能测试
+              针对本地回放服务，比较逐个用户“翻完所有页再下载”的串行方式和 UserCrawler 在不同并发用户数、
+              预取页数下的总耗时和吞吐，可以与保存的基线比较
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import statistics
+import tempfile
+
+from rich.console import Console
+from rich.table import Table
+
+import progress_output
+from cdn_hosts import HostScoreboard
+from download_pool import DownloadPool, parse_rate
+from replay_server import ReplayServer
+from search_douyin import DouyinSearcher
+from user_crawler import UserCrawler
+
+console = Console()
+
+# (名称, 同时抓取的用户数, 预取页数)，用户数为0表示串行方式
+CONFIGS = (
+    ("serial", 0, 0),
+    ("u1_k1", 1, 1),
+    ("u1_k2", 1, 2),
+    ("u4_k1", 4, 1),
+    ("u4_k2", 4, 2),
+    ("u8_k3", 8, 3),
+)
+
+
+def run_once(base_url, users, sec_uids, prefetch, page_delay, concurrency):
+    """运行一次，返回 (耗时, 作品数, 下载失败数)"""
+    logging.getLogger('douyin_search').setLevel(logging.ERROR)
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        # download_videos 会在当前目录写 douyin_videos.txt
+        os.chdir(tmp)
+        try:
+            searcher = DouyinSearcher(
+                use_local_server=False,
+                manifest_path=os.path.join(tmp, "manifest.db"),
+                base_url=base_url,
+                page_delay=(page_delay, page_delay),
+            )
+            options = {"download_dir": os.path.join(tmp, "out"), "save_to_file": False}
+            started = time.perf_counter()
+            # 回放服务的媒体都在同一个主机上，不按单主机限制并发；评分不写入 host_scores.json
+            with DownloadPool(concurrency=concurrency, per_host=concurrency, show_progress=False,
+                              scoreboard=HostScoreboard(path=None)) as pool:
+                if users:
+                    with UserCrawler(searcher, pool, users, prefetch, download_options=options) as crawler:
+                        results = [r for s in crawler.crawl(sec_uids) for r in s["results"]]
+                else:
+                    results = []
+                    for sec_uid in sec_uids:
+                        videos = list(searcher.iter_user_posts(sec_uid))
+                        results.extend(searcher.download_videos(videos, pool=pool, **options))
+            elapsed = time.perf_counter() - started
+            searcher.manifest.close()
+        finally:
+            os.chdir(cwd)
+    return elapsed, len(results), sum(1 for r in results if not r["success"])
+
+
+def print_results(results):
+    table = Table(title="用户作品抓取")
+    for column in ["配置", "用户数", "预取", "耗时(s)", "作品/s", "相对串行", "失败"]:
+        table.add_column(column)
+    serial = next((m["elapsed"] for m in results.values() if not m["users"]), None)
+    for name, m in results.items():
+        table.add_row(name, str(m["users"] or "-"), str(m["prefetch"] or "-"), f"{m['elapsed']:.2f}",
+                      f"{m['items_per_sec']:.1f}", f"{serial / m['elapsed']:.2f}x" if serial else "-",
+                      str(m["failed"]))
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用户作品抓取性能测试")
+    parser.add_argument("--users", type=int, default=8, help="回放服务中的用户数，默认8")
+    parser.add_argument("--items", type=int, default=240, help="回放服务中的作品总数，默认240")
+    parser.add_argument("--media-size", default="256K", help="最高清晰度视频的大小，默认256K")
+    parser.add_argument("--latency", type=float, default=50, help="回放服务每个请求的延迟(毫秒)，默认50")
+    parser.add_argument("--bandwidth", default="4M", help="回放服务每个响应的带宽上限，默认4M")
+    parser.add_argument("--page-delay", type=float, default=0.3, help="同一个用户翻页之间的延迟(秒)，默认0.3")
+    parser.add_argument("-j", "--concurrency", type=int, default=8, help="下载并发数，默认8")
+    parser.add_argument("--repeat", type=int, default=3, help="每个配置的运行次数，取中位数，默认3")
+    parser.add_argument("--output", default="bench_user_crawl.json", help="结果文件，默认bench_user_crawl.json")
+    parser.add_argument("--baseline", help="基线结果文件，指定时进行比较")
+    parser.add_argument("--threshold", type=float, default=0.2, help="允许的退化比例，默认0.2")
+    args = parser.parse_args()
+
+    progress_output.configure(headless=True, stream=open(os.devnull, "w"))
+    results = {}
+    with ReplayServer(items=args.items, users=args.users, media_size=parse_rate(args.media_size),
+                      latency=args.latency / 1000, bandwidth=args.bandwidth) as server:
+        server.catalog.warm()
+        for name, users, prefetch in CONFIGS:
+            console.print(f"[cyan]运行 {name}...[/cyan]")
+            runs = [run_once(server.base_url, users, server.catalog.users, prefetch, args.page_delay,
+                             args.concurrency) for _ in range(args.repeat)]
+            elapsed = statistics.median(run[0] for run in runs)
+            results[name] = {
+                "users": users,
+                "prefetch": prefetch,
+                "elapsed": elapsed,
+                "items": runs[0][1],
+                "items_per_sec": runs[0][1] / elapsed if elapsed else 0,
+                "failed": max(run[2] for run in runs),
+            }
+
+    report = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "settings": {key: getattr(args, key) for key in
+                     ("users", "items", "media_size", "latency", "bandwidth", "page_delay", "concurrency", "repeat")},
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print_results(results)
+    console.print(f"[bold green]结果已保存到 {args.output}[/bold green]")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        previous = json.load(f).get("results", {})
+    regressions = [(name, previous[name]["elapsed"], m["elapsed"]) for name, m in results.items()
+                   if name in previous and m["elapsed"] > previous[name]["elapsed"] * (1 + args.threshold)]
+    if not regressions:
+        console.print(f"[bold green]与基线 {args.baseline} 相比没有超过 {args.threshold:.0%} 的退化[/bold green]")
+        return 0
+    for name, old, new in regressions:
+        console.print(f"[bold red]{name}: {old:.2f}s -> {new:.2f}s[/bold red]")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
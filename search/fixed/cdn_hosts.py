@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: CDN主机测速与排序，记录每个主机的延迟、吞吐和失败情况并跨运行保存
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+logger = logging.getLogger('douyin_search.download')
+
+# 默认保存在脚本目录下，与douyin_cookie.txt放在一起
+DEFAULT_SCORE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "host_scores.json")
+
+# 指数加权平均的新样本权重
+ALPHA = 0.3
+
+# 超过该时间没有更新的记录在加载时丢弃
+MAX_AGE = 7 * 24 * 3600
+
+# 估算下载耗时时使用的典型文件大小
+TYPICAL_SIZE = 8 * 1024 * 1024
+
+
+def host_of(url):
+    """返回URL的主机名"""
+    return urlparse(url).hostname or ""
+
+
+class HostScoreboard:
+    """
+    CDN主机评分表
+
+    每个主机记录延迟(首字节时间)、吞吐量和失败率的指数加权平均，
+    按"下载一个典型文件的预计耗时"排序，失败会按比例放大预计耗时。
+    """
+
+    def __init__(self, path=DEFAULT_SCORE_FILE):
+        """
+        Args:
+            path (str, optional): 评分保存路径，None表示不保存. Defaults to DEFAULT_SCORE_FILE.
+        """
+        self.path = path
+        self.hosts = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """加载上次运行保存的评分"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                hosts = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取CDN主机评分失败: {str(e)}")
+            return
+
+        now = time.time()
+        self.hosts = {h: s for h, s in hosts.items() if now - s.get("updated", 0) < MAX_AGE}
+        logger.debug(f"已加载 {len(self.hosts)} 个CDN主机评分")
+
+    def save(self):
+        """保存评分，供下次运行使用"""
+        if not self.path:
+            return
+        with self._lock:
+            hosts = dict(self.hosts)
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(hosts, f, indent=2)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"保存CDN主机评分失败: {str(e)}")
+
+    def _entry(self, host):
+        if host not in self.hosts:
+            self.hosts[host] = {"latency": None, "throughput": None, "failure": 0.0, "samples": 0, "updated": 0}
+        return self.hosts[host]
+
+    @staticmethod
+    def _ewma(old, new):
+        return new if old is None else old * (1 - ALPHA) + new * ALPHA
+
+    def record_latency(self, host, latency):
+        """记录一次请求的首字节时间(秒)"""
+        with self._lock:
+            entry = self._entry(host)
+            entry["latency"] = self._ewma(entry["latency"], latency)
+            entry["updated"] = time.time()
+
+    def record_success(self, host, nbytes, elapsed):
+        """记录一次成功的传输"""
+        with self._lock:
+            entry = self._entry(host)
+            if elapsed > 0 and nbytes > 0:
+                entry["throughput"] = self._ewma(entry["throughput"], nbytes / elapsed)
+            entry["failure"] = self._ewma(entry["failure"], 0.0)
+            entry["samples"] += 1
+            entry["updated"] = time.time()
+
+    def record_failure(self, host):
+        """记录一次失败或卡顿"""
+        with self._lock:
+            entry = self._entry(host)
+            entry["failure"] = self._ewma(entry["failure"], 1.0)
+            entry["samples"] += 1
+            entry["updated"] = time.time()
+
+    def known(self, host):
+        with self._lock:
+            return host in self.hosts and self.hosts[host]["latency"] is not None
+
+    def expected_time(self, host):
+        """预计从该主机下载一个典型文件的耗时，没有数据时返回None"""
+        with self._lock:
+            entry = self.hosts.get(host)
+            if entry is None:
+                return None
+            if entry["latency"] is None:
+                # 从未成功连上的主机排在最后
+                return float("inf") if entry["failure"] > 0 else None
+            throughput = entry["throughput"] or TYPICAL_SIZE
+            estimate = entry["latency"] + TYPICAL_SIZE / throughput
+            # 失败率越高，预计需要的重试越多
+            return estimate / max(0.05, 1.0 - entry["failure"])
+
+    def rank(self, urls):
+        """
+        按预计耗时对镜像地址排序，未测速的主机排在已知主机的中间位置
+
+        Args:
+            urls (list): 同一资源的多个CDN地址
+
+        Returns:
+            list: 排序后的地址列表
+        """
+        estimates = [self.expected_time(host_of(url)) for url in urls]
+        known = sorted(e for e in estimates if e is not None)
+        neutral = known[len(known) // 2] if known else 0
+
+        order = sorted(range(len(urls)), key=lambda i: (estimates[i] if estimates[i] is not None else neutral, i))
+        return [urls[i] for i in order]
+
+    def probe(self, urls, session, headers=None, timeout=3, proxies=None):
+        """
+        并发请求每个未测速主机的第一个字节，记录首字节时间
+
+        Args:
+            urls (list): 同一资源的多个CDN地址
+            session (requests.Session): HTTP会话
+            headers (dict, optional): 请求头. Defaults to None.
+            timeout (int, optional): 超时时间(秒). Defaults to 3.
+            proxies (dict, optional): 测速使用的代理，与随后的下载一致. Defaults to None.
+        """
+        targets = {}
+        for url in urls:
+            host = host_of(url)
+            if host and not self.known(host) and host not in targets:
+                targets[host] = url
+        if not targets:
+            return
+
+        def probe_one(item):
+            host, url = item
+            request_headers = dict(headers or {}, Range="bytes=0-0")
+            started = time.monotonic()
+            try:
+                with session.get(url, headers=request_headers, stream=True, timeout=timeout, proxies=proxies) as response:
+                    response.raise_for_status()
+                    self.record_latency(host, time.monotonic() - started)
+            except Exception as e:
+                logger.debug(f"CDN主机 {host} 测速失败: {str(e)}")
+                self.record_latency(host, timeout)
+                self.record_failure(host)
+
+        with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+            list(executor.map(probe_one, targets.items()))
@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 多账号cookie池，按健康度加权轮换，根据响应状态码和空结果评分，被限流的冷却、持续失败的剔除
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+
+from rich.table import Table
+from progress_output import console
+
+logger = logging.getLogger('douyin_search.cookie')
+
+# 指数加权平均的新样本权重
+ALPHA = 0.3
+
+# 健康度低于该值时进入冷却
+MIN_HEALTH = 0.3
+
+# 健康度的下限，保证冷却结束后仍有机会被选中
+MIN_WEIGHT = 0.05
+
+# 默认冷却时间(秒)，连续被限流时加倍
+DEFAULT_COOLDOWN = 300
+
+# 冷却时间上限(秒)
+MAX_COOLDOWN = 3600
+
+# 连续失败多少次后剔除
+DEFAULT_EVICT_AFTER = 5
+
+# 所有cookie都在冷却时最多等待的时间(秒)，超过时直接使用最快结束冷却的cookie
+MAX_WAIT = 30
+
+# 视为cookie失效的状态码
+AUTH_STATUS = (401, 403)
+
+# 视为被限流的状态码
+RATE_LIMIT_STATUS = (429,)
+
+
+class PooledCookie:
+    """池中的一个cookie及其统计"""
+
+    __slots__ = ("name", "cookie", "health", "requests", "errors", "empty", "rate_limited",
+                 "failures", "strikes", "cooldown_until", "evicted")
+
+    def __init__(self, name, cookie):
+        self.name = name
+        self.cookie = cookie
+        self.health = 1.0
+        self.requests = 0
+        self.errors = 0
+        self.empty = 0
+        self.rate_limited = 0
+        # 连续失败次数，成功后清零
+        self.failures = 0
+        # 连续被限流次数，决定冷却时间
+        self.strikes = 0
+        self.cooldown_until = 0.0
+        self.evicted = False
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "health": round(self.health, 3),
+            "requests": self.requests,
+            "errors": self.errors,
+            "empty": self.empty,
+            "rate_limited": self.rate_limited,
+            "cooling": max(0.0, round(self.cooldown_until - time.time(), 1)),
+            "evicted": self.evicted,
+        }
+
+
+def load_cookies(path):
+    """
+    读取cookie列表
+
+    Args:
+        path (str): 目录（每个 .txt 文件一个cookie，文件名作为名称）或文件（每行一个cookie，#开头为注释）
+
+    Returns:
+        list: [(名称, cookie), ...]
+    """
+    cookies = []
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if not name.endswith(".txt"):
+                continue
+            with open(os.path.join(path, name), "r", encoding="utf-8") as f:
+                cookie = f.read().strip()
+            if cookie:
+                cookies.append((os.path.splitext(name)[0], cookie))
+        return cookies
+
+    with open(path, "r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if line and not line.startswith("#"):
+                cookies.append((f"{os.path.basename(path)}:{lineno}", line))
+    return cookies
+
+
+class CookiePool:
+    """
+    cookie池
+
+    acquire() 在可用的cookie中按健康度加权随机选择，每 rotate_every 次请求换一次；
+    report() 记录请求结果: 成功提高健康度，限流进入冷却（连续限流时冷却时间加倍），
+    401/403、空结果和无法解析的响应降低健康度，健康度过低时冷却，连续失败 evict_after 次后剔除
+    """
+
+    def __init__(self, cookies, rotate_every=1, cooldown=DEFAULT_COOLDOWN, evict_after=DEFAULT_EVICT_AFTER):
+        """
+        Args:
+            cookies (list): [(名称, cookie), ...] 或cookie字符串列表
+            rotate_every (int, optional): 每个cookie连续使用的请求数，1表示每次请求都重新选择. Defaults to 1.
+            cooldown (int, optional): 冷却时间(秒). Defaults to DEFAULT_COOLDOWN.
+            evict_after (int, optional): 连续失败多少次后剔除. Defaults to DEFAULT_EVICT_AFTER.
+        """
+        self.entries = [
+            PooledCookie(*item) if isinstance(item, tuple) else PooledCookie(f"cookie{i + 1}", item)
+            for i, item in enumerate(cookies)
+        ]
+        self.rotate_every = max(1, rotate_every)
+        self.cooldown = cooldown
+        self.evict_after = evict_after
+        self._current = None
+        self._uses = 0
+        # 最近一次失败的cookie，有其他选择时下一次请求不再使用
+        self._failed = None
+        self._lock = threading.Lock()
+        self._random = random.Random()
+
+    @classmethod
+    def from_path(cls, path, **kwargs):
+        """从目录或文件加载，见 load_cookies()"""
+        cookies = load_cookies(path)
+        logger.info(f"已从 {path} 加载 {len(cookies)} 个cookie")
+        return cls(cookies, **kwargs)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def available(self):
+        """未剔除且不在冷却中的cookie数"""
+        now = time.time()
+        with self._lock:
+            return sum(1 for e in self.entries if not e.evicted and e.cooldown_until <= now)
+
+    def acquire(self):
+        """
+        选择本次请求使用的cookie
+
+        Returns:
+            PooledCookie|None: 全部被剔除时返回None
+        """
+        while True:
+            with self._lock:
+                now = time.time()
+                alive = [e for e in self.entries if not e.evicted]
+                if not alive:
+                    return None
+                ready = [e for e in alive if e.cooldown_until <= now]
+
+                current = self._current
+                if current in ready and self._uses < self.rotate_every:
+                    self._uses += 1
+                    return current
+
+                if ready:
+                    candidates = [e for e in ready if e is not self._failed] or ready
+                    weights = [max(MIN_WEIGHT, e.health) for e in candidates]
+                    choice = self._random.choices(candidates, weights=weights)[0]
+                    self._current = choice
+                    self._uses = 1
+                    return choice
+
+                soonest = min(alive, key=lambda e: e.cooldown_until)
+                wait = soonest.cooldown_until - now
+                if wait > MAX_WAIT:
+                    logger.warning(f"所有cookie都在冷却中，提前使用 {soonest.name}")
+                    self._current = soonest
+                    self._uses = 1
+                    return soonest
+            logger.info(f"所有cookie都在冷却中，等待 {wait:.0f} 秒")
+            time.sleep(wait)
+
+    def report(self, entry, status, empty=False):
+        """
+        记录一次请求的结果
+
+        Args:
+            entry (PooledCookie): acquire() 返回的cookie
+            status (int|None): 响应状态码，None表示网络错误（不影响健康度）
+            empty (bool, optional): 响应成功但没有数据或无法解析. Defaults to False.
+        """
+        if entry is None:
+            return
+        with self._lock:
+            entry.requests += 1
+            if status is None:
+                entry.errors += 1
+                return
+
+            if status == 200 and not empty:
+                entry.health = entry.health * (1 - ALPHA) + ALPHA
+                entry.failures = 0
+                entry.strikes = 0
+                return
+
+            entry.failures += 1
+            entry.health *= 1 - ALPHA
+            if empty:
+                entry.empty += 1
+            else:
+                entry.errors += 1
+
+            if status in RATE_LIMIT_STATUS:
+                entry.rate_limited += 1
+                entry.strikes += 1
+                self._cool(entry, self.cooldown * 2 ** (entry.strikes - 1), "被限流")
+            elif entry.failures >= self.evict_after or (status in AUTH_STATUS and entry.failures >= 2):
+                entry.evicted = True
+                logger.warning(f"cookie {entry.name} 连续失败 {entry.failures} 次，已从池中剔除")
+            elif entry.health < MIN_HEALTH:
+                self._cool(entry, self.cooldown, f"健康度降到 {entry.health:.2f}")
+
+            # 出错后立即换一个cookie
+            self._failed = entry
+            if entry is self._current:
+                self._current = None
+
+    def _cool(self, entry, seconds, reason):
+        seconds = min(seconds, MAX_COOLDOWN)
+        entry.cooldown_until = time.time() + seconds
+        logger.warning(f"cookie {entry.name} {reason}，冷却 {seconds:.0f} 秒")
+
+    def stats(self):
+        """每个cookie的请求数、错误数、空结果数、限流次数、健康度和状态"""
+        with self._lock:
+            return [e.to_dict() for e in self.entries]
+
+    def print_stats(self):
+        table = Table(title="Cookie池")
+        for column in ["名称", "请求", "错误", "空结果", "限流", "健康度", "状态"]:
+            table.add_column(column)
+        for row in self.stats():
+            if row["evicted"]:
+                state = "[red]已剔除[/red]"
+            elif row["cooling"]:
+                state = f"[yellow]冷却 {row['cooling']:.0f}s[/yellow]"
+            else:
+                state = "[green]可用[/green]"
+            table.add_row(row["name"], str(row["requests"]), str(row["errors"]), str(row["empty"]),
+                          str(row["rate_limited"]), f"{row['health']:.2f}", state)
+        console.print(table)
@@ -0,0 +1,446 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: cookie缓存，记录来源、获取时间和过期时间，启动时直接使用缓存，不再每次扫描浏览器
+              定期用轻量接口校验，临近过期时在后台重新获取
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from urllib.parse import unquote
+
+import requests
+from rich.console import Console
+
+logger = logging.getLogger('douyin_search.cookie')
+
+console = Console()
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 缓存文件，包含cookie明文，只允许当前用户读写
+DEFAULT_STORE = os.path.join(SCRIPT_DIR, "cookie_store.json")
+
+# manual_cookie.py 保存、use_cookie.py 读取的cookie文件
+DEFAULT_COOKIE_FILE = os.path.join(SCRIPT_DIR, "douyin_cookie.txt")
+
+# 轻量校验接口，返回当前登录用户，status_code为0表示cookie可用
+VALIDATE_PATH = "/aweme/v1/web/query/user/"
+
+# 从浏览器获取cookie时依次尝试
+BROWSERS = ("chrome", "firefox", "edge", "opera", "safari")
+
+# 单个浏览器的读取超时(秒)，浏览器正在运行时cookie数据库可能被锁住
+BROWSER_TIMEOUT = 10
+
+# 无法从cookie中得知过期时间时的有效期
+DEFAULT_TTL = 7 * 24 * 3600
+
+# 距过期不足该时间时在后台重新获取
+REFRESH_MARGIN = 24 * 3600
+
+# 校验结果的有效时间，期间启动不再请求校验接口
+VALIDATE_INTERVAL = 6 * 3600
+
+# 后台刷新无法校验或没有获取到新cookie时的重试间隔(秒)，连续失败时加倍，最长 VALIDATE_INTERVAL
+REFRESH_RETRY = 300
+
+
+def parse_cookie(cookie):
+    """把cookie字符串解析为 {名称: 值}"""
+    pairs = {}
+    for part in (cookie or "").split(";"):
+        if "=" in part:
+            name, value = part.split("=", 1)
+            pairs[name.strip()] = value.strip()
+    return pairs
+
+
+def estimate_expiry(cookie, fetched_at):
+    """
+    估算cookie的过期时间
+
+    登录后的 sid_guard 形如 "<sessionid>|<签发时间>|<有效秒数>|<过期日期>"，可以算出会话的过期时间；
+    没有时按获取时间加 DEFAULT_TTL 估算
+
+    Returns:
+        float: 过期时间戳
+    """
+    sid_guard = parse_cookie(cookie).get("sid_guard")
+    if sid_guard:
+        fields = unquote(sid_guard).split("|")
+        try:
+            return float(fields[1]) + float(fields[2])
+        except (IndexError, ValueError):
+            pass
+    return fetched_at + DEFAULT_TTL
+
+
+def _call_with_timeout(func, timeout, *args, **kwargs):
+    """在后台线程中调用，超时抛出TimeoutError，避免被锁住的浏览器数据库卡住启动"""
+    result = {}
+
+    def run():
+        try:
+            result["value"] = func(*args, **kwargs)
+        except Exception as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        raise TimeoutError(f"超过 {timeout} 秒未返回")
+    if "error" in result:
+        raise result["error"]
+    return result.get("value")
+
+
+class CookieStore:
+    """
+    cookie缓存
+
+    get() 优先返回缓存中未过期、校验通过的cookie；否则依次从cookie文件和浏览器获取并写入缓存。
+    start_refresh() 启动后台线程，临近过期或校验失败时重新获取，通过回调交给使用方
+    """
+
+    def __init__(self, path=DEFAULT_STORE, cookie_file=DEFAULT_COOKIE_FILE, base_url="https://www.douyin.com",
+                 validate_url=None, browsers=BROWSERS):
+        """
+        Args:
+            path (str, optional): 缓存文件路径. Defaults to DEFAULT_STORE.
+            cookie_file (str, optional): cookie文件路径，None表示不读取. Defaults to DEFAULT_COOKIE_FILE.
+            base_url (str, optional): 接口地址，用于拼接校验接口. Defaults to "https://www.douyin.com".
+            validate_url (str, optional): 校验接口地址，默认为 base_url + VALIDATE_PATH. Defaults to None.
+            browsers (tuple, optional): 依次尝试的浏览器，空表示不从浏览器获取. Defaults to BROWSERS.
+        """
+        self.path = path
+        self.cookie_file = cookie_file
+        self.validate_url = validate_url or base_url.rstrip("/") + VALIDATE_PATH
+        self.browsers = browsers
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        # 后台刷新连续失败的次数和下次允许重试的时间
+        self._failures = 0
+        self._retry_at = 0
+
+    # -- 缓存读写 -------------------------------------------------------------
+
+    def load(self):
+        """读取缓存，没有时返回None"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取cookie缓存失败: {str(e)}")
+            return None
+        return entry if entry.get("cookie") else None
+
+    def _save(self, entry):
+        tmp = self.path + ".tmp"
+        try:
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"保存cookie缓存失败: {str(e)}")
+
+    def put(self, cookie, source, expires_at=None, valid=None):
+        """
+        写入缓存
+
+        Args:
+            cookie (str): cookie字符串
+            source (str): 来源，如 "manual"、"file"、"browser:chrome"
+            expires_at (float, optional): 过期时间戳，默认从cookie估算. Defaults to None.
+            valid (bool, optional): 刚刚得到的校验结果，None表示未校验. Defaults to None.
+
+        Returns:
+            dict: 缓存记录
+        """
+        now = time.time()
+        entry = {
+            "cookie": cookie,
+            "source": source,
+            "fetched_at": now,
+            "expires_at": expires_at or estimate_expiry(cookie, now),
+            "validated_at": now if valid is not None else None,
+            "valid": valid,
+        }
+        with self._lock:
+            self._save(entry)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    # -- 校验 -----------------------------------------------------------------
+
+    def validate(self, cookie, timeout=3):
+        """
+        请求校验接口
+
+        Returns:
+            bool|None: True有效，False无效，None表示无法判断（网络错误等），此时不丢弃cookie
+        """
+        try:
+            response = requests.get(self.validate_url, headers={"Cookie": cookie}, timeout=timeout)
+        except requests.RequestException as e:
+            logger.debug(f"校验cookie时网络错误: {str(e)}")
+            return None
+        if response.status_code in (401, 403):
+            return False
+        if response.status_code != 200:
+            return None
+        try:
+            return response.json().get("status_code") == 0
+        except ValueError:
+            return None
+
+    def _check(self, entry, force=False):
+        """按需校验缓存中的cookie并记录结果，返回是否可用"""
+        now = time.time()
+        if entry["expires_at"] <= now:
+            logger.info("缓存的cookie已过期")
+            return False
+        if not force and entry.get("validated_at") and now - entry["validated_at"] < VALIDATE_INTERVAL:
+            return entry.get("valid") is not False
+        return self._validate_entry(entry) is not False
+
+    def _validate_entry(self, entry):
+        """请求校验接口并把结果写入缓存，返回 validate() 的结果，无法判断时不改动缓存"""
+        valid = self.validate(entry["cookie"])
+        if valid is not None:
+            entry["validated_at"] = time.time()
+            entry["valid"] = valid
+            with self._lock:
+                self._save(entry)
+        if valid is False:
+            logger.warning(f"缓存的cookie校验未通过 (来源: {entry['source']})")
+        return valid
+
+    # -- 获取 -----------------------------------------------------------------
+
+    def _from_file(self):
+        if not self.cookie_file or not os.path.exists(self.cookie_file):
+            return None
+        try:
+            with open(self.cookie_file, "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except OSError as e:
+            logger.warning(f"读取cookie文件失败: {str(e)}")
+            return None
+
+    def _from_browsers(self):
+        """逐个浏览器获取，按需调用，前面的来源可用时不会扫描后面的浏览器"""
+        if not self.browsers:
+            return
+        try:
+            from f2.apps.douyin.utils.cookie import get_cookie_from_browser
+        except ImportError as e:
+            logger.warning(f"无法导入f2，不能从浏览器获取cookie: {str(e)}")
+            return
+
+        for browser in self.browsers:
+            try:
+                logger.info(f"尝试从{browser}浏览器获取cookie")
+                cookie = _call_with_timeout(get_cookie_from_browser, BROWSER_TIMEOUT,
+                                            domain=".douyin.com", browser=browser)
+            except Exception as e:
+                logger.warning(f"从{browser}浏览器获取cookie失败: {str(e)}")
+                continue
+            yield cookie, f"browser:{browser}"
+
+    def _candidates(self):
+        yield self._from_file(), "file"
+        yield from self._from_browsers()
+
+    def fetch(self, exclude=None):
+        """
+        从cookie文件和浏览器重新获取，校验通过（或无法判断）的写入缓存
+
+        Args:
+            exclude (str, optional): 已知无效的cookie，获取到相同内容时跳过. Defaults to None.
+
+        Returns:
+            dict|None: 新的缓存记录
+        """
+        for cookie, source in self._candidates():
+            if not cookie or cookie == exclude:
+                continue
+            valid = self.validate(cookie)
+            if valid is False:
+                logger.warning(f"{source} 中的cookie校验未通过")
+                continue
+            logger.info(f"已从 {source} 获取cookie")
+            return self.put(cookie, source, valid=valid)
+        return None
+
+    def get(self, validate=True):
+        """
+        返回可用的cookie，缓存有效时不访问浏览器
+
+        Args:
+            validate (bool, optional): 是否校验（距上次校验超过 VALIDATE_INTERVAL 时才会请求）. Defaults to True.
+
+        Returns:
+            str|None: cookie字符串
+        """
+        entry = self.load()
+        if entry and (self._check(entry) if validate else entry["expires_at"] > time.time()):
+            return entry["cookie"]
+        entry = self.fetch(exclude=entry["cookie"] if entry else None)
+        return entry["cookie"] if entry else None
+
+    # -- 后台刷新 -------------------------------------------------------------
+
+    def start_refresh(self, on_refresh=None):
+        """
+        启动后台刷新线程
+
+        Args:
+            on_refresh (callable, optional): 获取到新cookie时调用，参数为cookie字符串. Defaults to None.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, args=(on_refresh,),
+                                        name="cookie-refresh", daemon=True)
+        self._thread.start()
+
+    def stop_refresh(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _next_check(self, entry):
+        """下一次检查前的等待秒数"""
+        if not entry:
+            return VALIDATE_INTERVAL
+        now = time.time()
+        refresh_at = entry["expires_at"] - REFRESH_MARGIN
+        # 从未校验过的cookie立即校验
+        validate_at = (entry.get("validated_at") or 0) + VALIDATE_INTERVAL
+        return max(0, min(refresh_at, validate_at) - now, self._retry_at - now)
+
+    def _backoff(self, reason):
+        """本轮检查没有结果，REFRESH_RETRY 秒后重试，连续失败时加倍，最长 VALIDATE_INTERVAL"""
+        delay = min(REFRESH_RETRY * 2 ** self._failures, VALIDATE_INTERVAL)
+        self._failures += 1
+        self._retry_at = time.time() + delay
+        logger.warning(f"{reason}，{delay:.0f}s 后重试")
+
+    def _reset_backoff(self):
+        self._failures = 0
+        self._retry_at = 0
+
+    def _refresh_loop(self, on_refresh):
+        while not self._stop.wait(self._next_check(self.load())):
+            entry = self.load()
+            if entry and entry["expires_at"] - REFRESH_MARGIN > time.time():
+                valid = self._validate_entry(entry)
+                if valid is None:
+                    # 网络错误或接口返回非JSON时没有记录校验时间，按退避间隔再校验，不立即重试
+                    self._backoff("无法校验缓存的cookie")
+                    continue
+                if valid:
+                    self._reset_backoff()
+                    continue
+            fresh = self.fetch(exclude=entry["cookie"] if entry else None)
+            if not fresh:
+                # 即将过期或校验未通过、又没有新的cookie时，按退避间隔重试，不反复扫描cookie文件和浏览器
+                self._backoff("后台刷新没有获取到新的cookie")
+                continue
+            self._reset_backoff()
+            logger.info(f"cookie已在后台刷新 (来源: {fresh['source']})")
+            if on_refresh:
+                on_refresh(fresh["cookie"])
+
+
+def load_cookie_from_file(filename=DEFAULT_COOKIE_FILE):
+    """从cookie缓存加载Cookie，缓存为空、过期或校验未通过时读取文件，不扫描浏览器，供 manual_cookie.py 和 use_cookie.py 使用"""
+    cookie = CookieStore(cookie_file=filename, browsers=()).get()
+    if cookie:
+        console.print("[green]已加载Cookie[/green]")
+        return cookie
+    console.print(f"[yellow]cookie缓存和Cookie文件 {filename} 中都没有可用的Cookie[/yellow]")
+    return None
+
+
+def _describe(entry):
+    now = time.time()
+    remaining = entry["expires_at"] - now
+    valid = {True: "通过", False: "未通过", None: "未校验"}[entry.get("valid")]
+    validated = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["validated_at"])) if entry.get("validated_at") else "-"
+    return (
+        f"来源: {entry['source']}\n"
+        f"获取时间: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['fetched_at']))}\n"
+        f"过期时间: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['expires_at']))}"
+        f"（{f'剩余 {remaining / 3600:.1f} 小时' if remaining > 0 else '已过期'}）\n"
+        f"校验: {valid}，校验时间: {validated}\n"
+        f"Cookie开头: {entry['cookie'][:20]}..."
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="cookie缓存管理")
+    parser.add_argument("--store", default=DEFAULT_STORE, help="缓存文件路径")
+    parser.add_argument("--base-url", default=os.environ.get("DOUYIN_BASE_URL", "https://www.douyin.com"),
+                        help="接口地址，用于校验cookie")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="显示缓存的cookie状态")
+    sub.add_parser("validate", help="立即校验缓存的cookie")
+    sub.add_parser("refresh", help="重新从cookie文件和浏览器获取")
+    set_parser = sub.add_parser("set", help="手动写入cookie")
+    set_parser.add_argument("cookie", help="cookie字符串")
+    sub.add_parser("clear", help="删除缓存")
+    args = parser.parse_args()
+
+    store = CookieStore(args.store, base_url=args.base_url)
+    if args.command == "set":
+        store.put(args.cookie, "manual")
+        console.print("[bold green]已写入cookie缓存[/bold green]")
+        return 0
+    if args.command == "clear":
+        store.clear()
+        console.print("[bold green]已删除cookie缓存[/bold green]")
+        return 0
+    if args.command == "refresh":
+        entry = store.load()
+        entry = store.fetch(exclude=entry["cookie"] if entry and entry.get("valid") is False else None)
+        if not entry:
+            console.print("[bold red]没有获取到可用的cookie[/bold red]")
+            return 1
+        console.print(_describe(entry))
+        return 0
+
+    entry = store.load()
+    if not entry:
+        console.print("[bold yellow]没有缓存的cookie[/bold yellow]")
+        return 1
+    if args.command == "validate":
+        ok = store._check(entry, force=True)
+        entry = store.load() or entry
+        console.print(_describe(entry))
+        return 0 if ok else 1
+    console.print(_describe(entry))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,539 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 常驻下载守护进程，启动时加载一次cookie、代理、下载清单和签名库，
+              通过本机HTTP接口接收搜索和下载任务，所有任务共用同一个下载池、连接池和CDN评分，
+              每个任务的进度以JSON行的形式流式返回，客户端见 daemon_client.py
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import sys
+import json
+import time
+import hmac
+import secrets
+import logging
+import argparse
+import itertools
+import threading
+import importlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import progress_output
+from cdn_hosts import host_of
+from download_pool import DownloadPool
+from manifest import DEFAULT_MANIFEST
+from search_douyin import DouyinSearcher
+from cookie_pool import CookiePool
+from proxy_pool import ProxyPool, DEFAULT_CHECK_INTERVAL
+
+logger = logging.getLogger('douyin_search.daemon')
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8960
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 每次启动随机生成的访问令牌，写在脚本目录下，daemon_client.py 读取后放在该请求头中
+TOKEN_HEADER = "X-Daemon-Token"
+
+JOB_TYPES = ("search", "download")
+
+# 任务状态
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# 内存中保留的已结束任务数，超过时丢弃最早的
+MAX_FINISHED = 500
+
+# 事件流中没有新事件时发送进度心跳的间隔(秒)
+HEARTBEAT = 1.0
+
+
+def token_path(port):
+    """访问令牌文件的路径，按端口区分，daemon_client.py 中有相同的规则"""
+    return os.path.join(SCRIPT_DIR, f".daemon_token_{port}")
+
+
+class JobError(ValueError):
+    """任务参数无效"""
+
+
+class Job:
+    """一个搜索或下载任务及其事件记录"""
+
+    def __init__(self, job_id, kind, params):
+        self.id = job_id
+        self.kind = kind
+        self.params = params
+        self.state = QUEUED
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        # 下载进度，由 file 事件累计
+        self.files = 0
+        self.failed_files = 0
+        self.bytes = 0
+        self.events = []
+        self._cond = threading.Condition()
+
+    def add_event(self, record):
+        """接收 progress_output 的事件，可能在下载池的工作线程中调用"""
+        with self._cond:
+            if record.get("event") == "file":
+                if record.get("success"):
+                    self.files += 1
+                    self.bytes += record.get("bytes") or 0
+                else:
+                    self.failed_files += 1
+            self.events.append(dict(record, job=self.id))
+            self._cond.notify_all()
+
+    def set_state(self, state, result=None, error=None):
+        with self._cond:
+            self.state = state
+            if state == RUNNING:
+                self.started = time.time()
+            elif state in (DONE, FAILED):
+                self.finished = time.time()
+                self.result = result
+                self.error = error
+            self.events.append(dict(self._progress(), event="state"))
+            self._cond.notify_all()
+
+    @property
+    def ended(self):
+        return self.state in (DONE, FAILED)
+
+    def wait_events(self, index, timeout):
+        """
+        等待 index 之后的事件
+
+        Returns:
+            tuple: (新事件列表, 任务是否已结束)
+        """
+        with self._cond:
+            if len(self.events) <= index and not self.ended:
+                self._cond.wait(timeout)
+            return self.events[index:], self.ended
+
+    def _progress(self):
+        now = self.finished or time.time()
+        return {
+            "ts": round(time.time(), 3),
+            "job": self.id,
+            "state": self.state,
+            "files": self.files,
+            "failed_files": self.failed_files,
+            "bytes": self.bytes,
+            "elapsed": round(now - self.started, 3) if self.started else 0,
+        }
+
+    def heartbeat(self):
+        with self._cond:
+            return dict(self._progress(), event="progress")
+
+    def summary(self, full=False):
+        with self._cond:
+            data = dict(self._progress(), type=self.kind, params=self.params, created=round(self.created, 3),
+                        error=self.error)
+            if full:
+                data["result"] = self.result
+            return data
+
+
+class DownloadDaemon:
+    """
+    下载守护进程
+
+    搜索器（cookie、cookie池、代理池、下载清单）和下载池在启动时创建，之后的任务都复用它们，
+    HTTP连接、CDN主机评分和签名库的导入都只发生一次。任务在 jobs 个线程中执行，
+    每个任务的 emit()/notify() 事件通过 progress_output.capture() 记入该任务
+    """
+
+    def __init__(self, searcher, pool, host=DEFAULT_HOST, port=DEFAULT_PORT, jobs=2):
+        """
+        Args:
+            searcher (DouyinSearcher): 共用的搜索器
+            pool (DownloadPool): 共用的下载池，由守护进程负责打开和关闭
+            host (str, optional): 监听地址，只应监听本机. Defaults to DEFAULT_HOST.
+            port (int, optional): 端口，0表示随机. Defaults to DEFAULT_PORT.
+            jobs (int, optional): 同时执行的任务数. Defaults to 2.
+        """
+        self.searcher = searcher
+        self.pool = pool
+        self.jobs = OrderedDict()
+        self.started = time.time()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, jobs), thread_name_prefix="job")
+        handler = type("Handler", (DaemonHandler,), {"daemon": self})
+        self.httpd = DaemonServer((host, port), handler)
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self.token = secrets.token_hex(16)
+        self.token_path = token_path(self.httpd.server_address[1])
+        self._thread = None
+
+    def start(self):
+        self._write_token()
+        self.pool.__enter__()
+        self._warm_up()
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="daemon-http", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self._executor.shutdown(wait=True)
+        self.pool.__exit__(None, None, None)
+        if self.searcher.cookie_store:
+            self.searcher.cookie_store.stop_refresh()
+        if self.searcher.proxy_pool:
+            self.searcher.proxy_pool.stop()
+        try:
+            os.remove(self.token_path)
+        except OSError:
+            pass
+
+    def _write_token(self):
+        """令牌文件只允许当前用户读写，其他用户和浏览器中的网页拿不到令牌"""
+        tmp = self.token_path + ".tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(self.token)
+        os.replace(tmp, self.token_path)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def wait(self):
+        """阻塞到收到 /shutdown 或 Ctrl+C"""
+        while self._thread.is_alive():
+            self._thread.join(0.5)
+
+    def _warm_up(self):
+        """提前导入签名库，第一个任务不再承担导入耗时"""
+        try:
+            importlib.import_module("f2.apps.douyin.utils.xbogus")
+        except ImportError:
+            logger.info("未安装f2，签名使用本地服务或基本参数")
+
+    # ------------------------------------------------------------------
+    # 任务
+    # ------------------------------------------------------------------
+
+    def submit(self, kind, params):
+        """
+        校验参数并排队执行
+
+        Raises:
+            JobError: 任务类型或参数无效
+        """
+        if kind not in JOB_TYPES:
+            raise JobError(f"未知的任务类型: {kind}，可选: {', '.join(JOB_TYPES)}")
+        if kind == "search" and not str(params.get("keyword") or "").strip():
+            raise JobError("search 任务需要 keyword")
+        if kind == "download" and not (params.get("aweme_ids") or params.get("videos")):
+            raise JobError("download 任务需要 aweme_ids 或 videos")
+
+        with self._lock:
+            job = Job(next(self._ids), kind, params)
+            self.jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job)
+        logger.info(f"任务 {job.id} ({kind}) 已排队")
+        return job
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.ended]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def _run(self, job):
+        job.set_state(RUNNING)
+        try:
+            with progress_output.capture(job.add_event):
+                result = self._search(job.params) if job.kind == "search" else self._download(job.params)
+        except Exception as e:
+            logger.exception(f"任务 {job.id} 失败")
+            job.set_state(FAILED, error=str(e))
+            return
+        failed = any(not r["success"] for r in result.get("downloads", []))
+        job.set_state(FAILED if failed else DONE, result=result,
+                      error="部分作品下载失败" if failed else None)
+        logger.info(f"任务 {job.id} 结束: {job.state}")
+
+    def _download_options(self, params):
+        return {
+            "download_dir": params.get("dir"),
+            "save_to_file": False,
+            "stream_policy": params.get("quality", "best"),
+            "force": bool(params.get("force")),
+            "image_format": params.get("image_format", "webp"),
+            "pool": self.pool,
+        }
+
+    def _search(self, params):
+        videos = self.searcher.search(params["keyword"], int(params.get("count", 20)))
+        result = {"count": len(videos), "aweme_ids": [video["aweme_id"] for video in videos]}
+        if params.get("download") and videos:
+            result["downloads"] = self.searcher.download_videos(videos, **self._download_options(params))
+        return result
+
+    def _download(self, params):
+        videos = params.get("videos")
+        failed = []
+        if not videos:
+            # 只有作品ID时先获取作品信息，和其他任务一样走共享的下载池
+            videos = []
+            for aweme_id in params["aweme_ids"]:
+                aweme_id = str(aweme_id)
+                try:
+                    video = self.searcher.fetch_detail(aweme_id)
+                    message = "作品不存在或已删除"
+                except Exception as e:
+                    video = None
+                    message = f"获取作品信息失败: {str(e)}"
+                if video is None:
+                    logger.warning(f"作品 {aweme_id} {message}")
+                    failed.append({"video_id": aweme_id, "desc": "", "success": False, "message": message})
+                else:
+                    videos.append(video)
+        downloads = self.searcher.download_videos(videos, **self._download_options(params)) if videos else []
+        return {"downloads": downloads + failed}
+
+    def status(self):
+        with self._lock:
+            states = {}
+            for job in self.jobs.values():
+                states[job.state] = states.get(job.state, 0) + 1
+        data = {
+            "pid": os.getpid(),
+            "uptime": round(time.time() - self.started, 1),
+            "jobs": states,
+            "base_url": self.searcher.base_url,
+        }
+        if self.searcher.cookie_pool:
+            data["cookie_pool"] = self.searcher.cookie_pool.stats()
+        if self.searcher.proxy_pool:
+            data["proxy_pool"] = self.searcher.proxy_pool.stats()
+        return data
+
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    """
+    守护进程的HTTP接口
+
+    POST /jobs               {"type": "search"|"download", ...} 提交任务，返回任务ID
+    GET  /jobs               所有任务的摘要
+    GET  /jobs/<id>          任务摘要和结果
+    GET  /jobs/<id>/events   任务事件，每行一个JSON，?follow=1 时持续输出到任务结束，?from=N 从第N个事件开始
+    GET  /status             任务计数、cookie池和代理池统计
+    POST /shutdown           停止守护进程
+
+    所有请求都要在 X-Daemon-Token 头中带上启动时写入 token_path() 的令牌，POST的Content-Type必须是application/json；
+    带Origin头的请求（浏览器中的网页发出）一律拒绝，防止网页向本机端口提交任务或停止守护进程
+    """
+
+    protocol_version = "HTTP/1.1"
+    daemon = None
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _job(self, parts):
+        job = self.daemon.get(int(parts[1])) if parts[1].isdigit() else None
+        if job is None:
+            self._send_json(404, {"error": f"任务不存在: {parts[1]}"})
+        return job
+
+    def _authorized(self):
+        """校验来源和令牌，不通过时已返回错误"""
+        if self.headers.get("Origin"):
+            self._send_json(403, {"error": "不接受浏览器发出的请求"})
+            return False
+        token = self.headers.get(TOKEN_HEADER) or ""
+        if not hmac.compare_digest(token.encode("utf-8"), self.daemon.token.encode("utf-8")):
+            self._send_json(401, {"error": f"缺少或错误的 {TOKEN_HEADER}，令牌见 {self.daemon.token_path}"})
+            return False
+        return True
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        parts = url.path.strip("/").split("/")
+
+        if parts == ["status"]:
+            return self._send_json(200, self.daemon.status())
+        if parts == ["jobs"]:
+            with self.daemon._lock:
+                jobs = list(self.daemon.jobs.values())
+            return self._send_json(200, [job.summary() for job in jobs])
+        if len(parts) == 2 and parts[0] == "jobs":
+            job = self._job(parts)
+            if job:
+                self._send_json(200, job.summary(full=True))
+            return
+        if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "events":
+            job = self._job(parts)
+            if job:
+                self._stream(job, int(query.get("from", 0)), query.get("follow") not in (None, "", "0"))
+            return
+        self._send_json(404, {"error": f"未知的路径: {url.path}"})
+
+    def do_POST(self):
+        path = urlparse(self.path).path.rstrip("/")
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if not self._authorized():
+            return
+        # 浏览器不经预检只能发出 text/plain 等简单请求
+        if self.headers.get_content_type() != "application/json":
+            return self._send_json(415, {"error": "Content-Type 必须是 application/json"})
+
+        if path == "/shutdown":
+            self._send_json(200, {"ok": True})
+            threading.Thread(target=self.daemon.httpd.shutdown, daemon=True).start()
+            return
+        if path != "/jobs":
+            return self._send_json(404, {"error": f"未知的路径: {path}"})
+        try:
+            params = json.loads(body or b"{}")
+            if not isinstance(params, dict):
+                raise JobError("请求体应为JSON对象")
+            job = self.daemon.submit(params.pop("type", None), params)
+        except (ValueError, JobError) as e:
+            return self._send_json(400, {"error": str(e)})
+        self._send_json(202, {"id": job.id, "state": job.state})
+
+    def _stream(self, job, index, follow):
+        """逐行输出事件，不带Content-Length，结束后关闭连接"""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            while True:
+                events, ended = job.wait_events(index, HEARTBEAT if follow else 0)
+                index += len(events)
+                lines = [json.dumps(event, ensure_ascii=False) for event in events]
+                if follow and not events and not ended:
+                    lines.append(json.dumps(job.heartbeat(), ensure_ascii=False))
+                if lines:
+                    self.wfile.write(("\n".join(lines) + "\n").encode("utf-8"))
+                    self.wfile.flush()
+                if ended or not follow:
+                    return
+        except (BrokenPipeError, ConnectionResetError):
+            logger.debug(f"任务 {job.id} 的事件流被客户端断开")
+
+
+class DaemonServer(ThreadingHTTPServer):
+    """事件流的客户端断开是预期行为，不打印堆栈"""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        logger.debug(f"客户端 {client_address} 连接异常")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="抖音搜索和下载守护进程，任务通过 daemon_client.py 提交")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"监听地址，默认{DEFAULT_HOST}，只用令牌文件认证，不要监听公网地址")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"端口，默认{DEFAULT_PORT}")
+    parser.add_argument("--jobs", type=int, default=2, help="同时执行的任务数，默认2")
+    parser.add_argument("--cookie", help="抖音cookie")
+    parser.add_argument("--auto-cookie", action="store_true", help="自动获取cookie，优先使用cookie缓存")
+    parser.add_argument("--cookie-pool", metavar="PATH", help="多账号cookie池，见 search_cli.py --cookie-pool")
+    parser.add_argument("--proxy-pool", metavar="FILE", help="代理池文件，见 search_cli.py --proxy-pool")
+    parser.add_argument("--proxy-check-url", help="代理健康检查地址，默认使用接口地址的首页")
+    parser.add_argument("--proxy-check-interval", type=int, default=DEFAULT_CHECK_INTERVAL,
+                        help=f"代理健康检查间隔(秒)，默认{DEFAULT_CHECK_INTERVAL}")
+    parser.add_argument("--no-server", action="store_true", help="不使用本地签名服务器")
+    parser.add_argument("--base-url", help="接口地址，默认https://www.douyin.com，可指向本地回放服务 replay_server.py")
+    parser.add_argument("--signer-url", help="本地签名服务地址，默认http://localhost:8889")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST, help="下载清单路径")
+    parser.add_argument("--no-manifest", action="store_true", help="不使用下载清单")
+    parser.add_argument("-j", "--concurrency", type=int, default=4, help="所有任务共享的下载并发数，默认4")
+    parser.add_argument("--per-host", type=int, default=2, help="每个CDN主机的并发上限，默认2")
+    parser.add_argument("--limit-rate", help="所有下载共享的带宽上限，如 500K、2M，默认不限速")
+    parser.add_argument("--connections", type=int, default=1, help="单个大文件并行下载的连接数，默认1")
+    parser.add_argument("--on-mismatch", choices=["retry", "quarantine", "mark"], default="retry",
+                        help="大小或MD5与接口不符时的处理，默认retry")
+    parser.add_argument("--debug", action="store_true", help="启用调试模式")
+    args = parser.parse_args()
+
+    # 守护进程没有交互界面，进度只通过任务事件返回
+    progress_output.configure(headless=True)
+    if args.debug:
+        logging.getLogger('douyin_search').setLevel(logging.DEBUG)
+
+    proxy_pool = None
+    if args.proxy_pool:
+        proxy_pool = ProxyPool.from_file(
+            args.proxy_pool,
+            check_url=args.proxy_check_url or (args.base_url or "https://www.douyin.com").rstrip("/") + "/",
+            check_interval=args.proxy_check_interval
+        ).start()
+    searcher = DouyinSearcher(
+        cookie=args.cookie,
+        auto_cookie=args.auto_cookie,
+        use_local_server=not args.no_server,
+        manifest_path=None if args.no_manifest else args.manifest,
+        base_url=args.base_url,
+        signer_url=args.signer_url,
+        cookie_pool=CookiePool.from_path(args.cookie_pool) if args.cookie_pool else None,
+        proxy_pool=proxy_pool
+    )
+    pool = DownloadPool(
+        concurrency=args.concurrency,
+        per_host=args.per_host,
+        bandwidth_limit=args.limit_rate,
+        host_overrides={host_of(searcher.base_url): 1},
+        headers={"User-Agent": searcher.headers["User-Agent"]},
+        show_progress=False,
+        connections=args.connections,
+        on_mismatch=args.on_mismatch,
+        proxy_pool=proxy_pool
+    )
+
+    daemon = DownloadDaemon(searcher, pool, args.host, args.port, args.jobs)
+    with daemon:
+        logger.info(f"守护进程已启动: {daemon.url}")
+        try:
+            daemon.wait()
+        except KeyboardInterrupt:
+            pass
+        logger.info("守护进程正在停止，等待进行中的任务结束")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 守护进程 (daemon.py) 的命令行客户端，只依赖标准库，启动时不导入搜索和下载模块
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import sys
+import json
+import argparse
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlparse
+from urllib.request import Request, urlopen
+
+DEFAULT_URL = os.environ.get("DOUYIN_DAEMON_URL", "http://127.0.0.1:8960")
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 守护进程启动时生成的访问令牌，见 daemon.py 的 token_path()
+TOKEN_HEADER = "X-Daemon-Token"
+
+
+def read_token(url):
+    """读取守护进程写在脚本目录下的令牌，可用环境变量 DOUYIN_DAEMON_TOKEN 指定，读取不到时返回None"""
+    if os.environ.get("DOUYIN_DAEMON_TOKEN"):
+        return os.environ["DOUYIN_DAEMON_TOKEN"]
+    port = urlparse(url).port or 80
+    try:
+        with open(os.path.join(SCRIPT_DIR, f".daemon_token_{port}"), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+class DaemonClient:
+    """守护进程HTTP接口的简单封装，供脚本直接使用"""
+
+    def __init__(self, url=DEFAULT_URL, timeout=10, token=None):
+        """
+        Args:
+            url (str, optional): 守护进程地址. Defaults to DEFAULT_URL.
+            timeout (int, optional): 请求超时(秒). Defaults to 10.
+            token (str, optional): 访问令牌，默认按 read_token() 读取. Defaults to None.
+        """
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.token = token
+
+    def _headers(self):
+        # 每次请求时读取，守护进程重启后令牌会变
+        token = self.token or read_token(self.url)
+        return {TOKEN_HEADER: token} if token else {}
+
+    def _request(self, method, path, data=None):
+        body = json.dumps(data if data is not None else {}, ensure_ascii=False).encode("utf-8") if method == "POST" else None
+        headers = self._headers()
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+        request = Request(self.url + path, data=body, method=method, headers=headers)
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read() or b"null")
+        except HTTPError as e:
+            message = json.loads(e.read() or b"{}").get("error", str(e))
+            raise RuntimeError(message) from None
+
+    def submit(self, kind, **params):
+        """提交任务，返回任务ID"""
+        return self._request("POST", "/jobs", dict(params, type=kind))["id"]
+
+    def job(self, job_id):
+        return self._request("GET", f"/jobs/{job_id}")
+
+    def jobs(self):
+        return self._request("GET", "/jobs")
+
+    def status(self):
+        return self._request("GET", "/status")
+
+    def shutdown(self):
+        return self._request("POST", "/shutdown")
+
+    def events(self, job_id, follow=True, start=0):
+        """
+        逐个产出任务事件，follow=True 时持续到任务结束
+
+        Yields:
+            dict: 事件
+        """
+        path = f"/jobs/{job_id}/events?from={start}&follow={1 if follow else 0}"
+        # 事件流中每秒至少有一行心跳，超时说明守护进程已无响应
+        with urlopen(Request(self.url + path, headers=self._headers()), timeout=max(self.timeout, 30)) as response:
+            for line in response:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def describe(event):
+    """把事件转成一行文字"""
+    kind = event.get("event")
+    if kind == "state":
+        return f"[任务 {event['job']}] 状态: {event['state']}"
+    if kind == "progress":
+        return (f"[任务 {event['job']}] 已完成 {event['files']} 个文件，"
+                f"{event['bytes'] / 1024 / 1024:.1f}MB，{event['elapsed']:.0f}s")
+    if kind == "file":
+        if event.get("success"):
+            return f"[任务 {event['job']}] 完成 {event['path']} ({(event.get('bytes') or 0) / 1024:.0f}KB)"
+        return f"[任务 {event['job']}] 失败 {event['path']}: {event.get('error')}"
+    if kind == "search":
+        return f"[任务 {event['job']}] 搜索 {event['keyword']} 找到 {event['count']} 个作品"
+    if kind == "download_start":
+        return f"[任务 {event['job']}] 开始下载 {event['videos']} 个作品"
+    if kind == "download":
+        return f"[任务 {event['job']}] 下载结束: {event.get('success', 0)}/{event.get('total', 0)} 成功"
+    return None
+
+
+def follow(client, job_id, as_json):
+    """输出事件直到任务结束，返回退出码"""
+    state = None
+    for event in client.events(job_id):
+        if as_json:
+            print(json.dumps(event, ensure_ascii=False), flush=True)
+        else:
+            text = describe(event)
+            if text:
+                print(text, flush=True)
+        if event.get("event") == "state":
+            state = event["state"]
+    job = client.job(job_id)
+    if not as_json and job.get("error"):
+        print(f"[任务 {job_id}] {job['error']}", file=sys.stderr)
+    return 0 if state == "done" else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向守护进程 (daemon.py) 提交搜索和下载任务")
+    parser.add_argument("--url", default=DEFAULT_URL, help=f"守护进程地址，默认{DEFAULT_URL}，也可设置环境变量 DOUYIN_DAEMON_URL")
+    parser.add_argument("--json", action="store_true", help="按原样输出JSON事件行")
+    parser.add_argument("--detach", action="store_true", help="提交后只输出任务ID，不等待结束")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search = commands.add_parser("search", help="搜索关键词，可选同时下载")
+    search.add_argument("keyword", help="搜索关键词")
+    search.add_argument("-c", "--count", type=int, default=20, help="搜索数量，默认20")
+    search.add_argument("--download", action="store_true", help="搜索后下载")
+
+    download = commands.add_parser("download", help="下载指定作品")
+    download.add_argument("aweme_ids", nargs="+", help="作品ID")
+
+    for sub in (search, download):
+        sub.add_argument("-d", "--dir", help="下载目录")
+        sub.add_argument("--quality", default="best", help="清晰度选择策略，默认best")
+        sub.add_argument("--force", action="store_true", help="忽略下载清单，重新下载")
+        sub.add_argument("--image-format", choices=["webp", "jpeg"], default="webp", help="图集作品的首选图片格式")
+
+    events = commands.add_parser("events", help="查看任务事件")
+    events.add_argument("job_id", type=int, help="任务ID")
+    commands.add_parser("jobs", help="列出任务")
+    commands.add_parser("status", help="守护进程状态")
+    commands.add_parser("shutdown", help="停止守护进程")
+    args = parser.parse_args()
+
+    client = DaemonClient(args.url)
+    try:
+        if args.command in ("search", "download"):
+            options = {"dir": args.dir, "quality": args.quality, "force": args.force, "image_format": args.image_format}
+            if args.command == "search":
+                job_id = client.submit("search", keyword=args.keyword, count=args.count, download=args.download, **options)
+            else:
+                job_id = client.submit("download", aweme_ids=args.aweme_ids, **options)
+            if args.detach:
+                print(job_id)
+                return 0
+            return follow(client, job_id, args.json)
+        if args.command == "events":
+            return follow(client, args.job_id, args.json)
+        if args.command == "jobs":
+            for job in client.jobs():
+                print(json.dumps(job, ensure_ascii=False) if args.json else
+                      f"{job['job']}\t{job['type']}\t{job['state']}\t{job['files']} 个文件\t{job['elapsed']:.1f}s")
+            return 0
+        result = client.status() if args.command == "status" else client.shutdown()
+        print(json.dumps(result, ensure_ascii=False, indent=None if args.json else 2))
+        return 0
+    except URLError as e:
+        print(f"无法连接守护进程 {args.url}: {e.reason}，请先运行 python daemon.py", file=sys.stderr)
+        return 2
+    except RuntimeError as e:
+        print(f"守护进程返回错误: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 按内容哈希去重，同一文件在不同关键词、转发和用户下只保存一份
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import logging
+
+logger = logging.getLogger('douyin_search.dedup')
+
+# 记录的存储方式
+STORAGE_FILE = "file"           # 独立的文件
+STORAGE_HARDLINK = "hardlink"   # 指向已有文件的硬链接
+STORAGE_REFERENCE = "reference" # 无法硬链接时只在清单中引用已有文件
+STORAGE_EXTERNAL = "external"   # 由 TikTokTool.py 下载，清单中没有文件路径
+
+
+def same_file(a, b):
+    """两个路径是否指向同一个文件（同一inode）"""
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+
+def link_existing(source, target):
+    """
+    让target成为source的硬链接，target已存在时原子地替换
+
+    Args:
+        source (str): 已有文件
+        target (str): 目标路径
+
+    Returns:
+        bool: 成功时返回True；跨文件系统或文件系统不支持硬链接时返回False
+    """
+    if same_file(source, target):
+        return True
+
+    directory = os.path.dirname(target)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = target + ".link"
+    try:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        os.link(source, tmp)
+        os.replace(tmp, target)
+        return True
+    except OSError as e:
+        logger.debug(f"无法创建硬链接 {source} -> {target}: {str(e)}")
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return False
+
+
+def reuse(manifest, target, file_hash=None, uri=None, variant=None):
+    """
+    下载前查找内容相同的已有文件，找到时在target处创建硬链接
+
+    Args:
+        manifest (DownloadManifest): 下载清单
+        target (str): 本次下载的目标路径
+        file_hash (str, optional): 接口给出的file_hash. Defaults to None.
+        uri (str, optional): 视频流的uri. Defaults to None.
+        variant (str, optional): 清晰度，与uri一起匹配. Defaults to None.
+
+    Returns:
+        dict|None: {"path", "size", "hash", "storage", "source"}，没有可复用的文件时返回None
+    """
+    record = manifest.find_content(file_hash=file_hash, uri=uri, variant=variant)
+    if not record:
+        return None
+
+    source = record["path"]
+    if link_existing(source, target):
+        storage, path = STORAGE_HARDLINK, target
+    else:
+        storage, path = STORAGE_REFERENCE, source
+    logger.info(f"复用已有文件 {source} ({storage})")
+    return {
+        "path": path,
+        "size": record["size"],
+        "hash": record["hash"],
+        "storage": storage,
+        "source": source,
+    }
+
+
+def collapse(manifest, path, md5):
+    """
+    下载完成后，如果清单中已有相同MD5的文件，把新文件替换为它的硬链接
+
+    接口没有给出file_hash或uri不同(重新上传的同一视频)时，只能在下载后发现重复。
+    无法硬链接时保留新文件。
+
+    Args:
+        manifest (DownloadManifest): 下载清单
+        path (str): 刚下载完成的文件
+        md5 (str): 下载时计算的MD5
+
+    Returns:
+        str: 存储方式，STORAGE_FILE 或 STORAGE_HARDLINK
+    """
+    if not md5:
+        return STORAGE_FILE
+    record = manifest.find_content(file_hash=md5, exclude_path=path)
+    if record and link_existing(record["path"], path):
+        logger.info(f"{path} 与 {record['path']} 内容相同，已替换为硬链接")
+        return STORAGE_HARDLINK
+    return STORAGE_FILE
+
+
+def deduplicate(manifest, dry_run=False):
+    """
+    把清单中哈希相同的已有文件合并为硬链接
+
+    Args:
+        manifest (DownloadManifest): 下载清单
+        dry_run (bool, optional): 只统计不修改. Defaults to False.
+
+    Returns:
+        dict: {"groups": 重复组数, "linked": 合并的文件数, "saved": 节省的字节数, "failed": [路径]}
+    """
+    report = {"groups": 0, "linked": 0, "saved": 0, "failed": []}
+    for group in manifest.duplicate_groups():
+        files = [row for row in group if row["path"] and os.path.isfile(row["path"])]
+        if len(files) < 2:
+            continue
+        report["groups"] += 1
+        source = files[0]
+        for row in files[1:]:
+            if same_file(source["path"], row["path"]):
+                continue
+            size = os.path.getsize(row["path"])
+            if dry_run or link_existing(source["path"], row["path"]):
+                report["linked"] += 1
+                report["saved"] += size
+                if not dry_run:
+                    manifest.set_storage(row["aweme_id"], row["variant"], STORAGE_HARDLINK)
+            else:
+                report["failed"].append(row["path"])
+    return report
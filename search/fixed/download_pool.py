@@ -0,0 +1,340 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 并发下载池 (全局并发、按CDN主机限流、共享带宽上限)
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+from rich.progress import (
+    BarColumn,
+    DownloadColumn,
+    TextColumn,
+    TimeRemainingColumn,
+    TransferSpeedColumn,
+)
+from cdn_hosts import HostScoreboard, host_of
+from range_download import RangeDownloader
+from tracing import tracer
+import progress_output
+
+logger = logging.getLogger('douyin_search.download')
+
+# 下载时使用的默认请求头，CDN会校验Referer
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
+    "Referer": "https://www.douyin.com/",
+}
+
+
+def parse_rate(value):
+    """
+    解析带宽字符串，例如 "500K"、"2M"、"1.5MB"
+
+    Args:
+        value (str|int|None): 带宽描述，单位为字节/秒
+
+    Returns:
+        int|None: 字节/秒，None表示不限速
+    """
+    if value in (None, "", 0, "0"):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+
+    match = re.fullmatch(r"\s*([\d.]+)\s*([kKmMgG]?)[bB]?\s*", str(value))
+    if not match:
+        raise ValueError(f"无法解析的带宽: {value}")
+
+    number, unit = match.groups()
+    scale = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}[unit.lower()]
+    return int(float(number) * scale)
+
+
+class BandwidthLimiter:
+    """令牌桶限速器，由所有下载线程共享"""
+
+    def __init__(self, rate=None, burst=None):
+        """
+        Args:
+            rate (int, optional): 字节/秒，None表示不限速. Defaults to None.
+            burst (int, optional): 桶容量，默认为一秒的流量. Defaults to None.
+        """
+        self.rate = rate
+        self.capacity = burst or rate or 0
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, nbytes):
+        """取走nbytes个令牌，不足时阻塞等待"""
+        if not self.rate:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+
+                # 单个块大于桶容量时允许透支，避免永远等不到
+                if self._tokens >= min(nbytes, self.capacity):
+                    self._tokens -= nbytes
+                    return
+                wait_time = (min(nbytes, self.capacity) - self._tokens) / self.rate
+
+            time.sleep(wait_time)
+
+
+class HostLimiter:
+    """按主机限制同时进行的连接数"""
+
+    def __init__(self, per_host=2, overrides=None):
+        """
+        Args:
+            per_host (int, optional): 每个主机的默认并发上限. Defaults to 2.
+            overrides (dict, optional): 指定主机的并发上限，如 {"www.douyin.com": 1}. Defaults to None.
+        """
+        self.per_host = per_host
+        self.overrides = overrides or {}
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, host):
+        with self._lock:
+            if host not in self._semaphores:
+                limit = self.overrides.get(host, self.per_host)
+                self._semaphores[host] = threading.BoundedSemaphore(max(1, limit))
+            return self._semaphores[host]
+
+    @contextmanager
+    def acquire(self, host):
+        """占用一个主机连接名额"""
+        semaphore = self._semaphore(host)
+        semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+
+class DownloadPool:
+    """
+    并发下载池
+
+    所有任务共享同一个线程池、HTTP连接池和带宽上限，
+    进度条显示每个文件的进度以及总体进度。
+    """
+
+    def __init__(self, concurrency=4, per_host=2, bandwidth_limit=None,
+                 host_overrides=None, headers=None, show_progress=True, connections=1,
+                 scoreboard=None, on_mismatch="retry", proxy_pool=None):
+        """
+        初始化下载池
+
+        Args:
+            concurrency (int, optional): 全局并发数. Defaults to 4.
+            per_host (int, optional): 每个CDN主机的并发上限. Defaults to 2.
+            bandwidth_limit (int|str, optional): 共享带宽上限，如 "2M". Defaults to None.
+            host_overrides (dict, optional): 指定主机的并发上限. Defaults to None.
+            headers (dict, optional): 下载请求头. Defaults to None.
+            show_progress (bool, optional): 是否显示进度条. Defaults to True.
+            connections (int, optional): 单个大文件并行下载的连接数. Defaults to 1.
+            scoreboard (HostScoreboard, optional): CDN主机评分表，默认加载并保存 host_scores.json. Defaults to None.
+            on_mismatch (str, optional): 大小或哈希校验失败时的处理: retry、quarantine、mark. Defaults to "retry".
+            proxy_pool (ProxyPool, optional): 代理池，每个文件按延迟选择一个代理下载并记录吞吐. Defaults to None.
+        """
+        self.concurrency = max(1, concurrency)
+        self.hosts = HostLimiter(per_host, host_overrides)
+        self.bandwidth = BandwidthLimiter(parse_rate(bandwidth_limit))
+        self.headers = dict(DEFAULT_HEADERS, **(headers or {}))
+        self.connections = connections
+        self.scoreboard = scoreboard or HostScoreboard()
+        self.on_mismatch = on_mismatch
+        self.proxy_pool = proxy_pool
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency * max(1, connections))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="download")
+        # 未结束的任务，结束后移除，常驻的下载池不会无限增长
+        self._futures = set()
+        self._jobs = 0
+        self._done = 0
+        self._lock = threading.Lock()
+
+        self.progress = progress_output.progress(
+            "download",
+            TextColumn("[bold blue]{task.description}", justify="left"),
+            BarColumn(),
+            "[progress.percentage]{task.percentage:>3.0f}%",
+            DownloadColumn(),
+            TransferSpeedColumn(),
+            TimeRemainingColumn(),
+            disable=not show_progress,
+        )
+        self._total_task = None
+
+    def __enter__(self):
+        self.progress.start()
+        self._total_task = self.progress.add_task("[cyan]总进度 0/0", total=None, summary=True)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.wait()
+        self._executor.shutdown(wait=True)
+        self.progress.stop()
+        self.session.close()
+        self.scoreboard.save()
+
+    def _update_total(self):
+        self.progress.update(self._total_task, description=f"[cyan]总进度 {self._done}/{self._jobs}")
+
+    def _add_job(self, description):
+        with self._lock:
+            self._jobs += 1
+            self._update_total()
+        return self.progress.add_task(description, total=None)
+
+    def _finish_job(self, task_id):
+        with self._lock:
+            self._done += 1
+            self._update_total()
+        self.progress.remove_task(task_id)
+
+    def submit(self, description, func, *args, host=None, **kwargs):
+        """
+        提交一个通用任务，例如调用TikTokTool.py的子进程
+
+        Args:
+            description (str): 进度条上显示的任务名
+            func (callable): 任务函数
+            host (str, optional): 任务访问的主机，用于按主机限流. Defaults to None.
+
+        Returns:
+            Future: 任务的Future对象，结果为func的返回值
+        """
+        task_id = self._add_job(description)
+        parent = tracer.current()
+        sink = progress_output.current_sink()
+
+        def run():
+            try:
+                with progress_output.capture(sink), \
+                        tracer.span("download.job", parent=parent, description=description, host=host or ""):
+                    if host:
+                        with self.hosts.acquire(host):
+                            return func(*args, **kwargs)
+                    return func(*args, **kwargs)
+            finally:
+                self._finish_job(task_id)
+
+        future = self._executor.submit(run)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._forget)
+        return future
+
+    def fetch(self, urls, path, description=None, expected_size=None, expected_hash=None):
+        """
+        提交一个HTTP下载任务，支持断点续传，先写入.part文件，完成后再重命名
+
+        Args:
+            urls (str|list): 下载地址，或同一资源的多个CDN镜像地址，按测速结果选择并在失败时切换
+            path (str): 保存路径
+            description (str, optional): 进度条上显示的任务名. Defaults to None.
+            expected_size (int, optional): 预期大小，下载时边写边统计. Defaults to None.
+            expected_hash (str, optional): 预期MD5，下载时边写边计算. Defaults to None.
+
+        Returns:
+            Future: 结果为 RangeDownloader.download() 返回的字典
+        """
+        task_id = self._add_job(description or os.path.basename(path))
+        parent = tracer.current()
+        sink = progress_output.current_sink()
+
+        def run():
+            try:
+                with progress_output.capture(sink), tracer.span("download.file", parent=parent, path=path) as span:
+                    try:
+                        result = self._download(urls, path, task_id, expected_size, expected_hash)
+                    except Exception as e:
+                        progress_output.notify("file", path=path, success=False, error=str(e))
+                        raise
+                    span.set(bytes=result["size"], host=host_of(result["url"]), resumed=result["resumed"],
+                             verified=str(result["verified"]), write_ms=round(result["write_seconds"] * 1000, 3))
+                    progress_output.notify("file", path=path, success=True, bytes=result["size"],
+                                           verified=result["verified"])
+                    return result
+            finally:
+                self._finish_job(task_id)
+
+        future = self._executor.submit(run)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._forget)
+        return future
+
+    def _download(self, urls, path, task_id, expected_size=None, expected_hash=None):
+        """在当前线程中执行一次断点续传下载"""
+        proxy = self.proxy_pool.acquire() if self.proxy_pool else None
+        proxies = proxy.proxies if proxy else None
+
+        # 有多个镜像时先测一下没见过的主机
+        if not isinstance(urls, str) and len(urls) > 1:
+            self.scoreboard.probe(urls, self.session, self.headers, proxies=proxies)
+
+        transferred = [0]
+
+        def on_progress(nbytes):
+            transferred[0] += nbytes
+            self.progress.update(task_id, advance=nbytes)
+            self.progress.update(self._total_task, advance=nbytes)
+
+        downloader = RangeDownloader(
+            session=self.session,
+            headers=self.headers,
+            connections=self.connections,
+            bandwidth=self.bandwidth,
+            acquire=lambda url: self.hosts.acquire(host_of(url)),
+            on_total=lambda size: self.progress.update(task_id, total=size),
+            on_progress=on_progress,
+            scoreboard=self.scoreboard,
+            on_mismatch=self.on_mismatch,
+            proxies=proxies,
+        )
+        if not self.proxy_pool:
+            return downloader.download(urls, path, expected_size, expected_hash)
+
+        started = time.monotonic()
+        try:
+            result = downloader.download(urls, path, expected_size, expected_hash)
+        except requests.exceptions.RequestException:
+            self.proxy_pool.report(proxy, None, transferred[0], time.monotonic() - started)
+            raise
+        self.proxy_pool.report(proxy, 200, transferred[0], time.monotonic() - started)
+        return result
+
+    def _forget(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def wait(self):
+        """等待所有已提交的任务结束"""
+        with self._lock:
+            futures = list(self._futures)
+        wait(futures)
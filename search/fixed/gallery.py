@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 图集作品下载，同一作品的所有图片并发下载，全部完成后整体落盘
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import shutil
+import logging
+import threading
+from urllib.parse import urlparse
+
+logger = logging.getLogger('douyin_search.gallery')
+
+# 可选的图片格式，jpeg兼容性更好，webp体积更小
+IMAGE_FORMATS = ("webp", "jpeg")
+
+# 图集作品的aweme_type
+IMAGE_POST_TYPE = 68
+
+
+def format_of(url):
+    """从地址路径的扩展名判断图片格式"""
+    ext = os.path.splitext(urlparse(url).path)[1].lower().lstrip(".")
+    return "jpeg" if ext == "jpg" else ext
+
+
+def is_image_post(aweme):
+    """是否为图集作品"""
+    return bool(aweme.get("images")) or aweme.get("aweme_type") == IMAGE_POST_TYPE
+
+
+def extract_images(aweme, watermark=False):
+    """
+    从aweme中提取图集的所有图片，字段提取见 schemas.images_of()
+
+    Args:
+        aweme (dict): aweme_info
+        watermark (bool, optional): 是否使用带水印的download_url_list. Defaults to False.
+
+    Returns:
+        list: 图片列表，每项包含 index、uri、width、height 以及按格式分组的 urls
+    """
+    # schemas 导入了本模块的 format_of，这里在调用时导入
+    import schemas
+    return schemas.images_of(schemas.from_dict(schemas.Aweme, aweme), watermark)
+
+
+def choose_format(image, prefer="webp"):
+    """
+    选择图片的下载格式，首选格式不可用时退回到其他格式
+
+    Args:
+        image (dict): extract_images() 返回的一项
+        prefer (str, optional): 首选格式. Defaults to "webp".
+
+    Returns:
+        tuple: (格式, 地址列表)
+    """
+    for fmt in (prefer,) + tuple(f for f in IMAGE_FORMATS if f != prefer):
+        if image["urls"].get(fmt):
+            return fmt, image["urls"][fmt]
+    fmt, urls = next(iter(image["urls"].items()))
+    return fmt, urls
+
+
+class PostDownload:
+    """
+    一个图集作品的下载任务
+
+    图片先下载到 `.<aweme_id>.part/` 临时目录，全部成功后一次性重命名为 `<aweme_id>/`，
+    不会留下只有部分图片的作品目录。失败时保留临时目录，下次运行从断点继续。
+    """
+
+    def __init__(self, aweme_id, directory, total, on_complete=None):
+        self.aweme_id = aweme_id
+        self.path = os.path.join(directory, aweme_id)
+        self.staging = os.path.join(directory, f".{aweme_id}.part")
+        self.total = total
+        self.completed = 0
+        self.size = 0
+        self.errors = []
+        self.files = []
+        self._on_complete = on_complete
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+        self._result = None
+
+    def _image_done(self, future):
+        """单张图片下载结束时在工作线程中回调"""
+        try:
+            result = future.result()
+        except Exception as e:
+            self._image_finished(error=str(e))
+        else:
+            self._image_finished(result["path"], result["size"])
+
+    def _image_finished(self, path=None, size=0, error=None):
+        with self._lock:
+            if error:
+                self.errors.append(error)
+            else:
+                self.size += size
+                self.files.append(os.path.basename(path))
+            self.completed += 1
+            if self.completed < self.total:
+                return
+        self._finish()
+
+    def _finish(self):
+        if self.errors:
+            logger.error(f"图集 {self.aweme_id} 有 {len(self.errors)}/{self.total} 张图片下载失败")
+            self._result = {
+                "success": False,
+                "path": self.staging,
+                "message": f"{len(self.errors)}/{self.total} 张图片下载失败: {self.errors[0]}",
+            }
+        else:
+            try:
+                self._commit()
+                logger.info(f"图集 {self.aweme_id} 下载完成，共 {self.total} 张")
+                self._result = {
+                    "success": True,
+                    "path": self.path,
+                    "size": self.size,
+                    "count": self.total,
+                    "message": f"下载成功，共 {self.total} 张图片",
+                }
+            except OSError as e:
+                self._result = {"success": False, "path": self.staging, "message": f"保存图集失败: {str(e)}"}
+
+        if self._on_complete:
+            self._on_complete(self)
+        self._finished.set()
+
+    def _commit(self):
+        """把临时目录整体重命名为作品目录"""
+        if os.path.isdir(self.path):
+            # 重新下载时先把旧目录移开，rename不能覆盖非空目录
+            old = self.path + ".old"
+            shutil.rmtree(old, ignore_errors=True)
+            os.replace(self.path, old)
+            os.replace(self.staging, self.path)
+            shutil.rmtree(old, ignore_errors=True)
+        else:
+            os.replace(self.staging, self.path)
+
+    def result(self, timeout=None):
+        """
+        等待所有图片下载完成
+
+        Returns:
+            dict: {"success", "path", "message"}，成功时还有 size、count
+        """
+        self._finished.wait(timeout)
+        return self._result
+
+
+def submit_post(pool, aweme_id, images, directory, prefer="webp", on_complete=None):
+    """
+    把一个图集作品的所有图片提交到下载池
+
+    Args:
+        pool (DownloadPool): 下载池，与视频下载共享连接和带宽限制
+        aweme_id (str): 作品ID
+        images (list): extract_images() 的返回值
+        directory (str): 下载目录
+        prefer (str, optional): 首选图片格式，webp 或 jpeg. Defaults to "webp".
+        on_complete (callable, optional): 作品全部图片结束时的回调，参数为PostDownload. Defaults to None.
+
+    Returns:
+        PostDownload: 作品下载任务
+    """
+    post = PostDownload(aweme_id, directory, len(images), on_complete)
+    if not images:
+        post.errors.append("没有可下载的图片")
+        post._finish()
+        return post
+
+    os.makedirs(post.staging, exist_ok=True)
+    width = max(2, len(str(len(images))))
+    for image in images:
+        fmt, urls = choose_format(image, prefer)
+        path = os.path.join(post.staging, f"{image['index']:0{width}d}.{fmt}")
+        if os.path.exists(path):
+            # 上次运行已经下载完成的图片
+            post._image_finished(path, os.path.getsize(path))
+            continue
+        future = pool.fetch(urls, path, f"{aweme_id} 图{image['index']}/{len(images)}")
+        future.add_done_callback(post._image_done)
+    return post
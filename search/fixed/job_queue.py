@@ -0,0 +1,609 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 持久化的任务队列，支持租约、重试、优先级和死信，多个进程可以同时从同一个队列取任务
+              本地使用SQLite文件 (JobQueue)，多台机器共享时使用Redis (redis_backend.RedisJobQueue)，
+              两者接口相同，用 open_queue() 按地址选择；跨机器的作品去重见 open_seen()
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import sqlite3
+import logging
+import argparse
+import threading
+
+from rich.table import Table
+from progress_output import console
+
+logger = logging.getLogger('douyin_search.queue')
+
+# 默认队列文件，保存在脚本目录下
+DEFAULT_QUEUE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "job_queue.db")
+
+# 任务类型: 作品ID、用户sec_uid、搜索关键词
+JOB_KINDS = ("aweme", "user", "keyword")
+
+# 任务状态
+PENDING, LEASED, DONE, DEAD = "pending", "leased", "done", "dead"
+STATES = (PENDING, LEASED, DONE, DEAD)
+
+# 默认最多尝试次数，超过后进入死信
+DEFAULT_MAX_ATTEMPTS = 5
+
+# 默认租约时长(秒)，持有者在此期间没有续约或完成时，任务会被其他进程重新领取
+DEFAULT_LEASE = 300
+
+# 重试的等待时间(秒)，每次失败后加倍
+RETRY_BASE = 30
+RETRY_MAX = 3600
+
+# 统计各节点吞吐量的时间窗口(秒)
+THROUGHPUT_WINDOW = 300
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL DEFAULT '{}',
+    priority INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    available_at REAL NOT NULL,
+    lease_until REAL,
+    worker TEXT,
+    last_error TEXT,
+    result TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (kind, key)
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (state, priority DESC, available_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs (state, lease_until);
+"""
+
+# 本机各进程正在下载的作品，防止同时写同一个 .part 文件
+CLAIMS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS claims (
+    aweme_id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class PermanentError(Exception):
+    """重试也不会成功的错误（如作品已删除），任务直接进入死信"""
+
+
+class QueueJob:
+    """领取到的任务"""
+
+    __slots__ = ("id", "kind", "key", "payload", "priority", "attempts", "max_attempts", "worker")
+
+    def __init__(self, row, worker):
+        self.id = row["id"]
+        self.kind = row["kind"]
+        self.key = row["key"]
+        self.payload = json.loads(row["payload"])
+        self.priority = row["priority"]
+        self.attempts = row["attempts"]
+        self.max_attempts = row["max_attempts"]
+        self.worker = worker
+
+    @property
+    def node(self):
+        return node_of(self.worker)
+
+    def __repr__(self):
+        return f"<QueueJob {self.id} {self.kind}:{self.key} 第{self.attempts}次>"
+
+
+def default_worker_id(node=None):
+    """领取者标识 节点名:进程号，节点名默认为主机名"""
+    return f"{node or socket.gethostname()}:{os.getpid()}"
+
+
+def node_of(worker):
+    """从领取者标识中取出节点名"""
+    return worker.split(":", 1)[0] if worker else ""
+
+
+def is_remote(url):
+    return url.startswith(("redis://", "rediss://", "unix://"))
+
+
+def open_queue(url=DEFAULT_QUEUE, lease_seconds=DEFAULT_LEASE):
+    """
+    按地址打开任务队列
+
+    Args:
+        url (str, optional): SQLite文件路径，或 redis://host:6379/0 形式的Redis地址. Defaults to DEFAULT_QUEUE.
+        lease_seconds (int, optional): 租约时长(秒). Defaults to DEFAULT_LEASE.
+
+    Returns:
+        JobQueue|RedisJobQueue: 接口相同的队列
+    """
+    if is_remote(url):
+        from redis_backend import RedisJobQueue
+        return RedisJobQueue(url, lease_seconds=lease_seconds)
+    return JobQueue(url, lease_seconds=lease_seconds)
+
+
+def open_seen(url, manifest=None):
+    """
+    打开与队列配套的已下载作品集合，队列在Redis中时所有节点共用一个集合，否则使用本机的下载清单，领取记录在队列数据库中
+
+    Args:
+        url (str): 队列地址，同 open_queue()
+        manifest (DownloadManifest, optional): 本机的下载清单. Defaults to None.
+
+    Returns:
+        ManifestSeenSet|RedisSeenSet: 提供 missing()、claim()、record() 和 release()
+    """
+    if is_remote(url):
+        from redis_backend import RedisSeenSet
+        return RedisSeenSet(url)
+    return ManifestSeenSet(manifest, url)
+
+
+class ManifestSeenSet:
+    """
+    本机的已下载作品集合，直接查询下载清单
+
+    下载清单由 download_videos 写入；同一台机器上的进程通过队列数据库中的 claims 表领取作品，
+    同一时间只有一个进程下载同一个作品，record() 和 release() 删除领取记录，领取在 ttl 秒后也会自动失效
+    """
+
+    def __init__(self, manifest=None, path=None):
+        """
+        Args:
+            manifest (DownloadManifest, optional): 本机的下载清单. Defaults to None.
+            path (str, optional): 队列数据库路径，为None时不领取，各进程可能同时下载同一个作品. Defaults to None.
+        """
+        self.manifest = manifest
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(CLAIMS_SCHEMA)
+
+    def missing(self, aweme_ids):
+        """返回尚未下载的作品ID，保持原顺序"""
+        if self.manifest is None:
+            return list(aweme_ids)
+        return self.manifest.missing(aweme_ids)
+
+    def claim(self, aweme_ids, owner, ttl=DEFAULT_LEASE):
+        """
+        领取尚未下载且没有其他进程正在下载的作品，返回领取到的作品ID，保持原顺序
+
+        同一领取者再次领取时延长领取时间，下载期间由心跳定期调用续期
+        """
+        missing = self.missing(aweme_ids)
+        if self._conn is None or not missing:
+            return missing
+        now = time.time()
+        claimed = []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM claims WHERE expires_at <= ?", (now,))
+                for aweme_id in missing:
+                    inserted = self._conn.execute(
+                        "INSERT OR IGNORE INTO claims (aweme_id, owner, expires_at) VALUES (?, ?, ?)",
+                        (aweme_id, owner, now + ttl)).rowcount
+                    # 自己之前的领取（任务重试或心跳续期）续期后仍算领取到
+                    if inserted or self._conn.execute(
+                            "UPDATE claims SET expires_at = ? WHERE aweme_id = ? AND owner = ?",
+                            (now + ttl, aweme_id, owner)).rowcount:
+                        claimed.append(aweme_id)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return claimed
+
+    def _settle(self, aweme_ids, owner):
+        if self._conn is None:
+            return
+        with self._lock:
+            self._conn.executemany("DELETE FROM claims WHERE aweme_id = ? AND owner = ?",
+                                   [(aweme_id, owner) for aweme_id in aweme_ids])
+
+    def record(self, aweme_ids, owner):
+        """下载成功，下载清单已由 download_videos 写入，只需删除领取记录"""
+        self._settle(aweme_ids, owner)
+
+    def release(self, aweme_ids, owner):
+        """放弃领取，其他进程可以重新下载"""
+        self._settle(aweme_ids, owner)
+
+    def close(self):
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+
+
+class JobQueue:
+    """
+    任务队列
+
+    (kind, key) 唯一，重复入队会被忽略，已完成的任务不会再次执行。
+    lease() 在一个写事务中领取优先级最高、最早可执行的任务，并把租约过期的任务放回队列（进程崩溃后的恢复）；
+    complete()/fail() 只在调用者仍持有租约时生效，租约已被其他进程接手时返回False，避免重复记录结果。
+    失败的任务按 RETRY_BASE * 2^(n-1) 秒后重试，达到 max_attempts 次或 PermanentError 时进入死信。
+    每个进程使用自己的 JobQueue 实例，同一实例可以在线程之间共享。
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE, lease_seconds=DEFAULT_LEASE):
+        """
+        Args:
+            path (str, optional): 数据库文件路径. Defaults to DEFAULT_QUEUE.
+            lease_seconds (int, optional): 租约时长(秒). Defaults to DEFAULT_LEASE.
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        # 手动管理事务，领取任务时用 BEGIN IMMEDIATE 防止多个进程领到同一个任务
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _write(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+
+    # ------------------------------------------------------------------
+    # 入队
+    # ------------------------------------------------------------------
+
+    def enqueue(self, kind, key, payload=None, priority=0, max_attempts=DEFAULT_MAX_ATTEMPTS, delay=0):
+        """
+        添加一个任务
+
+        Args:
+            kind (str): 任务类型，见 JOB_KINDS
+            key (str): 作品ID、sec_uid或关键词，与kind一起唯一
+            payload (dict, optional): 处理参数，如下载目录. Defaults to None.
+            priority (int, optional): 优先级，越大越先执行. Defaults to 0.
+            max_attempts (int, optional): 最多尝试次数. Defaults to DEFAULT_MAX_ATTEMPTS.
+            delay (float, optional): 多少秒后才可以执行. Defaults to 0.
+
+        Returns:
+            bool: 是否新增，已在队列中时为False
+        """
+        return self.enqueue_many(kind, [key], payload, priority, max_attempts, delay) == 1
+
+    def enqueue_many(self, kind, keys, payload=None, priority=0, max_attempts=DEFAULT_MAX_ATTEMPTS, delay=0):
+        """
+        在一个事务中批量添加同类任务
+
+        Returns:
+            int: 新增的任务数
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"未知的任务类型: {kind}，可选: {', '.join(JOB_KINDS)}")
+        now = time.time()
+        data = json.dumps(payload or {}, ensure_ascii=False)
+        rows = [(kind, str(key), data, priority, max_attempts, now + delay, now, now) for key in keys]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO jobs (kind, key, payload, priority, max_attempts, available_at, "
+                    "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return self._conn.total_changes - before
+
+    # ------------------------------------------------------------------
+    # 领取和完成
+    # ------------------------------------------------------------------
+
+    def lease(self, worker=None, kinds=None):
+        """
+        领取一个任务
+
+        Args:
+            worker (str, optional): 领取者标识，默认 主机名:进程号. Defaults to None.
+            kinds (list, optional): 只领取这些类型的任务. Defaults to None.
+
+        Returns:
+            QueueJob|None: 没有可执行的任务时返回None
+        """
+        worker = worker or default_worker_id()
+        now = time.time()
+        kind_filter = ""
+        params = [PENDING, now]
+        if kinds:
+            kind_filter = f" AND kind IN ({', '.join('?' for _ in kinds)})"
+            params.extend(kinds)
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._reclaim(now)
+                row = self._conn.execute(
+                    f"SELECT * FROM jobs WHERE state = ? AND available_at <= ?{kind_filter} "
+                    "ORDER BY priority DESC, available_at, id LIMIT 1",
+                    params,
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET state = ?, attempts = attempts + 1, lease_until = ?, worker = ?, updated_at = ? "
+                    "WHERE id = ?",
+                    (LEASED, now + self.lease_seconds, worker, now, row["id"]),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        job = QueueJob(row, worker)
+        job.attempts += 1
+        return job
+
+    def _reclaim(self, now):
+        """租约过期的任务放回队列，已用完尝试次数的进入死信，在调用者的事务中执行"""
+        reclaimed = self._conn.execute(
+            "UPDATE jobs SET state = CASE WHEN attempts >= max_attempts THEN ? ELSE ? END, "
+            "last_error = '租约过期，持有者可能已退出', worker = NULL, lease_until = NULL, updated_at = ? "
+            "WHERE state = ? AND lease_until < ?",
+            (DEAD, PENDING, now, LEASED, now),
+        ).rowcount
+        if reclaimed:
+            logger.warning(f"收回 {reclaimed} 个租约过期的任务")
+
+    def heartbeat(self, job):
+        """
+        续约，长时间运行的任务应每隔不到 lease_seconds 调用一次
+
+        Returns:
+            bool: 是否仍持有租约
+        """
+        now = time.time()
+        return self._write(
+            "UPDATE jobs SET lease_until = ?, updated_at = ? WHERE id = ? AND state = ? AND worker = ?",
+            (now + self.lease_seconds, now, job.id, LEASED, job.worker),
+        ) == 1
+
+    def complete(self, job, result=None):
+        """
+        标记任务完成
+
+        Returns:
+            bool: 是否仍持有租约，False表示任务已被其他进程接手
+        """
+        updated = self._write(
+            "UPDATE jobs SET state = ?, result = ?, last_error = NULL, lease_until = NULL, updated_at = ? "
+            "WHERE id = ? AND state = ? AND worker = ?",
+            (DONE, json.dumps(result, ensure_ascii=False) if result is not None else None, time.time(),
+             job.id, LEASED, job.worker),
+        )
+        if not updated:
+            logger.warning(f"任务 {job.id} 的租约已失效，结果未记录")
+        return updated == 1
+
+    def fail(self, job, error, permanent=False):
+        """
+        标记任务失败，未用完尝试次数时延迟重试，否则进入死信
+
+        Args:
+            job (QueueJob): 领取到的任务
+            error (str): 错误信息
+            permanent (bool, optional): 不再重试，直接进入死信. Defaults to False.
+
+        Returns:
+            bool: 是否仍持有租约
+        """
+        now = time.time()
+        dead = permanent or job.attempts >= job.max_attempts
+        delay = min(RETRY_MAX, RETRY_BASE * 2 ** (job.attempts - 1))
+        updated = self._write(
+            "UPDATE jobs SET state = ?, last_error = ?, available_at = ?, worker = NULL, lease_until = NULL, "
+            "updated_at = ? WHERE id = ? AND state = ? AND worker = ?",
+            (DEAD if dead else PENDING, str(error)[:1000], now if dead else now + delay, now,
+             job.id, LEASED, job.worker),
+        )
+        if updated:
+            if dead:
+                logger.warning(f"任务 {job.kind}:{job.key} 失败 {job.attempts} 次，进入死信: {error}")
+            else:
+                logger.info(f"任务 {job.kind}:{job.key} 第{job.attempts}次失败，{delay:.0f}秒后重试: {error}")
+        return updated == 1
+
+    # ------------------------------------------------------------------
+    # 管理和监控
+    # ------------------------------------------------------------------
+
+    def retry_dead(self, kind=None):
+        """把死信任务放回队列并清零尝试次数，返回数量"""
+        sql = "UPDATE jobs SET state = ?, attempts = 0, available_at = ?, updated_at = ? WHERE state = ?"
+        params = [PENDING, time.time(), time.time(), DEAD]
+        if kind:
+            sql += " AND kind = ?"
+            params.append(kind)
+        return self._write(sql, params)
+
+    def purge(self, state=DONE):
+        """删除指定状态的任务，返回数量。删除已完成的任务后，同一个键可以再次入队"""
+        return self._write("DELETE FROM jobs WHERE state = ?", (state,))
+
+    def dead(self, limit=50):
+        """最近的死信任务"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, kind, key, attempts, last_error, updated_at FROM jobs WHERE state = ? "
+                "ORDER BY updated_at DESC LIMIT ?",
+                (DEAD, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def stats(self):
+        """
+        队列深度和各状态的任务数
+
+        Returns:
+            dict: {"states": {状态: 数量}, "kinds": {类型: {状态: 数量}}, "ready": 可立即执行的数量,
+                   "delayed": 等待重试的数量, "oldest_ready_age": 最早可执行任务的等待秒数}
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute("SELECT kind, state, COUNT(*) AS n FROM jobs GROUP BY kind, state").fetchall()
+            ready, oldest = self._conn.execute(
+                "SELECT COUNT(*), MIN(available_at) FROM jobs WHERE state = ? AND available_at <= ?", (PENDING, now)
+            ).fetchone()
+        states = dict.fromkeys(STATES, 0)
+        kinds = {}
+        for row in rows:
+            states[row["state"]] = states.get(row["state"], 0) + row["n"]
+            kinds.setdefault(row["kind"], dict.fromkeys(STATES, 0))[row["state"]] = row["n"]
+        return {
+            "states": states,
+            "kinds": kinds,
+            "ready": ready,
+            "delayed": states[PENDING] - ready,
+            "oldest_ready_age": round(now - oldest, 1) if oldest else 0,
+            "nodes": self._nodes(now),
+        }
+
+    def _nodes(self, now):
+        """各节点在最近 THROUGHPUT_WINDOW 秒内完成的任务数和下载量，按任务结果中的 bytes 统计"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT worker, COUNT(*), SUM(COALESCE(json_extract(result, '$.bytes'), 0)), MAX(updated_at) "
+                "FROM jobs WHERE state = ? AND updated_at >= ? GROUP BY worker",
+                (DONE, now - THROUGHPUT_WINDOW),
+            ).fetchall()
+        totals = {}
+        for worker, jobs, nbytes, last in rows:
+            node = totals.setdefault(node_of(worker), {"jobs": 0, "bytes": 0, "last": 0})
+            node["jobs"] += jobs
+            node["bytes"] += nbytes or 0
+            node["last"] = max(node["last"], last)
+        return {name: throughput(node["jobs"], node["bytes"], now - node["last"])
+                for name, node in totals.items()}
+
+
+def throughput(jobs, nbytes, idle):
+    """节点吞吐量的统一格式"""
+    return {
+        "jobs": jobs,
+        "bytes": nbytes,
+        "jobs_per_min": round(jobs * 60 / THROUGHPUT_WINDOW, 1),
+        "bytes_per_s": round(nbytes / THROUGHPUT_WINDOW),
+        "last_seen": round(idle, 1),
+    }
+
+
+def print_stats(stats, title="任务队列"):
+    table = Table(title=title, caption=f"可执行 {stats['ready']}，等待重试 {stats['delayed']}，"
+                                       f"最早任务已等待 {stats['oldest_ready_age']:.0f}s")
+    table.add_column("类型")
+    for state in STATES:
+        table.add_column(state)
+    for kind, counts in sorted(stats["kinds"].items()):
+        table.add_row(kind, *(str(counts[state]) for state in STATES))
+    table.add_row("[bold]合计[/bold]", *(f"[bold]{stats['states'][state]}[/bold]" for state in STATES))
+    console.print(table)
+    if not stats.get("nodes"):
+        return
+    nodes = Table(title=f"节点吞吐（最近 {THROUGHPUT_WINDOW // 60} 分钟）")
+    for column in ["节点", "完成任务", "任务/分钟", "下载量(MB)", "速度(MB/s)", "最后活动"]:
+        nodes.add_column(column)
+    for name, node in sorted(stats["nodes"].items()):
+        nodes.add_row(name, str(node["jobs"]), f"{node['jobs_per_min']:.1f}", f"{node['bytes'] / 1024 / 1024:.1f}",
+                      f"{node['bytes_per_s'] / 1024 / 1024:.2f}", f"{node['last_seen']:.0f}s前")
+    console.print(nodes)
+
+
+def _read_keys(values, path):
+    keys = list(values or [])
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            keys.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    return keys
+
+
+def main():
+    parser = argparse.ArgumentParser(description="任务队列管理，执行任务见 queue_worker.py")
+    parser.add_argument("--queue", default=DEFAULT_QUEUE,
+                        help="队列文件，或多台机器共享的Redis地址如 redis://host:6379/0，默认为脚本目录下的job_queue.db")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="添加任务")
+    enqueue.add_argument("kind", choices=JOB_KINDS, help="aweme(作品ID)、user(sec_uid)、keyword(关键词)")
+    enqueue.add_argument("keys", nargs="*", help="作品ID、sec_uid或关键词")
+    enqueue.add_argument("--file", help="从文件读取，每行一个")
+    enqueue.add_argument("--priority", type=int, default=0, help="优先级，越大越先执行，默认0")
+    enqueue.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS,
+                         help=f"最多尝试次数，默认{DEFAULT_MAX_ATTEMPTS}")
+    enqueue.add_argument("-c", "--count", type=int, help="user/keyword任务最多获取的作品数")
+    enqueue.add_argument("-d", "--dir", help="下载目录")
+    enqueue.add_argument("--no-download", action="store_true", help="keyword/user任务只获取作品列表，不下载")
+
+    stats = commands.add_parser("stats", help="各状态的任务数")
+    stats.add_argument("--json", action="store_true", help="输出JSON，便于监控采集")
+    dead = commands.add_parser("dead", help="列出死信任务")
+    dead.add_argument("--limit", type=int, default=50, help="最多列出的数量，默认50")
+    retry = commands.add_parser("retry-dead", help="把死信任务放回队列")
+    retry.add_argument("--kind", choices=JOB_KINDS, help="只处理该类型")
+    purge = commands.add_parser("purge", help="删除已完成或死信任务")
+    purge.add_argument("--state", choices=[DONE, DEAD], default=DONE, help="默认done")
+    args = parser.parse_args()
+
+    with open_queue(args.queue) as queue:
+        if args.command == "enqueue":
+            keys = _read_keys(args.keys, args.file)
+            payload = {key: value for key, value in (("count", args.count), ("dir", args.dir)) if value is not None}
+            if args.no_download:
+                payload["download"] = False
+            added = queue.enqueue_many(args.kind, keys, payload, args.priority, args.max_attempts)
+            console.print(f"[bold green]新增 {added} 个任务，{len(keys) - added} 个已在队列中[/bold green]")
+        elif args.command == "stats":
+            data = queue.stats()
+            if args.json:
+                print(json.dumps(data, ensure_ascii=False))
+            else:
+                print_stats(data)
+        elif args.command == "dead":
+            for row in queue.dead(args.limit):
+                console.print(f"{row['id']}\t{row['kind']}:{row['key']}\t{row['attempts']}次\t{row['last_error']}")
+        elif args.command == "retry-dead":
+            console.print(f"[bold green]已放回 {queue.retry_dead(args.kind)} 个任务[/bold green]")
+        elif args.command == "purge":
+            console.print(f"[bold green]已删除 {queue.purge(args.state)} 个任务[/bold green]")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,376 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 下载清单 (SQLite)，记录已下载的作品，重复运行时跳过
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+
+from rich.console import Console
+from dedup import deduplicate, STORAGE_EXTERNAL
+
+logger = logging.getLogger('douyin_search.manifest')
+
+console = Console()
+
+# 默认保存在脚本目录下
+DEFAULT_MANIFEST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "download_manifest.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS downloads (
+    aweme_id      TEXT NOT NULL,
+    variant       TEXT NOT NULL,
+    path          TEXT,
+    size          INTEGER,
+    hash          TEXT,
+    source_url    TEXT,
+    downloaded_at REAL NOT NULL,
+    expected_size INTEGER,
+    expected_hash TEXT,
+    verified      INTEGER,
+    verify_error  TEXT,
+    uri           TEXT,
+    storage       TEXT,
+    PRIMARY KEY (aweme_id, variant)
+);
+"""
+
+# 按内容查找已有文件时使用，迁移补列之后再创建
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_downloads_hash ON downloads(hash);
+CREATE INDEX IF NOT EXISTS idx_downloads_expected_hash ON downloads(expected_hash);
+CREATE INDEX IF NOT EXISTS idx_downloads_uri ON downloads(uri, variant);
+"""
+
+# 旧版本清单中没有的列，打开时自动补上
+MIGRATIONS = {
+    "expected_size": "INTEGER",
+    "expected_hash": "TEXT",
+    "verified": "INTEGER",
+    "verify_error": "TEXT",
+    "uri": "TEXT",
+    "storage": "TEXT",
+}
+
+
+class DownloadManifest:
+    """
+    下载清单
+
+    以 (aweme_id, variant) 为主键记录文件路径、大小、哈希、来源地址和下载时间，
+    以及与接口给出的data_size/file_hash的校验结果。hash/uri上有索引，
+    下载前可以按内容查找已有文件（见dedup.py）。可以在多个线程之间共享。
+    """
+
+    def __init__(self, path=DEFAULT_MANIFEST):
+        """
+        Args:
+            path (str, optional): 数据库文件路径. Defaults to DEFAULT_MANIFEST.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self._conn.executescript(INDEXES)
+        self._conn.commit()
+
+    def _migrate(self):
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(downloads)")}
+        for name, column_type in MIGRATIONS.items():
+            if name not in columns:
+                self._conn.execute(f"ALTER TABLE downloads ADD COLUMN {name} {column_type}")
+        # 旧版本把 TikTokTool.py 下载的目录或空字符串记为路径
+        self._conn.execute(
+            "UPDATE downloads SET path = NULL, storage = ? WHERE variant = 'tiktoktool' AND storage IS NULL",
+            (STORAGE_EXTERNAL,)
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def record(self, aweme_id, variant, path, size=None, hash=None, source_url=None,
+               expected_size=None, expected_hash=None, verified=None, verify_error=None,
+               uri=None, storage=None):
+        """
+        记录一次成功的下载，同一作品同一清晰度再次下载时覆盖
+
+        Args:
+            aweme_id (str): 作品ID
+            variant (str): 清晰度(gear_name)，无法区分时使用 "default"
+            path (str): 文件路径
+            size (int, optional): 文件大小. Defaults to None.
+            hash (str, optional): 下载时计算的文件MD5. Defaults to None.
+            source_url (str, optional): 实际下载的地址. Defaults to None.
+            expected_size (int, optional): 接口给出的data_size. Defaults to None.
+            expected_hash (str, optional): 接口给出的file_hash. Defaults to None.
+            verified (bool, optional): 校验是否通过，None表示没有可比较的值. Defaults to None.
+            verify_error (str, optional): 校验失败的原因. Defaults to None.
+            uri (str, optional): 视频流的uri，同一视频的各清晰度uri相同. Defaults to None.
+            storage (str, optional): 存储方式 file/hardlink/reference/external，见dedup.py. Defaults to None.
+        """
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO downloads
+                (aweme_id, variant, path, size, hash, source_url, downloaded_at,
+                 expected_size, expected_hash, verified, verify_error, uri, storage)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (str(aweme_id), variant or "default", path, size, hash, source_url, time.time(),
+                 expected_size, expected_hash, None if verified is None else int(verified), verify_error,
+                 uri, storage)
+            )
+            self._conn.commit()
+
+    def get(self, aweme_id, variant=None):
+        """
+        查询某个作品的下载记录
+
+        Args:
+            aweme_id (str): 作品ID
+            variant (str, optional): 清晰度，None表示任意清晰度. Defaults to None.
+
+        Returns:
+            list: 记录列表，每项为dict
+        """
+        query = "SELECT * FROM downloads WHERE aweme_id = ?"
+        params = [str(aweme_id)]
+        if variant:
+            query += " AND variant = ?"
+            params.append(variant)
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(query, params)]
+
+    def has(self, aweme_id, variant=None):
+        """作品是否已经下载过"""
+        return bool(self.get(aweme_id, variant))
+
+    def missing(self, aweme_ids, variant=None):
+        """
+        批量查询还没有下载的作品，一次查询完成
+
+        Args:
+            aweme_ids (list): 作品ID列表
+            variant (str, optional): 清晰度，None表示任意清晰度都算已下载. Defaults to None.
+
+        Returns:
+            list: 没有下载记录的作品ID，保持输入顺序
+        """
+        ids = [str(i) for i in aweme_ids]
+        if not ids:
+            return []
+
+        query = """
+            SELECT w.value FROM json_each(?) AS w
+            WHERE NOT EXISTS (
+                SELECT 1 FROM downloads d
+                WHERE d.aweme_id = w.value {}
+            )
+            ORDER BY w.key
+        """.format("AND d.variant = ?" if variant else "")
+        params = [json.dumps(ids)] + ([variant] if variant else [])
+        with self._lock:
+            return [row[0] for row in self._conn.execute(query, params)]
+
+    def remove(self, aweme_id, variant):
+        """删除一条下载记录"""
+        with self._lock:
+            self._conn.execute("DELETE FROM downloads WHERE aweme_id = ? AND variant = ?", (str(aweme_id), variant))
+            self._conn.commit()
+
+    def find_content(self, file_hash=None, uri=None, variant=None, exclude_path=None):
+        """
+        按内容查找已下载且文件仍存在的记录
+
+        file_hash与下载时计算的MD5或接口给出的file_hash比较；uri需要和清晰度一起匹配，
+        因为同一视频的各清晰度共用一个uri。校验未通过的记录不会被返回。
+
+        Args:
+            file_hash (str, optional): 文件MD5. Defaults to None.
+            uri (str, optional): 视频流的uri. Defaults to None.
+            variant (str, optional): 清晰度. Defaults to None.
+            exclude_path (str, optional): 排除指向该文件的记录. Defaults to None.
+
+        Returns:
+            dict|None: 最早的一条匹配记录
+        """
+        conditions, params = [], []
+        if file_hash:
+            conditions.append("hash = ? OR expected_hash = ?")
+            params += [file_hash, file_hash]
+        if uri and variant:
+            conditions.append("uri = ? AND variant = ?")
+            params += [uri, variant]
+        if not conditions:
+            return None
+
+        query = """
+            SELECT * FROM downloads
+            WHERE ({}) AND (verified IS NULL OR verified = 1)
+            ORDER BY downloaded_at
+        """.format(" OR ".join(f"({c})" for c in conditions))
+        with self._lock:
+            rows = [dict(row) for row in self._conn.execute(query, params)]
+
+        for row in rows:
+            path = row["path"]
+            if not path or not os.path.isfile(path):
+                continue
+            if exclude_path and (os.path.abspath(path) == os.path.abspath(exclude_path) or
+                                 (os.path.exists(exclude_path) and os.path.samefile(path, exclude_path))):
+                continue
+            return row
+        return None
+
+    def duplicate_groups(self):
+        """
+        按下载时计算的MD5分组，返回包含多条记录的组
+
+        Returns:
+            list: 每组为记录列表，按下载时间排序
+        """
+        query = """
+            SELECT * FROM downloads
+            WHERE hash IN (
+                SELECT hash FROM downloads
+                WHERE hash IS NOT NULL AND (verified IS NULL OR verified = 1)
+                GROUP BY hash HAVING COUNT(*) > 1
+            ) AND (verified IS NULL OR verified = 1)
+            ORDER BY hash, downloaded_at
+        """
+        groups = {}
+        with self._lock:
+            for row in self._conn.execute(query):
+                groups.setdefault(row["hash"], []).append(dict(row))
+        return list(groups.values())
+
+    def set_storage(self, aweme_id, variant, storage):
+        """更新一条记录的存储方式"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE downloads SET storage = ? WHERE aweme_id = ? AND variant = ?",
+                (storage, str(aweme_id), variant)
+            )
+            self._conn.commit()
+
+    def unverified(self):
+        """校验未通过但保留了文件的记录"""
+        with self._lock:
+            return [dict(row) for row in self._conn.execute("SELECT * FROM downloads WHERE verified = 0")]
+
+    def count(self):
+        """下载记录总数"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM downloads").fetchone()[0]
+
+    def verify(self, fix=False):
+        """
+        核对清单与文件系统
+
+        Args:
+            fix (bool, optional): 是否删除文件已不存在或大小不符的记录，使其下次重新下载. Defaults to False.
+
+        Returns:
+            dict: {"ok": 数量, "external": 没有文件路径、无法核对的数量, "missing": [记录], "size_mismatch": [记录]}
+        """
+        with self._lock:
+            rows = [dict(row) for row in self._conn.execute("SELECT * FROM downloads")]
+
+        report = {"ok": 0, "external": 0, "missing": [], "size_mismatch": []}
+        for row in rows:
+            path = row["path"]
+            if row["storage"] == STORAGE_EXTERNAL:
+                report["external"] += 1
+            elif not path or not os.path.exists(path):
+                report["missing"].append(row)
+            elif row["size"] is not None and os.path.isfile(path) and os.path.getsize(path) != row["size"]:
+                report["size_mismatch"].append(row)
+            else:
+                report["ok"] += 1
+
+        if fix:
+            for row in report["missing"] + report["size_mismatch"]:
+                self.remove(row["aweme_id"], row["variant"])
+        return report
+
+
+def main():
+    """命令行入口: 核对清单、查询缺失的作品或合并重复文件"""
+    parser = argparse.ArgumentParser(description="下载清单管理工具")
+    parser.add_argument("--db", default=DEFAULT_MANIFEST, help="清单数据库路径")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    verify_parser = subparsers.add_parser("verify", help="核对清单与文件系统")
+    verify_parser.add_argument("--fix", action="store_true", help="删除文件已丢失或大小不符的记录")
+
+    missing_parser = subparsers.add_parser("missing", help="从ID列表中找出还没有下载的作品")
+    missing_parser.add_argument("file", help="每行一个aweme_id的文件，- 表示标准输入")
+
+    dedup_parser = subparsers.add_parser("dedup", help="把内容相同的已下载文件合并为硬链接")
+    dedup_parser.add_argument("--dry-run", action="store_true", help="只统计可以节省的空间，不修改文件")
+
+    args = parser.parse_args()
+
+    with DownloadManifest(args.db) as manifest:
+        if args.command == "verify":
+            report = manifest.verify(fix=args.fix)
+            console.print(f"[bold green]正常: {report['ok']}[/bold green]")
+            if report["external"]:
+                console.print(f"由TikTokTool.py下载、无法核对: {report['external']}")
+            console.print(f"[bold yellow]文件丢失: {len(report['missing'])}[/bold yellow]")
+            for row in report["missing"]:
+                console.print(f"  {row['aweme_id']} ({row['variant']}) {row['path']}")
+            console.print(f"[bold yellow]大小不符: {len(report['size_mismatch'])}[/bold yellow]")
+            for row in report["size_mismatch"]:
+                console.print(f"  {row['aweme_id']} ({row['variant']}) {row['path']}")
+            unverified = manifest.unverified()
+            console.print(f"[bold yellow]下载时校验未通过: {len(unverified)}[/bold yellow]")
+            for row in unverified:
+                console.print(f"  {row['aweme_id']} ({row['variant']}) {row['path']}: {row['verify_error']}")
+            if args.fix:
+                console.print("[bold cyan]已删除异常记录，下次运行时会重新下载[/bold cyan]")
+            return 0 if not (report["missing"] or report["size_mismatch"]) or args.fix else 1
+
+        if args.command == "dedup":
+            report = deduplicate(manifest, dry_run=args.dry_run)
+            action = "可合并" if args.dry_run else "已合并"
+            console.print(
+                f"[bold green]{report['groups']} 组重复内容，{action} {report['linked']} 个文件，"
+                f"节省 {report['saved'] / 1024 / 1024:.1f}MB[/bold green]"
+            )
+            for path in report["failed"]:
+                console.print(f"[bold yellow]  无法硬链接: {path}[/bold yellow]")
+            return 0
+
+        stream = sys.stdin if args.file == "-" else open(args.file, "r", encoding="utf-8")
+        with stream:
+            ids = [line.strip() for line in stream if line.strip()]
+        for aweme_id in manifest.missing(ids):
+            print(aweme_id)
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,6 +14,7 @@ import platform
 import subprocess
 from pathlib import Path
 from rich.console import Console
+from cookie_store import CookieStore, DEFAULT_COOKIE_FILE, load_cookie_from_file
 
 console = Console()
 
@@ -114,40 +115,26 @@ def open_browser_and_guide():
     
     return None
 
-def save_cookie_to_file(cookie, filename="douyin_cookie.txt"):
-    """保存Cookie到文件"""
+def save_cookie_to_file(cookie, filename=DEFAULT_COOKIE_FILE):
+    """保存Cookie到文件，同时写入cookie缓存"""
     try:
         with open(filename, "w", encoding="utf-8") as f:
             f.write(cookie)
+        CookieStore(cookie_file=filename).put(cookie, "manual")
         console.print(f"[green]Cookie已保存到 {filename}[/green]")
         return True
     except Exception as e:
         console.print(f"[red]保存Cookie失败: {str(e)}[/red]")
         return False
 
-def load_cookie_from_file(filename="douyin_cookie.txt"):
-    """从文件加载Cookie"""
-    try:
-        if os.path.exists(filename):
-            with open(filename, "r", encoding="utf-8") as f:
-                cookie = f.read().strip()
-            if cookie:
-                console.print(f"[green]已从 {filename} 加载Cookie[/green]")
-                return cookie
-        console.print(f"[yellow]Cookie文件 {filename} 不存在或为空[/yellow]")
-    except Exception as e:
-        console.print(f"[red]加载Cookie失败: {str(e)}[/red]")
-    
-    return None
-
 def main():
     console.print("[bold blue]抖音Cookie手动获取工具[/bold blue]")
     
     # 首先尝试从文件加载
     cookie = load_cookie_from_file()
     if cookie:
-        # 验证cookie是否过期
-        expiry_check = input("已找到保存的Cookie。是否重新获取? (y/n, 默认n): ").strip().lower()
+        # 过期和校验未通过的cookie不会被加载
+        expiry_check = input("已找到可用的Cookie。是否重新获取? (y/n, 默认n): ").strip().lower()
         if expiry_check != 'y':
             return cookie
     
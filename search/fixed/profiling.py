@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 运行时性能分析，供 --profile 选项使用
+              CPU分析可选 cProfile(确定性，只覆盖主线程) 或采样(覆盖所有线程)，同时用 tracemalloc 记录内存分配，
+              结束时把 pstats、火焰图可用的折叠栈和内存分配排行写入指定目录
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import sys
+import time
+import pstats
+import cProfile
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+
+logger = logging.getLogger('douyin_search.profiling')
+
+# CPU分析方式
+PROFILE_MODES = ("cprofile", "sampling")
+
+# 默认采样间隔(毫秒)
+DEFAULT_INTERVAL = 5
+
+# 报告中列出的条目数
+TOP = 40
+
+# tracemalloc 保留的调用栈深度
+MALLOC_FRAMES = 25
+
+
+def _label(code):
+    """折叠栈中的帧名，不能含有分号"""
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+
+class Sampler:
+    """
+    采样分析器
+
+    后台线程按固定间隔读取所有线程的调用栈并计数，开销与被分析代码的调用次数无关，
+    下载线程池中的工作线程也会被记录
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval / 1000
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)).replace(";", ","))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write_collapsed(self, path):
+        """每行 "线程;外层帧;...;内层帧 次数"，可直接交给 flamegraph.pl 或 speedscope"""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def write_top(self, path):
+        """按自身采样数和累计采样数排序的函数列表"""
+        own = Counter()
+        total = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+
+        samples = sum(self.stacks.values()) or 1
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"采样间隔 {self.interval * 1000:.1f}ms，共 {self.samples} 次采样\n\n")
+            for title, counter in (("自身", own), ("累计", total)):
+                f.write(f"== 按{title}采样数 ==\n")
+                for frame, count in counter.most_common(TOP):
+                    f.write(f"{count:8d} {count / samples:7.1%}  {frame}\n")
+                f.write("\n")
+
+
+class Profiler:
+    """
+    一次运行的性能分析
+
+    用法:
+        with Profiler("profile-out", mode="sampling"):
+            ...
+
+    或在无法改动代码结构时调用 start() / stop()
+    """
+
+    def __init__(self, directory, mode="cprofile", interval=DEFAULT_INTERVAL, memory=True):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"未知的分析方式: {mode}，可选: {', '.join(PROFILE_MODES)}")
+        self.directory = directory
+        self.mode = mode
+        self.interval = interval
+        self.memory = memory
+        self._profile = None
+        self._sampler = None
+        self._started = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        if self.memory:
+            tracemalloc.start(MALLOC_FRAMES)
+        if self.mode == "cprofile":
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self._sampler = Sampler(self.interval)
+            self._sampler.start()
+        self._started = time.perf_counter()
+        logger.info(f"性能分析已启动 ({self.mode})，报告将写入 {self.directory}")
+        return self
+
+    def stop(self):
+        """停止分析并写入报告，返回写入的文件列表"""
+        if self._started is None:
+            return []
+        elapsed = time.perf_counter() - self._started
+        self._started = None
+        files = []
+
+        if self._profile:
+            self._profile.disable()
+        if self._sampler:
+            self._sampler.stop()
+        # 先取内存快照，避免把写报告时的分配计入
+        if self.memory and tracemalloc.is_tracing():
+            files += self._write_memory()
+            tracemalloc.stop()
+        if self._profile:
+            files += self._write_cprofile()
+        if self._sampler:
+            files += self._write_sampling()
+
+        path = os.path.join(self.directory, "summary.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"命令: {' '.join(sys.argv)}\n")
+            f.write(f"Python: {sys.version.split()[0]}\n")
+            f.write(f"分析方式: {self.mode}\n")
+            f.write(f"耗时: {elapsed:.3f}s\n")
+            f.write(f"报告: {', '.join(os.path.basename(p) for p in files)}\n")
+        files.append(path)
+        logger.info(f"性能分析报告已写入 {self.directory}")
+        return files
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _write_cprofile(self):
+        raw = os.path.join(self.directory, "profile.pstats")
+        self._profile.dump_stats(raw)
+        text = os.path.join(self.directory, "profile.txt")
+        with open(text, "w", encoding="utf-8") as f:
+            f.write("cProfile 只记录主线程，下载线程池中的耗时请使用 sampling 方式\n\n")
+            stats = pstats.Stats(self._profile, stream=f).strip_dirs()
+            stats.sort_stats("cumulative").print_stats(TOP)
+            stats.sort_stats("tottime").print_stats(TOP)
+        return [raw, text]
+
+    def _write_sampling(self):
+        collapsed = os.path.join(self.directory, "stacks.collapsed")
+        self._sampler.write_collapsed(collapsed)
+        top = os.path.join(self.directory, "sampling.txt")
+        self._sampler.write_top(top)
+        return [collapsed, top]
+
+    def _write_memory(self):
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+        path = os.path.join(self.directory, "allocations.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"当前占用 {current / 1024 / 1024:.1f}MB，峰值 {peak / 1024 / 1024:.1f}MB\n\n")
+            f.write("== 按代码行 ==\n")
+            for stat in snapshot.statistics("lineno")[:TOP]:
+                f.write(f"{stat.size / 1024:10.1f}KB {stat.count:8d}次  {stat.traceback[0]}\n")
+            f.write("\n== 占用最多的调用栈 ==\n")
+            for stat in snapshot.statistics("traceback")[:10]:
+                f.write(f"\n{stat.size / 1024:.1f}KB {stat.count}次\n")
+                for line in stat.traceback.format(most_recent_first=True):
+                    f.write(f"{line}\n")
+        return [path]
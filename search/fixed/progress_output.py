@@ -0,0 +1,313 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 进度输出，交互模式下使用节流的rich进度条，无终端的批处理环境下改为定期输出汇总的JSON行
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+from rich.console import Console
+from rich.progress import Progress
+
+# 交互模式下进度条的最短更新间隔(秒)
+DEFAULT_REFRESH = 0.1
+
+# 无界面模式下JSON进度行的输出间隔(秒)
+DEFAULT_INTERVAL = 1.0
+
+_settings = {
+    "headless": os.environ.get("DOUYIN_HEADLESS", "") not in ("", "0"),
+    "interval": DEFAULT_INTERVAL,
+    "refresh": DEFAULT_REFRESH,
+    "stream": None,
+}
+
+# 各模块共用的控制台，无界面模式下静默
+console = Console(quiet=_settings["headless"])
+
+# 当前线程的事件订阅者，见 capture()
+_local = threading.local()
+
+
+def configure(headless=None, interval=None, refresh=None, stream=None):
+    """
+    设置输出模式，在创建进度条之前调用
+
+    Args:
+        headless (bool, optional): 无界面模式，rich输出改为JSON进度行. Defaults to None.
+        interval (float, optional): JSON进度行的输出间隔(秒). Defaults to None.
+        refresh (float, optional): 交互模式下进度条的最短更新间隔(秒). Defaults to None.
+        stream (file, optional): JSON行的输出位置，默认标准输出. Defaults to None.
+    """
+    for key, value in (("headless", headless), ("interval", interval), ("refresh", refresh), ("stream", stream)):
+        if value is not None:
+            _settings[key] = value
+    console.quiet = _settings["headless"]
+
+
+def is_headless():
+    return _settings["headless"]
+
+
+def emit(event, **fields):
+    """无界面模式下输出一行JSON事件，交互模式下不输出；当前线程有订阅者时同时交给订阅者"""
+    record = dict({"ts": round(time.time(), 3), "event": event}, **fields)
+    sink = current_sink()
+    if sink is not None:
+        sink(record)
+    if _settings["headless"]:
+        _write(record)
+
+
+def notify(event, **fields):
+    """只交给当前线程的订阅者，用于逐个文件这类不适合输出到标准输出的细粒度事件"""
+    sink = current_sink()
+    if sink is not None:
+        sink(dict({"ts": round(time.time(), 3), "event": event}, **fields))
+
+
+def current_sink():
+    return getattr(_local, "sink", None)
+
+
+@contextmanager
+def capture(sink):
+    """
+    在当前线程中把 emit() 和 notify() 的事件交给 sink，用于守护进程按任务转发进度。
+    提交到线程池的工作需要先用 current_sink() 取出订阅者，在工作线程中再次 capture()
+
+    Args:
+        sink (callable): 接收事件字典的函数，None表示不订阅
+    """
+    previous = current_sink()
+    _local.sink = sink
+    try:
+        yield
+    finally:
+        _local.sink = previous
+
+
+def _write(record):
+    stream = _settings["stream"] or sys.stdout
+    stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+    stream.flush()
+
+
+def progress(name, *columns, disable=False):
+    """
+    创建进度显示，接口与 rich.progress.Progress 的 add_task / update / remove_task 一致
+
+    Args:
+        name (str): 进度名，JSON行中的 name 字段
+        *columns: rich进度条的列，为空时使用rich默认的列
+        disable (bool, optional): 不显示进度. Defaults to False.
+
+    Returns:
+        ThrottledProgress|JsonProgress
+    """
+    if _settings["headless"]:
+        return JsonProgress(name, _settings["interval"], disable=disable)
+    return ThrottledProgress(*columns, refresh=_settings["refresh"], disable=disable)
+
+
+class ThrottledProgress:
+    """
+    节流的rich进度条
+
+    每个数据块都调用 Progress.update 时，加锁、记录速度样本等开销会随块数增长。
+    这里每个线程先在自己的缓冲中累计前进量，不加锁，距该线程上次提交超过 refresh 秒时再交给rich
+    """
+
+    def __init__(self, *columns, refresh=DEFAULT_REFRESH, disable=False, output=None):
+        self.refresh = refresh
+        self._progress = Progress(
+            *columns,
+            console=output or console,
+            disable=disable,
+            refresh_per_second=max(1, int(1 / refresh)) if refresh else 10,
+        )
+        self._local = threading.local()
+        self._buffers = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        self._progress.start()
+
+    def stop(self):
+        self._flush()
+        self._progress.stop()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def add_task(self, description, total=None, summary=False):
+        return self._progress.add_task(description, total=total)
+
+    def update(self, task_id, advance=0, total=None, description=None):
+        # 只有前进量可以累计，其余更新立即提交
+        if total is not None or description is not None:
+            self._flush(task_id)
+            self._progress.update(task_id, advance=advance, total=total, description=description)
+            return
+        local = self._local
+        try:
+            pending = local.pending
+        except AttributeError:
+            pending = local.pending = {}
+            local.deadline = 0.0
+            with self._lock:
+                self._buffers.append(pending)
+        # 其他线程的 _flush 会在锁内取走缓冲，累加也要在锁内，否则前进量可能丢失或重复；锁通常没有竞争
+        now = time.monotonic()
+        with self._lock:
+            pending[task_id] = pending.get(task_id, 0) + advance
+            if now < local.deadline:
+                return
+            amounts = list(pending.items())
+            pending.clear()
+        local.deadline = now + self.refresh
+        self._commit(amounts)
+
+    def remove_task(self, task_id):
+        self._flush(task_id)
+        self._progress.remove_task(task_id)
+
+    def _flush(self, task_id=None):
+        """提交所有线程缓冲中的前进量"""
+        amounts = []
+        with self._lock:
+            for pending in self._buffers:
+                if task_id is None:
+                    amounts.extend(pending.items())
+                    pending.clear()
+                elif task_id in pending:
+                    amounts.append((task_id, pending.pop(task_id)))
+        self._commit(amounts)
+
+    def _commit(self, amounts):
+        for task_id, amount in amounts:
+            if not amount:
+                continue
+            try:
+                self._progress.update(task_id, advance=amount)
+            except KeyError:
+                # 任务已被移除
+                pass
+
+
+class JsonProgress:
+    """
+    无界面模式的进度
+
+    update 只累加计数，后台线程每隔 interval 秒输出一行汇总:
+    {"event": "progress", "name", "tasks", "done", "active", "completed", "total", "rate", "elapsed"}
+    结束时输出 event 为 "done" 的最后一行。summary=True 的任务（如下载池的总进度）不计入汇总，避免重复计数
+    """
+
+    def __init__(self, name, interval=DEFAULT_INTERVAL, disable=False):
+        self.name = name
+        self.interval = interval
+        self.disable = disable
+        self._tasks = {}
+        self._summary = set()
+        self._next_id = 0
+        self._added = 0
+        self._removed = 0
+        self._removed_completed = 0
+        self._removed_total = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+        self._last = (0.0, 0)
+
+    def start(self):
+        self._started = time.monotonic()
+        self._last = (self._started, 0)
+        if not self.disable:
+            self._thread = threading.Thread(target=self._run, name=f"progress-{self.name}", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            _write(self._record("done"))
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def add_task(self, description, total=None, summary=False):
+        with self._lock:
+            task_id = self._next_id
+            self._next_id += 1
+            self._tasks[task_id] = [0, total]
+            if summary:
+                self._summary.add(task_id)
+            else:
+                self._added += 1
+        return task_id
+
+    def update(self, task_id, advance=0, total=None, description=None):
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                return
+            task[0] += advance
+            if total is not None:
+                task[1] = total
+
+    def remove_task(self, task_id):
+        with self._lock:
+            completed, total = self._tasks.pop(task_id, (0, None))
+            if task_id in self._summary:
+                self._summary.discard(task_id)
+                return
+            self._removed += 1
+            self._removed_completed += completed
+            self._removed_total += total or completed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            _write(self._record("progress"))
+
+    def _record(self, event):
+        with self._lock:
+            active = [task for task_id, task in self._tasks.items() if task_id not in self._summary]
+            completed = self._removed_completed + sum(task[0] for task in active)
+            total = self._removed_total + sum(task[1] or 0 for task in active)
+            unknown = any(task[1] is None for task in active)
+            tasks, done = self._added, self._removed
+
+        now = time.monotonic()
+        last_time, last_completed = self._last
+        self._last = (now, completed)
+        return {
+            "ts": round(time.time(), 3),
+            "event": event,
+            "name": self.name,
+            "tasks": tasks,
+            "done": done,
+            "active": tasks - done,
+            "completed": completed,
+            "total": None if unknown else total,
+            "rate": round((completed - last_completed) / (now - last_time), 1) if now > last_time else 0,
+            "elapsed": round(now - self._started, 3),
+        }
@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 任务队列 (job_queue.py) 的执行进程，启动 N 个工作进程并行处理作品ID、用户和关键词任务
+              每个进程有自己的搜索器、下载池和数据库连接，通过租约从同一个队列领取任务，
+              进程崩溃时租约到期后任务由其他进程接手，已下载的作品由下载清单跳过；
+              队列在Redis中时多台机器可以同时运行，共享任务和已下载作品集合
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import logging
+import argparse
+import threading
+import multiprocessing
+
+from job_queue import (
+    open_queue, open_seen, PermanentError, DEFAULT_QUEUE, DEFAULT_LEASE, JOB_KINDS, default_worker_id, print_stats,
+)
+from manifest import DEFAULT_MANIFEST
+from progress_output import console
+from proxy_pool import DEFAULT_CHECK_INTERVAL
+
+logger = logging.getLogger('douyin_search.worker')
+
+# 队列为空时的轮询间隔(秒)
+DEFAULT_POLL = 2.0
+
+# 主进程输出队列状态的间隔(秒)
+STATS_INTERVAL = 10.0
+
+
+class Handlers:
+    """
+    各类型任务的处理函数，返回值记入任务结果，抛出异常时任务重试，PermanentError 时进入死信
+
+    下载前从已下载作品集合中领取作品，已下载或正由其他节点下载的作品跳过，下载成功后记入集合；
+    领取只有 lease 秒，下载期间由心跳线程调用 renew() 续期；
+    结果中的 bytes 为本次实际下载的字节数，用于统计节点吞吐量
+    """
+
+    def __init__(self, searcher, pool, seen, worker, options):
+        self.searcher = searcher
+        self.pool = pool
+        self.seen = seen
+        self.worker = worker
+        self.options = options
+        # 正在下载的作品ID，心跳线程续期
+        self._held = set()
+        self._held_lock = threading.Lock()
+
+    def __call__(self, job):
+        return getattr(self, job.kind)(job.key, job.payload)
+
+    def renew(self):
+        """以同一领取者重新领取正在下载的作品，延长领取时间"""
+        with self._held_lock:
+            held = list(self._held)
+        if held:
+            self.seen.claim(held, self.worker, self.options.lease)
+
+    def _download(self, videos, payload):
+        if not payload.get("download", True) or not videos:
+            return {"count": len(videos), "aweme_ids": [video["aweme_id"] for video in videos]}
+        pending = videos
+        if not payload.get("force"):
+            claimed = set(self.seen.claim([video["aweme_id"] for video in videos], self.worker, self.options.lease))
+            pending = [video for video in videos if video["aweme_id"] in claimed]
+        if not pending:
+            return {"count": len(videos), "downloaded": 0, "skipped": len(videos), "bytes": 0}
+        held = {video["aweme_id"] for video in pending} if not payload.get("force") else set()
+        with self._held_lock:
+            self._held |= held
+        try:
+            results = self.searcher.download_videos(
+                pending,
+                download_dir=payload.get("dir") or self.options.dir,
+                save_to_file=False,
+                stream_policy=payload.get("quality", self.options.quality),
+                force=bool(payload.get("force")),
+                on_mismatch=self.options.on_mismatch,
+                image_format=payload.get("image_format", self.options.image_format),
+                pool=self.pool,
+            )
+        except Exception:
+            self.seen.release([video["aweme_id"] for video in pending], self.worker)
+            raise
+        finally:
+            with self._held_lock:
+                self._held -= held
+        self.seen.record([r["video_id"] for r in results if r["success"]], self.worker)
+        failed = [r for r in results if not r["success"]]
+        if failed:
+            self.seen.release([r["video_id"] for r in failed], self.worker)
+            # 整个任务重试，已下载成功的作品由下载清单跳过
+            raise RuntimeError(f"{len(failed)}/{len(results)} 个作品下载失败")
+        downloaded = [r for r in results if not r.get("skipped")]
+        return {
+            "count": len(videos),
+            "downloaded": len(downloaded),
+            "skipped": len(videos) - len(downloaded),
+            "bytes": sum(r.get("size") or 0 for r in downloaded),
+        }
+
+    def aweme(self, aweme_id, payload):
+        video = self.searcher.fetch_detail(aweme_id)
+        if video is None:
+            raise PermanentError(f"作品 {aweme_id} 不存在或已删除")
+        return self._download([video], payload)
+
+    def user(self, sec_uid, payload):
+        videos = list(self.searcher.iter_user_posts(sec_uid, payload.get("count")))
+        return self._download(videos, payload)
+
+    def keyword(self, keyword, payload):
+        videos = self.searcher.search(keyword, int(payload.get("count", 20)))
+        return self._download(videos, payload)
+
+
+def _heartbeat(queue, job, done, interval, handle):
+    while not done.wait(interval):
+        if not queue.heartbeat(job):
+            logger.warning(f"任务 {job.id} 的租约已被收回")
+            return
+        try:
+            handle.renew()
+        except Exception as e:
+            logger.warning(f"任务 {job.id} 的作品领取续期失败: {str(e)}")
+
+
+def _build(options):
+    """在工作进程中创建搜索器和下载池，导入放在这里以便主进程启动时不加载搜索和下载模块"""
+    import progress_output
+    from cdn_hosts import host_of
+    from download_pool import DownloadPool
+    from search_douyin import DouyinSearcher
+    from cookie_pool import CookiePool
+    from proxy_pool import ProxyPool
+
+    # 工作进程没有交互界面，进度不输出，结果记入队列
+    progress_output.configure(headless=True, stream=open(os.devnull, "w"))
+    if options.debug:
+        logging.getLogger('douyin_search').setLevel(logging.DEBUG)
+
+    proxy_pool = None
+    if options.proxy_pool:
+        proxy_pool = ProxyPool.from_file(
+            options.proxy_pool,
+            check_url=options.proxy_check_url or (options.base_url or "https://www.douyin.com").rstrip("/") + "/",
+            check_interval=options.proxy_check_interval
+        ).start()
+    searcher = DouyinSearcher(
+        cookie=options.cookie,
+        auto_cookie=options.auto_cookie,
+        use_local_server=not options.no_server,
+        manifest_path=None if options.no_manifest else options.manifest,
+        base_url=options.base_url,
+        signer_url=options.signer_url,
+        cookie_pool=CookiePool.from_path(options.cookie_pool) if options.cookie_pool else None,
+        proxy_pool=proxy_pool
+    )
+    pool = DownloadPool(
+        concurrency=options.concurrency,
+        per_host=options.per_host,
+        bandwidth_limit=options.limit_rate,
+        host_overrides={host_of(searcher.base_url): 1},
+        headers={"User-Agent": searcher.headers["User-Agent"]},
+        show_progress=False,
+        connections=options.connections,
+        on_mismatch=options.on_mismatch,
+        proxy_pool=proxy_pool
+    )
+    return searcher, pool, proxy_pool
+
+
+def run_worker(index, options, stop):
+    """
+    工作进程入口，放在模块顶层以便 Windows 的 spawn 方式可以导入
+
+    Args:
+        index (int): 进程序号
+        options (argparse.Namespace): 命令行参数
+        stop (multiprocessing.Event): 主进程要求退出时设置
+    """
+    # Ctrl+C 由主进程处理，工作进程做完当前任务后退出
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker = f"{default_worker_id(options.node)}#{index}"
+    searcher, pool, proxy_pool = _build(options)
+    seen = open_seen(options.queue, searcher.manifest)
+    handle = Handlers(searcher, pool, seen, worker, options)
+    processed = failed = 0
+    with open_queue(options.queue, lease_seconds=options.lease) as queue, pool:
+        try:
+            while not stop.is_set():
+                job = queue.lease(worker, options.kinds)
+                if job is None:
+                    if options.drain:
+                        break
+                    stop.wait(options.poll)
+                    continue
+
+                logger.info(f"[{worker}] 开始 {job}")
+                done = threading.Event()
+                beat = threading.Thread(target=_heartbeat, args=(queue, job, done, options.lease / 3, handle), daemon=True)
+                beat.start()
+                try:
+                    result = handle(job)
+                except PermanentError as e:
+                    queue.fail(job, e, permanent=True)
+                    failed += 1
+                except Exception as e:
+                    logger.debug(f"[{worker}] {job} 失败", exc_info=True)
+                    queue.fail(job, f"{type(e).__name__}: {e}")
+                    failed += 1
+                else:
+                    queue.complete(job, result)
+                finally:
+                    done.set()
+                    beat.join()
+                processed += 1
+        finally:
+            seen.close()
+            if proxy_pool:
+                proxy_pool.stop()
+    logger.info(f"[{worker}] 退出，处理 {processed} 个任务，失败 {failed} 个")
+
+
+def report(queue, headless):
+    stats = queue.stats()
+    if headless:
+        print(json.dumps(dict({"ts": round(time.time(), 3), "event": "queue"}, **stats), ensure_ascii=False), flush=True)
+    else:
+        print_stats(stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动多个工作进程处理任务队列，任务用 job_queue.py enqueue 添加")
+    parser.add_argument("--queue", default=DEFAULT_QUEUE,
+                        help="队列文件，或多台机器共享的Redis地址如 redis://host:6379/0，默认为脚本目录下的job_queue.db")
+    parser.add_argument("--node", help="节点名，用于区分各机器的吞吐量，默认为主机名，不能包含冒号")
+    parser.add_argument("-n", "--processes", type=int, default=os.cpu_count() or 1,
+                        help="工作进程数，默认为CPU核数")
+    parser.add_argument("--kinds", nargs="+", choices=JOB_KINDS, help="只处理这些类型的任务，默认全部")
+    parser.add_argument("--drain", action="store_true", help="没有可执行的任务时退出，默认持续等待新任务")
+    parser.add_argument("--poll", type=float, default=DEFAULT_POLL, help=f"队列为空时的轮询间隔(秒)，默认{DEFAULT_POLL}")
+    parser.add_argument("--lease", type=int, default=DEFAULT_LEASE,
+                        help=f"租约时长(秒)，进程崩溃后任务在此时间后由其他进程接手，默认{DEFAULT_LEASE}")
+    parser.add_argument("--stats-interval", type=float, default=STATS_INTERVAL,
+                        help=f"输出队列状态的间隔(秒)，默认{STATS_INTERVAL}")
+    parser.add_argument("--headless", action="store_true", help="队列状态输出为JSON行，便于监控采集")
+    parser.add_argument("-d", "--dir", help="下载目录，任务中未指定时使用")
+    parser.add_argument("--quality", default="best", help="清晰度选择策略，默认best")
+    parser.add_argument("--image-format", choices=["webp", "jpeg"], default="webp", help="图集作品的首选图片格式")
+    parser.add_argument("--cookie", help="抖音cookie")
+    parser.add_argument("--auto-cookie", action="store_true", help="自动获取cookie，优先使用cookie缓存")
+    parser.add_argument("--cookie-pool", metavar="PATH", help="多账号cookie池，见 search_cli.py --cookie-pool")
+    parser.add_argument("--proxy-pool", metavar="FILE", help="代理池文件，见 search_cli.py --proxy-pool")
+    parser.add_argument("--proxy-check-url", help="代理健康检查地址，默认使用接口地址的首页")
+    parser.add_argument("--proxy-check-interval", type=int, default=DEFAULT_CHECK_INTERVAL,
+                        help=f"代理健康检查间隔(秒)，默认{DEFAULT_CHECK_INTERVAL}")
+    parser.add_argument("--no-server", action="store_true", help="不使用本地签名服务器")
+    parser.add_argument("--base-url", help="接口地址，默认https://www.douyin.com，可指向本地回放服务 replay_server.py")
+    parser.add_argument("--signer-url", help="本地签名服务地址，默认http://localhost:8889")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST, help="下载清单路径，所有进程共用")
+    parser.add_argument("--no-manifest", action="store_true", help="不使用下载清单，任务重试时会重复下载")
+    parser.add_argument("-j", "--concurrency", type=int, default=4, help="每个进程的下载并发数，默认4")
+    parser.add_argument("--per-host", type=int, default=2, help="每个进程对每个CDN主机的并发上限，默认2")
+    parser.add_argument("--limit-rate", help="每个进程的带宽上限，如 500K、2M，默认不限速")
+    parser.add_argument("--connections", type=int, default=1, help="单个大文件并行下载的连接数，默认1")
+    parser.add_argument("--on-mismatch", choices=["retry", "quarantine", "mark"], default="retry",
+                        help="大小或MD5与接口不符时的处理，默认retry")
+    parser.add_argument("--debug", action="store_true", help="启用调试模式")
+    options = parser.parse_args()
+
+    if options.node and ":" in options.node:
+        parser.error("--node 不能包含冒号")
+    queue = open_queue(options.queue, lease_seconds=options.lease)
+    stop = multiprocessing.Event()
+    workers = [multiprocessing.Process(target=run_worker, args=(index, options, stop), name=f"worker-{index}")
+               for index in range(max(1, options.processes))]
+    for process in workers:
+        process.start()
+    if not options.headless:
+        console.print(f"[bold green]已启动 {len(workers)} 个工作进程，队列: {options.queue}[/bold green]")
+
+    try:
+        while any(process.is_alive() for process in workers):
+            report(queue, options.headless)
+            for process in workers:
+                process.join(timeout=options.stats_interval / len(workers))
+    except KeyboardInterrupt:
+        console.print("[yellow]正在停止，等待工作进程完成当前任务，再次按 Ctrl+C 强制退出[/yellow]")
+        stop.set()
+        try:
+            for process in workers:
+                process.join()
+        except KeyboardInterrupt:
+            # 强制退出时未完成的任务在租约到期后重新执行
+            for process in workers:
+                process.terminate()
+    report(queue, options.headless)
+    queue.close()
+    return 0 if all(process.exitcode == 0 for process in workers) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,523 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 基于HTTP Range的分块断点续传下载
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from cdn_hosts import host_of
+
+logger = logging.getLogger('douyin_search.download')
+
+CHUNK_SIZE = 64 * 1024
+
+# 每写入这么多字节保存一次续传记录，进程被杀掉时最多重下这部分
+CHECKPOINT_SIZE = 1024 * 1024
+
+# 校验失败时的处理方式
+MISMATCH_POLICIES = ("retry", "quarantine", "mark")
+
+# 隔离校验失败文件的子目录
+QUARANTINE_DIR = ".quarantine"
+
+# 网络中断时可以续传的异常
+RESUMABLE_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.Timeout,
+)
+
+
+class RangeSet:
+    """记录已完成的字节区间 [start, end)，相邻区间自动合并"""
+
+    def __init__(self, ranges=None):
+        self.ranges = []
+        for start, end in ranges or []:
+            self.add(start, end)
+
+    def add(self, start, end):
+        if end <= start:
+            return
+        merged = []
+        for s, e in self.ranges:
+            if e < start or s > end:
+                merged.append([s, e])
+            else:
+                start, end = min(s, start), max(e, end)
+        merged.append([start, end])
+        self.ranges = sorted(merged)
+
+    def done(self):
+        """已完成的字节数"""
+        return sum(e - s for s, e in self.ranges)
+
+    def missing(self, size):
+        """返回 [0, size) 中尚未完成的区间"""
+        gaps = []
+        cursor = 0
+        for s, e in self.ranges:
+            if s > cursor:
+                gaps.append([cursor, s])
+            cursor = max(cursor, e)
+        if cursor < size:
+            gaps.append([cursor, size])
+        return gaps
+
+
+class InlineHasher:
+    """
+    边下载边计算MD5
+
+    只有紧接在已哈希前缀之后写入的数据才会直接参与计算，
+    续传或并行下载时乱序写入的部分在下载完成后从.part文件中补读一次。
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._md5 = hashlib.md5()
+        self.offset = 0
+
+    def update(self, offset, chunk):
+        """写入 [offset, offset+len(chunk)) 后调用，调用方需持有锁"""
+        end = offset + len(chunk)
+        if offset <= self.offset < end:
+            self._md5.update(chunk[self.offset - offset:])
+            self.offset = end
+
+    def catch_up(self, f, size):
+        """从文件中补读 [offset, size) 参与计算，返回补读的字节数"""
+        start = self.offset
+        f.seek(start)
+        while self.offset < size:
+            chunk = f.read(min(CHUNK_SIZE * 16, size - self.offset))
+            if not chunk:
+                break
+            self._md5.update(chunk)
+            self.offset += len(chunk)
+        return self.offset - start
+
+    def hexdigest(self):
+        return self._md5.hexdigest()
+
+
+class RangeDownloader:
+    """
+    断点续传下载器
+
+    数据先写入 `<path>.part`，已完成的字节区间记录在 `<path>.part.json` 中，
+    中断或重启后自动从缺失的区间继续下载，全部完成后再重命名为目标文件。
+    大文件可以选择用多个连接并行下载不同的区间。
+    同一资源有多个CDN镜像时按评分排序，出错或卡顿时切换到下一个镜像继续下载。
+    """
+
+    def __init__(self, session=None, headers=None, max_retries=5, connections=1,
+                 parallel_threshold=16 * 1024 * 1024, segment_size=4 * 1024 * 1024,
+                 bandwidth=None, acquire=None, on_total=None, on_progress=None,
+                 scoreboard=None, stall_timeout=15, on_mismatch="retry", verify_retries=1, proxies=None):
+        """
+        初始化下载器
+
+        Args:
+            session (requests.Session, optional): 复用的HTTP会话. Defaults to None.
+            headers (dict, optional): 请求头. Defaults to None.
+            max_retries (int, optional): 连续中断的最大重试次数. Defaults to 5.
+            connections (int, optional): 大文件并行下载的连接数，1表示不并行. Defaults to 1.
+            parallel_threshold (int, optional): 超过该大小的文件才并行下载. Defaults to 16MB.
+            segment_size (int, optional): 并行下载时每个区间的大小. Defaults to 4MB.
+            bandwidth (BandwidthLimiter, optional): 共享的带宽限速器. Defaults to None.
+            acquire (callable, optional): 传入URL返回上下文管理器，每个连接期间持有，用于按主机限流. Defaults to None.
+            on_total (callable, optional): 得知文件大小时回调 on_total(size). Defaults to None.
+            on_progress (callable, optional): 每写入一块数据时回调 on_progress(nbytes). Defaults to None.
+            scoreboard (HostScoreboard, optional): CDN主机评分表，用于镜像排序和记录测速结果. Defaults to None.
+            stall_timeout (int, optional): 超过该秒数没有收到数据视为卡顿，切换镜像. Defaults to 15.
+            on_mismatch (str, optional): 大小或哈希与预期不符时的处理: retry(重新下载，仍失败则隔离)、
+                quarantine(直接隔离)、mark(保留文件，仅在结果中标记). Defaults to "retry".
+            verify_retries (int, optional): retry策略下重新下载的次数. Defaults to 1.
+            proxies (dict, optional): 本次下载使用的代理，格式同 requests 的 proxies 参数. Defaults to None.
+        """
+        self.session = session or requests.Session()
+        self.headers = headers or {}
+        self.max_retries = max_retries
+        self.connections = max(1, connections)
+        self.parallel_threshold = parallel_threshold
+        self.segment_size = segment_size
+        self.bandwidth = bandwidth
+        self.acquire = acquire or (lambda url: nullcontext())
+        self.on_total = on_total or (lambda size: None)
+        self.on_progress = on_progress or (lambda nbytes: None)
+        self.scoreboard = scoreboard
+        self.stall_timeout = stall_timeout
+        if on_mismatch not in MISMATCH_POLICIES:
+            raise ValueError(f"未知的校验失败处理方式: {on_mismatch}，可选: {', '.join(MISMATCH_POLICIES)}")
+        self.on_mismatch = on_mismatch
+        self.verify_retries = verify_retries
+        self.proxies = proxies
+        # 写盘累计耗时，用于区分网络和磁盘的时间
+        self.write_seconds = 0.0
+
+    # ------------------------------------------------------------------
+    # 续传状态
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _sidecar_path(path):
+        return path + ".part.json"
+
+    def _load_state(self, path):
+        """读取续传状态，.part文件或记录不完整时从头开始"""
+        sidecar = self._sidecar_path(path)
+        if not (os.path.exists(sidecar) and os.path.exists(path + ".part")):
+            return {"size": None, "etag": None, "ranges": []}
+        try:
+            with open(sidecar, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            return {
+                "size": state.get("size"),
+                "etag": state.get("etag"),
+                "ranges": state.get("ranges", []),
+            }
+        except (OSError, ValueError) as e:
+            logger.warning(f"续传记录损坏，重新下载 {path}: {str(e)}")
+            return {"size": None, "etag": None, "ranges": []}
+
+    def _save_state(self, path, size, etag, done):
+        """原子地写入续传状态"""
+        sidecar = self._sidecar_path(path)
+        tmp = sidecar + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"size": size, "etag": etag, "ranges": done.ranges}, f)
+        os.replace(tmp, sidecar)
+
+    # ------------------------------------------------------------------
+    # 下载
+    # ------------------------------------------------------------------
+
+    def _request(self, url, start, end=None, etag=None):
+        """请求 [start, end) 区间，end为None表示到文件末尾"""
+        headers = dict(self.headers)
+        headers["Range"] = f"bytes={start}-" if end is None else f"bytes={start}-{end - 1}"
+        if etag:
+            headers["If-Range"] = etag
+
+        started = time.monotonic()
+        try:
+            response = self.session.get(url, headers=headers, stream=True, timeout=(5, self.stall_timeout),
+                                        proxies=self.proxies)
+            response.raise_for_status()
+        except requests.exceptions.RequestException:
+            if self.scoreboard:
+                self.scoreboard.record_failure(host_of(url))
+            raise
+        if self.scoreboard:
+            self.scoreboard.record_latency(host_of(url), time.monotonic() - started)
+        return response
+
+    @staticmethod
+    def _total_size(response):
+        """从Content-Range或Content-Length中解析文件总大小"""
+        content_range = response.headers.get("Content-Range", "")
+        if "/" in content_range:
+            total = content_range.rsplit("/", 1)[1]
+            if total.isdigit():
+                return int(total)
+        if response.status_code == 200 and response.headers.get("Content-Length"):
+            return int(response.headers["Content-Length"])
+        return None
+
+    def _stream(self, response, f, offset, done, lock, checkpoint, hasher):
+        """写入响应内容，并把这次传输的结果记入主机评分"""
+        host = host_of(response.url)
+        start = offset
+        started = time.monotonic()
+        try:
+            offset = self._write(response, f, offset, done, lock, checkpoint, hasher)
+        except RESUMABLE_ERRORS:
+            if self.scoreboard:
+                self.scoreboard.record_failure(host)
+            raise
+        if self.scoreboard:
+            self.scoreboard.record_success(host, offset - start, time.monotonic() - started)
+        return offset
+
+    def _write(self, response, f, offset, done, lock, checkpoint, hasher):
+        """
+        把响应写到文件的offset处，边写边记录完成的区间并计算哈希
+
+        文件以无缓冲方式打开，记录中的区间一定已经写入系统，
+        因此定期保存的续传记录不会超前于实际数据。
+        """
+        f.seek(offset)
+        unsaved = 0
+        for chunk in response.iter_content(CHUNK_SIZE):
+            if not chunk:
+                continue
+            if self.bandwidth:
+                self.bandwidth.consume(len(chunk))
+            started = time.perf_counter()
+            f.write(chunk)
+            elapsed = time.perf_counter() - started
+            with lock:
+                self.write_seconds += elapsed
+                done.add(offset, offset + len(chunk))
+                hasher.update(offset, chunk)
+            offset += len(chunk)
+            self.on_progress(len(chunk))
+
+            unsaved += len(chunk)
+            if unsaved >= CHECKPOINT_SIZE:
+                checkpoint()
+                unsaved = 0
+        return offset
+
+    def download(self, urls, path, expected_size=None, expected_hash=None):
+        """
+        下载到path，支持断点续传和镜像切换，下载过程中同时统计大小并计算MD5
+
+        Args:
+            urls (str|list): 下载地址，或同一资源的多个CDN镜像地址
+            path (str): 保存路径
+            expected_size (int, optional): 预期大小，如bit_rate中的data_size. Defaults to None.
+            expected_hash (str, optional): 预期MD5，如bit_rate中的file_hash. Defaults to None.
+
+        Returns:
+            dict: {"path", "size", "url", "resumed", "md5", "write_seconds", "verified", "verify_error", "quarantined"}
+                  verified为None表示没有可比较的预期值
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # 只认32位十六进制的file_hash，其他格式无法用MD5比较
+        if expected_hash and not re.fullmatch(r"[0-9a-fA-F]{32}", expected_hash):
+            expected_hash = None
+
+        for attempt in range(self.verify_retries + 1):
+            result = self._fetch(urls, path)
+            error = self._check(result, expected_size, expected_hash)
+            if not error:
+                break
+            logger.warning(f"{os.path.basename(path)} 校验失败: {error}")
+            if self.on_mismatch != "retry" or attempt == self.verify_retries:
+                break
+            # 丢弃已下载的内容重新下载
+            self._discard(path)
+
+        result["verified"] = None if expected_size is None and expected_hash is None else not error
+        result["verify_error"] = error
+        result["quarantined"] = False
+
+        part_path = path + ".part"
+        if error and self.on_mismatch != "mark":
+            quarantine_dir = os.path.join(os.path.dirname(os.path.abspath(path)), QUARANTINE_DIR)
+            os.makedirs(quarantine_dir, exist_ok=True)
+            target = os.path.join(quarantine_dir, os.path.basename(path))
+            os.replace(part_path, target)
+            result["path"] = target
+            result["quarantined"] = True
+            logger.warning(f"已隔离校验失败的文件: {target}")
+        else:
+            os.replace(part_path, path)
+            result["path"] = path
+
+        sidecar = self._sidecar_path(path)
+        if os.path.exists(sidecar):
+            os.remove(sidecar)
+        logger.debug(f"下载完成: {result['path']} ({result['size']} 字节)")
+        return result
+
+    @staticmethod
+    def _check(result, expected_size, expected_hash):
+        """比较下载结果与预期值，返回错误描述，一致时返回None"""
+        if expected_size is not None and result["size"] != expected_size:
+            return f"大小 {result['size']} 与预期 {expected_size} 不符"
+        if expected_hash and result["md5"].lower() != expected_hash.lower():
+            return f"MD5 {result['md5']} 与预期 {expected_hash} 不符"
+        return None
+
+    def _discard(self, path):
+        """删除.part文件和续传记录"""
+        for leftover in (path + ".part", self._sidecar_path(path)):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    def _fetch(self, urls, path):
+        """下载到 <path>.part 直到所有区间完成，不做重命名"""
+        part_path = path + ".part"
+
+        state = self._load_state(path)
+        done = RangeSet(state["ranges"])
+        resumed = done.done() > 0
+        lock = threading.Lock()
+
+        if not os.path.exists(part_path):
+            open(part_path, "wb").close()
+        hasher = InlineHasher()
+
+        mirrors = [urls] if isinstance(urls, str) else list(urls)
+        if self.scoreboard and len(mirrors) > 1:
+            mirrors = self.scoreboard.rank(mirrors)
+        url = mirrors[0]
+
+        size, etag = state["size"], state["etag"]
+        if resumed:
+            logger.info(f"从 {done.done()} 字节处继续下载 {os.path.basename(path)}")
+
+        def checkpoint():
+            with lock:
+                self._save_state(path, size, etag, done)
+
+        retries = 0
+        with open(part_path, "r+b", buffering=0) as f:
+            # 续传时先把已完成的开头部分读入哈希，之后顺序写入的数据可以直接参与计算
+            if done.ranges and done.ranges[0][0] == 0:
+                hasher.catch_up(f, done.ranges[0][1])
+
+            while True:
+                gaps = done.missing(size) if size is not None else [[done.done(), None]]
+                if not gaps:
+                    break
+                start = gaps[0][0]
+
+                before = done.done()
+                try:
+                    parallel = False
+                    with self.acquire(url):
+                        with self._request(url, start, etag=etag) as response:
+                            total = self._total_size(response)
+                            new_etag = response.headers.get("ETag")
+
+                            # 服务器忽略了Range或文件已变化，只能从头开始
+                            if response.status_code == 200 or (size is not None and total not in (None, size)):
+                                if done.done():
+                                    logger.warning(f"服务器不支持续传或文件已变化，重新下载 {os.path.basename(path)}")
+                                done = RangeSet()
+                                hasher.reset()
+                                f.truncate(0)
+                                start = 0
+
+                            if total is not None and total != size:
+                                size = total
+                                self.on_total(size)
+                            etag = new_etag or etag
+
+                            # 大文件改为多连接并行下载，先释放当前连接和主机名额
+                            parallel = response.status_code == 206 and self._should_parallel(size)
+                            if not parallel:
+                                self._stream(response, f, start, done, lock, checkpoint, hasher)
+
+                    if parallel:
+                        self._save_state(path, size, etag, done)
+                        self._download_parallel(url, part_path, size, etag, done, lock, checkpoint, hasher)
+                except RESUMABLE_ERRORS + (requests.exceptions.HTTPError,) as e:
+                    # 只有一个地址时HTTP错误无法通过重试解决
+                    if isinstance(e, requests.exceptions.HTTPError) and len(mirrors) == 1:
+                        raise
+                    # 中断前取得了进展则重新计数，只有连续失败才会退避到更长的等待
+                    retries = 1 if done.done() > before else retries + 1
+                    self._save_state(path, size, etag, done)
+                    if retries > self.max_retries:
+                        raise
+                    logger.warning(f"下载中断 ({str(e)[:80]})，{retries}/{self.max_retries} 次重试，已完成 {done.done()} 字节")
+
+                    if len(mirrors) > 1:
+                        previous = url
+                        url = self._next_mirror(mirrors, url, progressed=retries == 1)
+                        if url != previous:
+                            # 不同主机的ETag可能不同，不再带If-Range
+                            etag = None
+                            logger.info(f"切换到CDN镜像 {host_of(url)} 继续下载")
+                        # 所有镜像都轮过一遍之后才退避
+                        if retries < len(mirrors):
+                            continue
+                    time.sleep(min(2 ** retries * 0.1, 5))
+                    continue
+
+                # 只有取得进展时才重置重试计数，避免服务器反复提前断开导致死循环
+                if done.done() > before:
+                    retries = 0
+                elif size is not None and done.missing(size):
+                    retries += 1
+                    if retries > self.max_retries:
+                        raise requests.exceptions.ChunkedEncodingError(f"{os.path.basename(path)} 下载没有进展")
+
+                if size is None:
+                    # 服务器没有告知大小时，以连接正常结束为完成
+                    size = done.done()
+                    break
+
+            f.truncate(size)
+            # 乱序写入的部分补读一次，顺序下载时这里不会读取任何数据
+            reread = hasher.catch_up(f, size)
+            if reread:
+                logger.debug(f"补读 {reread} 字节计算哈希: {os.path.basename(path)}")
+
+        return {"path": path, "size": size, "url": url, "resumed": resumed, "md5": hasher.hexdigest(),
+                "write_seconds": self.write_seconds}
+
+    def _next_mirror(self, mirrors, url, progressed):
+        """
+        出错后选择下一个镜像
+
+        有评分表时按最新评分选最好的镜像，出错前取得了进展的镜像可以继续使用，
+        连续失败时换到排名次之的镜像；没有评分表时依次轮换。
+        """
+        if not self.scoreboard:
+            return mirrors[(mirrors.index(url) + 1) % len(mirrors)]
+
+        ranked = self.scoreboard.rank(mirrors)
+        if ranked[0] == url and not progressed:
+            return ranked[1]
+        return ranked[0]
+
+    def _should_parallel(self, size):
+        return self.connections > 1 and size is not None and size >= self.parallel_threshold
+
+    def _download_parallel(self, url, part_path, size, etag, done, lock, checkpoint, hasher):
+        """按segment_size切分缺失区间，用多个连接并行下载"""
+        segments = []
+        for start, end in done.missing(size):
+            for s in range(start, end, self.segment_size):
+                segments.append((s, min(s + self.segment_size, end)))
+
+        def fetch_segment(segment):
+            start, end = segment
+            with open(part_path, "r+b", buffering=0) as f:
+                with self.acquire(url):
+                    with self._request(url, start, end, etag=etag) as response:
+                        if response.status_code != 206:
+                            raise requests.exceptions.ConnectionError("服务器未返回分段内容")
+                        offset = self._stream(response, f, start, done, lock, checkpoint, hasher)
+            checkpoint()
+            if offset < end:
+                raise requests.exceptions.ChunkedEncodingError(f"区间 {start}-{end} 未下载完整")
+
+        with ThreadPoolExecutor(max_workers=self.connections, thread_name_prefix="range") as executor:
+            errors = [e for e in executor.map(self._capture(fetch_segment), segments) if e]
+        if errors:
+            # 已完成的区间已经记录，交给外层重试剩余部分
+            raise errors[0]
+
+    @staticmethod
+    def _capture(func):
+        """在线程中执行func，返回异常而不是抛出，便于等待所有区间结束"""
+        def wrapper(*args):
+            try:
+                func(*args)
+            except Exception as e:
+                return e
+            return None
+        return wrapper
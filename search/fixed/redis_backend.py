@@ -0,0 +1,528 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 任务队列和已下载作品集合的Redis实现，多台机器的工作进程连接同一个Redis，
+              共享待抓取的任务、全局去重，并按节点统计吞吐量。需要安装 redis 库 (pip install redis)
+              领取、完成、失败等操作都在Lua脚本中原子执行，时间使用Redis服务器的时间，不受各节点时钟偏差影响
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import json
+import logging
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+from job_queue import (
+    QueueJob, JOB_KINDS, STATES, PENDING, DONE, DEAD, DEFAULT_LEASE, DEFAULT_MAX_ATTEMPTS,
+    RETRY_BASE, RETRY_MAX, THROUGHPUT_WINDOW, default_worker_id, throughput,
+)
+
+logger = logging.getLogger('douyin_search.queue')
+
+# 默认的键前缀，同一个Redis中运行多套抓取时用不同的前缀区分
+DEFAULT_PREFIX = "douyin"
+
+# 每次调用脚本处理的最大数量，避免单个脚本长时间阻塞Redis
+BATCH = 1000
+
+# 键的布局（P为前缀）:
+#   P:seq              任务ID计数
+#   P:keys             "类型:键" -> 任务ID，保证同一个键只入队一次
+#   P:job:<id>         任务的各字段
+#   P:ready:<类型>     可执行的任务，分数 = -优先级 * 1e12 + ID，分数最小的先执行
+#   P:ready_at         可执行任务的可执行时间，用于统计最早任务的等待时间
+#   P:delayed          等待重试的任务，分数为可执行时间
+#   P:leased           执行中的任务，分数为租约到期时间
+#   P:done / P:dead    已完成和死信任务，分数为结束时间
+#   P:counts           "类型:状态" -> 数量
+#   P:nodes            节点 -> 最后活动时间
+#   P:rate:<节点>:<分钟>  节点每分钟完成的任务数和下载量
+#   P:seen             作品ID -> 下载该作品的领取者
+#   P:claim:<作品ID>   正在下载该作品的领取者，到期自动删除
+_PRELUDE = """
+local P = ARGV[1]
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local function count(kind, state, delta)
+    redis.call('HINCRBY', P .. ':counts', kind .. ':' .. state, delta)
+end
+
+local function to_ready(id, kind, priority, at)
+    redis.call('ZADD', P .. ':ready:' .. kind, -tonumber(priority) * 1e12 + tonumber(id), id)
+    redis.call('ZADD', P .. ':ready_at', at, id)
+end
+
+local function from_ready(id, kind)
+    redis.call('ZREM', P .. ':ready:' .. kind, id)
+    redis.call('ZREM', P .. ':ready_at', id)
+end
+
+local function touch(node, jobs, bytes)
+    redis.call('HSET', P .. ':nodes', node, now)
+    if jobs > 0 then
+        local bucket = P .. ':rate:' .. node .. ':' .. math.floor(now / 60)
+        redis.call('HINCRBY', bucket, 'jobs', jobs)
+        redis.call('HINCRBY', bucket, 'bytes', bytes)
+        redis.call('EXPIRE', bucket, 3600)
+    end
+end
+
+-- 到期的重试任务放回可执行队列
+local function promote()
+    local due = redis.call('ZRANGEBYSCORE', P .. ':delayed', '-inf', now, 'LIMIT', 0, 1000)
+    for _, id in ipairs(due) do
+        local f = redis.call('HMGET', P .. ':job:' .. id, 'kind', 'priority', 'available_at')
+        redis.call('ZREM', P .. ':delayed', id)
+        to_ready(id, f[1], f[2], f[3])
+    end
+end
+
+-- 租约过期的任务放回队列，已用完尝试次数的进入死信
+local function reclaim()
+    local expired = redis.call('ZRANGEBYSCORE', P .. ':leased', '-inf', now, 'LIMIT', 0, 1000)
+    for _, id in ipairs(expired) do
+        local job = P .. ':job:' .. id
+        local f = redis.call('HMGET', job, 'kind', 'priority', 'attempts', 'max_attempts')
+        local state = 'pending'
+        if tonumber(f[3]) >= tonumber(f[4]) then
+            state = 'dead'
+            redis.call('ZADD', P .. ':dead', now, id)
+        else
+            to_ready(id, f[1], f[2], now)
+        end
+        redis.call('ZREM', P .. ':leased', id)
+        redis.call('HSET', job, 'state', state, 'worker', '', 'lease_until', '', 'available_at', now,
+                   'updated_at', now, 'last_error', '租约过期，持有者可能已退出')
+        count(f[1], 'leased', -1)
+        count(f[1], state, 1)
+    end
+    return #expired
+end
+
+-- 调用者仍持有租约时返回任务的键和类型
+local function held(id, worker)
+    local job = P .. ':job:' .. id
+    local f = redis.call('HMGET', job, 'state', 'worker', 'kind')
+    if f[1] ~= 'leased' or f[2] ~= worker then
+        return nil
+    end
+    return job, f[3]
+end
+"""
+
+# ARGV: 前缀, 类型, 参数JSON, 优先级, 最多尝试次数, 延迟秒数, 键...
+_ENQUEUE = _PRELUDE + """
+local kind, payload, priority, max_attempts, delay = ARGV[2], ARGV[3], ARGV[4], ARGV[5], tonumber(ARGV[6])
+local added = 0
+for i = 7, #ARGV do
+    local key = ARGV[i]
+    if redis.call('HSETNX', P .. ':keys', kind .. ':' .. key, 0) == 1 then
+        local id = redis.call('INCR', P .. ':seq')
+        redis.call('HSET', P .. ':keys', kind .. ':' .. key, id)
+        redis.call('HSET', P .. ':job:' .. id, 'id', id, 'kind', kind, 'key', key, 'payload', payload,
+                   'priority', priority, 'state', 'pending', 'attempts', 0, 'max_attempts', max_attempts,
+                   'available_at', now + delay, 'created_at', now, 'updated_at', now)
+        if delay > 0 then
+            redis.call('ZADD', P .. ':delayed', now + delay, id)
+        else
+            to_ready(id, kind, priority, now)
+        end
+        count(kind, 'pending', 1)
+        added = added + 1
+    end
+end
+return added
+"""
+
+# ARGV: 前缀, 领取者, 租约秒数, 类型...
+# 返回: {收回的租约数, 任务字段...}
+_LEASE = _PRELUDE + """
+local worker, lease = ARGV[2], tonumber(ARGV[3])
+promote()
+local reclaimed = reclaim()
+local best, best_score, best_kind
+for i = 4, #ARGV do
+    local head = redis.call('ZRANGE', P .. ':ready:' .. ARGV[i], 0, 0, 'WITHSCORES')
+    if head[1] and (best == nil or tonumber(head[2]) < best_score) then
+        best, best_score, best_kind = head[1], tonumber(head[2]), ARGV[i]
+    end
+end
+if best == nil then
+    return {reclaimed}
+end
+local job = P .. ':job:' .. best
+from_ready(best, best_kind)
+redis.call('HINCRBY', job, 'attempts', 1)
+redis.call('HSET', job, 'state', 'leased', 'worker', worker, 'lease_until', now + lease, 'updated_at', now)
+redis.call('ZADD', P .. ':leased', now + lease, best)
+count(best_kind, 'pending', -1)
+count(best_kind, 'leased', 1)
+touch(ARGV[2]:match('^[^:]*'), 0, 0)
+local result = redis.call('HGETALL', job)
+table.insert(result, 1, reclaimed)
+return result
+"""
+
+# ARGV: 前缀, 任务ID, 领取者, 租约秒数
+_HEARTBEAT = _PRELUDE + """
+local job = held(ARGV[2], ARGV[3])
+if not job then
+    return 0
+end
+local lease_until = now + tonumber(ARGV[4])
+redis.call('HSET', job, 'lease_until', lease_until, 'updated_at', now)
+redis.call('ZADD', P .. ':leased', lease_until, ARGV[2])
+touch(ARGV[3]:match('^[^:]*'), 0, 0)
+return 1
+"""
+
+# ARGV: 前缀, 任务ID, 领取者, 结果JSON, 下载字节数
+_COMPLETE = _PRELUDE + """
+local job, kind = held(ARGV[2], ARGV[3])
+if not job then
+    return 0
+end
+redis.call('HSET', job, 'state', 'done', 'result', ARGV[4], 'last_error', '', 'lease_until', '', 'updated_at', now)
+redis.call('ZREM', P .. ':leased', ARGV[2])
+redis.call('ZADD', P .. ':done', now, ARGV[2])
+count(kind, 'leased', -1)
+count(kind, 'done', 1)
+touch(ARGV[3]:match('^[^:]*'), 1, tonumber(ARGV[5]))
+return 1
+"""
+
+# ARGV: 前缀, 任务ID, 领取者, 错误信息, 是否不再重试, 重试等待基数, 重试等待上限
+# 返回: {是否仍持有租约, 是否进入死信, 重试等待秒数}
+_FAIL = _PRELUDE + """
+local job, kind = held(ARGV[2], ARGV[3])
+if not job then
+    return {0, 0, 0}
+end
+local f = redis.call('HMGET', job, 'attempts', 'max_attempts')
+local dead = ARGV[5] == '1' or tonumber(f[1]) >= tonumber(f[2])
+local delay = math.min(tonumber(ARGV[7]), tonumber(ARGV[6]) * 2 ^ (tonumber(f[1]) - 1))
+redis.call('ZREM', P .. ':leased', ARGV[2])
+count(kind, 'leased', -1)
+if dead then
+    redis.call('HSET', job, 'state', 'dead', 'available_at', now)
+    redis.call('ZADD', P .. ':dead', now, ARGV[2])
+    count(kind, 'dead', 1)
+else
+    redis.call('HSET', job, 'state', 'pending', 'available_at', now + delay)
+    redis.call('ZADD', P .. ':delayed', now + delay, ARGV[2])
+    count(kind, 'pending', 1)
+end
+redis.call('HSET', job, 'last_error', ARGV[4], 'worker', '', 'lease_until', '', 'updated_at', now)
+touch(ARGV[3]:match('^[^:]*'), 0, 0)
+return {1, dead and 1 or 0, tostring(delay)}
+"""
+
+# ARGV: 前缀, 类型(空表示全部), 起始位置
+# 返回: {本次处理数, 放回队列数}，处理数达到 BATCH 时需要从 起始位置+处理数-放回数 再次调用
+_RETRY_DEAD = _PRELUDE + """
+local offset = tonumber(ARGV[3])
+local ids = redis.call('ZRANGE', P .. ':dead', offset, offset + 999)
+local retried = 0
+for _, id in ipairs(ids) do
+    local job = P .. ':job:' .. id
+    local f = redis.call('HMGET', job, 'kind', 'priority')
+    if ARGV[2] == '' or f[1] == ARGV[2] then
+        redis.call('ZREM', P .. ':dead', id)
+        redis.call('HSET', job, 'state', 'pending', 'attempts', 0, 'available_at', now, 'updated_at', now)
+        to_ready(id, f[1], f[2], now)
+        count(f[1], 'dead', -1)
+        count(f[1], 'pending', 1)
+        retried = retried + 1
+    end
+end
+return {#ids, retried}
+"""
+
+# ARGV: 前缀, 状态(done或dead)
+_PURGE = _PRELUDE + """
+local ids = redis.call('ZRANGE', P .. ':' .. ARGV[2], 0, 999)
+for _, id in ipairs(ids) do
+    local job = P .. ':job:' .. id
+    local f = redis.call('HMGET', job, 'kind', 'key')
+    redis.call('HDEL', P .. ':keys', f[1] .. ':' .. f[2])
+    redis.call('DEL', job)
+    redis.call('ZREM', P .. ':' .. ARGV[2], id)
+    count(f[1], ARGV[2], -1)
+end
+return #ids
+"""
+
+
+# ARGV: 前缀, 领取者, 有效期(秒), 作品ID...
+# 返回: 领取到的作品ID，已下载或正由其他进程下载的不返回
+_CLAIM = """
+local P, owner, ttl = ARGV[1], ARGV[2], ARGV[3]
+local claimed = {}
+for i = 4, #ARGV do
+    local id = ARGV[i]
+    if redis.call('HEXISTS', P .. ':seen', id) == 0 then
+        local key = P .. ':claim:' .. id
+        if redis.call('SET', key, owner, 'NX', 'EX', ttl) then
+            table.insert(claimed, id)
+        elseif redis.call('GET', key) == owner then
+            -- 自己已领取的作品续期
+            redis.call('EXPIRE', key, ttl)
+            table.insert(claimed, id)
+        end
+    end
+end
+return claimed
+"""
+
+# ARGV: 前缀, 领取者, 是否记为已下载, 作品ID...
+_SETTLE = """
+local P, owner = ARGV[1], ARGV[2]
+for i = 4, #ARGV do
+    local id = ARGV[i]
+    if ARGV[3] == '1' then
+        redis.call('HSET', P .. ':seen', id, owner)
+    end
+    if redis.call('GET', P .. ':claim:' .. id) == owner then
+        redis.call('DEL', P .. ':claim:' .. id)
+    end
+end
+return #ARGV - 3
+"""
+
+
+def connect(url):
+    """创建Redis连接，未安装redis库时给出安装提示"""
+    if redis is None:
+        raise RuntimeError("使用Redis队列需要安装redis库: pip install redis")
+    return redis.Redis.from_url(url, decode_responses=True)
+
+
+class RedisJobQueue:
+    """
+    Redis任务队列，接口与 job_queue.JobQueue 相同
+
+    多台机器上的工作进程共用一个队列: 每个任务同一时间只会被一个进程领取，节点宕机时租约到期后由其他节点接手。
+    完成任务时按节点累计每分钟的任务数和下载量，stats() 中的 nodes 为各节点最近 THROUGHPUT_WINDOW 秒的吞吐量。
+    """
+
+    def __init__(self, url, lease_seconds=DEFAULT_LEASE, prefix=DEFAULT_PREFIX):
+        """
+        Args:
+            url (str): Redis地址，如 redis://host:6379/0
+            lease_seconds (int, optional): 租约时长(秒). Defaults to DEFAULT_LEASE.
+            prefix (str, optional): 键前缀. Defaults to DEFAULT_PREFIX.
+        """
+        self.path = url
+        self.lease_seconds = lease_seconds
+        self.prefix = prefix
+        self._redis = connect(url)
+        self._scripts = {
+            name: self._redis.register_script(source)
+            for name, source in (("enqueue", _ENQUEUE), ("lease", _LEASE), ("heartbeat", _HEARTBEAT),
+                                 ("complete", _COMPLETE), ("fail", _FAIL), ("retry_dead", _RETRY_DEAD),
+                                 ("purge", _PURGE))
+        }
+
+    def _run(self, name, *args):
+        return self._scripts[name](args=[self.prefix, *args])
+
+    def close(self):
+        self._redis.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def enqueue(self, kind, key, payload=None, priority=0, max_attempts=DEFAULT_MAX_ATTEMPTS, delay=0):
+        return self.enqueue_many(kind, [key], payload, priority, max_attempts, delay) == 1
+
+    def enqueue_many(self, kind, keys, payload=None, priority=0, max_attempts=DEFAULT_MAX_ATTEMPTS, delay=0):
+        """批量添加同类任务，每 BATCH 个键一次原子调用，返回新增的任务数"""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"未知的任务类型: {kind}，可选: {', '.join(JOB_KINDS)}")
+        data = json.dumps(payload or {}, ensure_ascii=False)
+        keys = [str(key) for key in keys]
+        added = 0
+        for start in range(0, len(keys), BATCH):
+            added += self._run("enqueue", kind, data, priority, max_attempts, delay, *keys[start:start + BATCH])
+        return added
+
+    def lease(self, worker=None, kinds=None):
+        worker = worker or default_worker_id()
+        reply = self._run("lease", worker, self.lease_seconds, *(kinds or JOB_KINDS))
+        if reply[0]:
+            logger.warning(f"收回 {reply[0]} 个租约过期的任务")
+        if len(reply) == 1:
+            return None
+        row = dict(zip(reply[1::2], reply[2::2]))
+        for field in ("id", "priority", "attempts", "max_attempts"):
+            row[field] = int(row[field])
+        return QueueJob(row, worker)
+
+    def heartbeat(self, job):
+        return self._run("heartbeat", job.id, job.worker, self.lease_seconds) == 1
+
+    def complete(self, job, result=None):
+        nbytes = (result or {}).get("bytes", 0) if isinstance(result, dict) else 0
+        data = json.dumps(result, ensure_ascii=False) if result is not None else ""
+        if self._run("complete", job.id, job.worker, data, int(nbytes)) != 1:
+            logger.warning(f"任务 {job.id} 的租约已失效，结果未记录")
+            return False
+        return True
+
+    def fail(self, job, error, permanent=False):
+        held, dead, delay = self._run("fail", job.id, job.worker, str(error)[:1000], int(permanent),
+                                      RETRY_BASE, RETRY_MAX)
+        if held:
+            if dead:
+                logger.warning(f"任务 {job.kind}:{job.key} 失败 {job.attempts} 次，进入死信: {error}")
+            else:
+                logger.info(f"任务 {job.kind}:{job.key} 第{job.attempts}次失败，{float(delay):.0f}秒后重试: {error}")
+        return held == 1
+
+    def retry_dead(self, kind=None):
+        total = offset = 0
+        while True:
+            scanned, retried = self._run("retry_dead", kind or "", offset)
+            total += retried
+            # 其他类型的死信留在原处，下次从它们之后开始
+            offset += scanned - retried
+            if scanned < BATCH:
+                return total
+
+    def purge(self, state=DONE):
+        if state not in (DONE, DEAD):
+            raise ValueError(f"只能删除 {DONE} 或 {DEAD} 状态的任务")
+        total = 0
+        while True:
+            removed = self._run("purge", state)
+            total += removed
+            if removed < BATCH:
+                return total
+
+    def dead(self, limit=50):
+        ids = self._redis.zrevrange(f"{self.prefix}:dead", 0, limit - 1)
+        pipe = self._redis.pipeline()
+        for job_id in ids:
+            pipe.hmget(f"{self.prefix}:job:{job_id}", "kind", "key", "attempts", "last_error", "updated_at")
+        rows = []
+        for job_id, (kind, key, attempts, error, updated) in zip(ids, pipe.execute()):
+            rows.append({"id": int(job_id), "kind": kind, "key": key, "attempts": int(attempts or 0),
+                         "last_error": error, "updated_at": float(updated or 0)})
+        return rows
+
+    def stats(self):
+        p = self.prefix
+        seconds, micros = self._redis.time()
+        now = seconds + micros / 1e6
+        pipe = self._redis.pipeline()
+        pipe.hgetall(f"{p}:counts")
+        for kind in JOB_KINDS:
+            pipe.zcard(f"{p}:ready:{kind}")
+        pipe.zrange(f"{p}:ready_at", 0, 0, withscores=True)
+        # 已到期但还没有被领取操作移回可执行队列的重试任务
+        pipe.zrangebyscore(f"{p}:delayed", "-inf", now, start=0, num=1, withscores=True)
+        pipe.zcount(f"{p}:delayed", "-inf", now)
+        pipe.hgetall(f"{p}:nodes")
+        replies = pipe.execute()
+        counts, ready_sizes = replies[0], replies[1:1 + len(JOB_KINDS)]
+        oldest_ready, oldest_due, due, nodes = replies[1 + len(JOB_KINDS):]
+
+        states = dict.fromkeys(STATES, 0)
+        kinds = {}
+        for field, value in counts.items():
+            kind, state = field.rsplit(":", 1)
+            if int(value):
+                kinds.setdefault(kind, dict.fromkeys(STATES, 0))[state] = int(value)
+                states[state] += int(value)
+        ready = sum(ready_sizes) + due
+        oldest = min([score for _, score in oldest_ready + oldest_due], default=None)
+        return {
+            "states": states,
+            "kinds": kinds,
+            "ready": ready,
+            "delayed": states[PENDING] - ready,
+            "oldest_ready_age": round(now - oldest, 1) if oldest else 0,
+            "nodes": self._nodes(nodes, now),
+        }
+
+    def _nodes(self, nodes, now):
+        first = int(now // 60) - THROUGHPUT_WINDOW // 60 + 1
+        minutes = range(first, int(now // 60) + 1)
+        active = {node: float(last) for node, last in nodes.items() if now - float(last) < THROUGHPUT_WINDOW}
+        pipe = self._redis.pipeline()
+        for node in active:
+            for minute in minutes:
+                pipe.hgetall(f"{self.prefix}:rate:{node}:{minute}")
+        buckets = iter(pipe.execute())
+        result = {}
+        for node, last in active.items():
+            jobs = nbytes = 0
+            for _ in minutes:
+                bucket = next(buckets)
+                jobs += int(bucket.get("jobs", 0))
+                nbytes += int(bucket.get("bytes", 0))
+            result[node] = throughput(jobs, nbytes, now - last)
+        return result
+
+
+class RedisSeenSet:
+    """
+    所有节点共用的已下载作品集合，与各节点本机的下载清单配合使用
+
+    下载前用 claim() 领取作品，同一时间只有一个进程下载同一个作品；
+    下载成功后 record() 记为已下载，失败时 release() 放弃领取，领取在 ttl 秒后也会自动失效
+    """
+
+    def __init__(self, url, prefix=DEFAULT_PREFIX):
+        self.prefix = prefix
+        self.key = f"{prefix}:seen"
+        self._redis = connect(url)
+        self._claim = self._redis.register_script(_CLAIM)
+        self._settle = self._redis.register_script(_SETTLE)
+
+    def missing(self, aweme_ids):
+        """返回任何节点都尚未下载的作品ID，保持原顺序"""
+        aweme_ids = list(aweme_ids)
+        missing = []
+        for start in range(0, len(aweme_ids), BATCH):
+            chunk = aweme_ids[start:start + BATCH]
+            missing.extend(aweme_id for aweme_id, node in zip(chunk, self._redis.hmget(self.key, chunk))
+                           if node is None)
+        return missing
+
+    def claim(self, aweme_ids, owner, ttl=DEFAULT_LEASE):
+        """领取尚未下载且没有其他进程正在下载的作品，返回领取到的作品ID，保持原顺序；同一领取者再次领取时续期"""
+        aweme_ids = list(aweme_ids)
+        claimed = []
+        for start in range(0, len(aweme_ids), BATCH):
+            claimed.extend(self._claim(args=[self.prefix, owner, int(ttl), *aweme_ids[start:start + BATCH]]))
+        return claimed
+
+    def _settle_many(self, aweme_ids, owner, seen):
+        aweme_ids = list(aweme_ids)
+        for start in range(0, len(aweme_ids), BATCH):
+            self._settle(args=[self.prefix, owner, int(seen), *aweme_ids[start:start + BATCH]])
+
+    def record(self, aweme_ids, owner):
+        """记录作品已由 owner（领取者标识，包含节点名）下载"""
+        self._settle_many(aweme_ids, owner, True)
+
+    def release(self, aweme_ids, owner):
+        """放弃领取，其他进程可以重新下载"""
+        self._settle_many(aweme_ids, owner, False)
+
+    def count(self):
+        return self._redis.hlen(self.key)
+
+    def close(self):
+        self._redis.close()
@@ -0,0 +1,515 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 本地回放服务，用 API/*.json 中的接口样例模拟抖音的搜索、作品列表、详情、用户信息和媒体文件
+              可以配置延迟、带宽、错误率和限流，用于离线测试搜索、翻页和下载的性能
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import random
+import hashlib
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, parse_qsl, quote, unquote
+
+from rich.console import Console
+from download_pool import parse_rate
+
+logger = logging.getLogger('douyin_search.replay')
+
+console = Console()
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "API")
+
+# 作品模板来源
+AWEME_FIXTURES = (
+    ("user_post_info_video.json", "aweme_list"),
+    ("user_post_info_image.json", "aweme_list"),
+    ("user_post_detail.json", "aweme_detail"),
+)
+PROFILE_FIXTURE = "user_profile_info.json"
+
+# 接口路径
+SEARCH_PATH = "/aweme/v1/web/search/item/"
+POST_PATH = "/aweme/v1/web/aweme/post/"
+DETAIL_PATH = "/aweme/v1/web/aweme/detail/"
+PROFILE_PATH = "/aweme/v1/web/user/profile/other/"
+# 当前登录用户，用于校验cookie
+QUERY_USER_PATH = "/aweme/v1/web/query/user/"
+MEDIA_PATH = "/media/"
+# 与 Server/Server.py 相同的签名接口，返回固定算法生成的假签名
+SIGN_PATH = "/xg/path/"
+
+# 媒体文件按块发送，便于限速和模拟中途断开
+SEND_CHUNK = 16 * 1024
+
+
+def _load(name):
+    with open(os.path.join(API_DIR, name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class Catalog:
+    """
+    由接口样例生成的作品目录
+
+    每个作品复制自一个样例，分配新的aweme_id、发布时间和作者，
+    视频和图片地址改写为本服务的 /media/ 地址，data_size 和 file_hash 与实际返回的内容一致。
+    """
+
+    def __init__(self, base_url, items=100, users=3, media_size=512 * 1024):
+        """
+        Args:
+            base_url (str): 本服务的地址，用于改写媒体地址
+            items (int, optional): 作品总数. Defaults to 100.
+            users (int, optional): 作者数量，作品按顺序轮流分配. Defaults to 3.
+            media_size (int, optional): 最高清晰度视频的大小(字节)，其余清晰度按码率缩小. Defaults to 512K.
+        """
+        self.base_url = base_url.rstrip("/")
+        self.media_size = media_size
+        self.templates = []
+        for name, key in AWEME_FIXTURES:
+            data = _load(name)[key]
+            self.templates.extend(data if isinstance(data, list) else [data])
+        self.profile = _load(PROFILE_FIXTURE)
+
+        self.users = [f"MS4wLjABAAAA_replay_user_{i:03d}" for i in range(users)]
+        now = int(time.time())
+        # 按发布时间从新到旧排列
+        self.index = []
+        for i in range(items):
+            self.index.append({
+                "aweme_id": str(7300000000000000000 + i),
+                "template": i % len(self.templates),
+                "sec_uid": self.users[i % users],
+                "create_time": now - i * 3600,
+            })
+        self.by_id = {entry["aweme_id"]: entry for entry in self.index}
+        self._hashes = {}
+        self._lock = threading.Lock()
+
+    # -- 媒体内容 -------------------------------------------------------------
+
+    @staticmethod
+    def media_bytes(name, size):
+        """同一个名字总是生成相同的内容"""
+        return random.Random(name).randbytes(size)
+
+    def media_hash(self, name, size):
+        with self._lock:
+            if (name, size) not in self._hashes:
+                self._hashes[(name, size)] = hashlib.md5(self.media_bytes(name, size)).hexdigest()
+            return self._hashes[(name, size)]
+
+    def media_urls(self, name, size):
+        """同一内容给出两个"镜像"地址，127.0.0.1 和 localhost 指向同一服务"""
+        path = f"{MEDIA_PATH}{quote(name)}?size={size}"
+        urls = [self.base_url + path]
+        if "127.0.0.1" in self.base_url:
+            urls.append(self.base_url.replace("127.0.0.1", "localhost") + path)
+        return urls
+
+    # -- 作品 ---------------------------------------------------------------
+
+    def aweme(self, entry):
+        """生成一个作品的aweme_info"""
+        aweme = copy.deepcopy(self.templates[entry["template"]])
+        aweme_id = entry["aweme_id"]
+        aweme["aweme_id"] = aweme_id
+        aweme["create_time"] = entry["create_time"]
+        author = aweme.get("author") or {}
+        author["sec_uid"] = entry["sec_uid"]
+        aweme["author"] = author
+
+        video = aweme.get("video") or {}
+        gears = video.get("bit_rate") or []
+        top = max([g.get("bit_rate") or 0 for g in gears] + [1])
+        for gear in gears:
+            size = max(1024, self.media_size * (gear.get("bit_rate") or top) // top)
+            name = f"{aweme_id}/{gear.get('gear_name', 'default')}.mp4"
+            play_addr = gear.get("play_addr") or {}
+            play_addr.update(url_list=self.media_urls(name, size), data_size=size,
+                             file_hash=self.media_hash(name, size))
+            gear["play_addr"] = play_addr
+        if video.get("play_addr"):
+            name = f"{aweme_id}/default.mp4"
+            size = self.media_size
+            video["play_addr"].update(url_list=self.media_urls(name, size), data_size=size,
+                                      file_hash=self.media_hash(name, size))
+
+        for index, image in enumerate(aweme.get("images") or []):
+            size = max(1024, self.media_size // 8)
+            for key in ("url_list", "download_url_list"):
+                urls = []
+                for fmt in ("webp", "jpeg"):
+                    urls.extend(self.media_urls(f"{aweme_id}/{index + 1}.{fmt}", size))
+                image[key] = urls
+        return aweme
+
+    def publish(self, sec_uid=None, count=1):
+        """
+        发布新作品，排在最前面，用于测试增量同步
+
+        Args:
+            sec_uid (str, optional): 作者，None表示轮流分配给所有作者. Defaults to None.
+            count (int, optional): 作品数. Defaults to 1.
+
+        Returns:
+            list: 新作品的aweme_id
+        """
+        # 发布时间各不相同，且晚于已有的作品，翻页时不会因为时间相同漏掉作品
+        start = max(int(time.time()), self.index[0]["create_time"] + 1 if self.index else 0)
+        entries = []
+        for i in range(count):
+            number = len(self.by_id)
+            entry = {
+                "aweme_id": str(7300000000000000000 + number),
+                "template": number % len(self.templates),
+                "sec_uid": sec_uid or self.users[number % len(self.users)],
+                "create_time": start + i,
+            }
+            self.by_id[entry["aweme_id"]] = entry
+            entries.append(entry)
+        # 列表整体替换，不影响正在翻页的请求
+        self.index = entries[::-1] + self.index
+        return [entry["aweme_id"] for entry in entries]
+
+    def warm(self):
+        """预先生成所有作品的媒体哈希，避免第一次请求的耗时计入测试结果"""
+        for entry in self.index:
+            self.aweme(entry)
+
+    def search(self, cursor, count):
+        entries = self.index[cursor:cursor + count]
+        return {
+            "status_code": 0,
+            "data": [{"type": 1, "aweme_info": self.aweme(entry)} for entry in entries],
+            "cursor": cursor + len(entries),
+            "has_more": int(cursor + len(entries) < len(self.index)),
+        }
+
+    def posts(self, sec_uid, max_cursor, count):
+        """max_cursor为上一页最后一个作品的发布时间(毫秒)，0表示从最新开始"""
+        entries = [e for e in self.index if e["sec_uid"] == sec_uid and
+                   (not max_cursor or e["create_time"] * 1000 < max_cursor)]
+        page = entries[:count]
+        return {
+            "status_code": 0,
+            "aweme_list": [self.aweme(entry) for entry in page],
+            "max_cursor": page[-1]["create_time"] * 1000 if page else max_cursor,
+            "min_cursor": page[0]["create_time"] * 1000 if page else 0,
+            "has_more": int(len(entries) > count),
+        }
+
+    def detail(self, aweme_id):
+        entry = self.by_id.get(aweme_id)
+        if not entry:
+            return {"status_code": 0, "aweme_detail": None}
+        return {"status_code": 0, "aweme_detail": self.aweme(entry)}
+
+    def user(self, sec_uid):
+        profile = copy.deepcopy(self.profile)
+        user = profile.get("user") or {}
+        user["sec_uid"] = sec_uid
+        user["aweme_count"] = sum(1 for e in self.index if e["sec_uid"] == sec_uid)
+        profile["user"] = user
+        return profile
+
+
+class Faults:
+    """延迟、带宽、错误率和限流设置"""
+
+    def __init__(self, latency=0.0, jitter=0.0, bandwidth=None, error_rate=0.0, rate_limit=None):
+        """
+        Args:
+            latency (float, optional): 每个请求的固定延迟(秒). Defaults to 0.
+            jitter (float, optional): 随机附加的延迟上限(秒). Defaults to 0.
+            bandwidth (int, optional): 每个响应的带宽上限(字节/秒). Defaults to None.
+            error_rate (float, optional): 请求失败的比例，接口返回500，媒体返回503或中途断开. Defaults to 0.
+            rate_limit (float, optional): 每秒允许的接口请求数，超出时返回429. Defaults to None.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self._tokens = rate_limit or 0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def delay(self):
+        wait = self.latency + random.random() * self.jitter
+        if wait > 0:
+            time.sleep(wait)
+
+    def should_fail(self):
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+    def allow(self):
+        """令牌桶限流，返回是否放行"""
+        if not self.rate_limit:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit, self._tokens + (now - self._updated) * self.rate_limit)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """回放服务的请求处理"""
+
+    protocol_version = "HTTP/1.1"
+    catalog = None
+    faults = None
+    stats = None
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _count(self, key):
+        with self.stats["lock"]:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def _send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 429:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self._write(body)
+
+    def _write(self, body, limit=None):
+        """按块发送，限速时控制每块的发送时间；limit表示发送多少字节后断开"""
+        rate = self.faults.bandwidth
+        started = time.monotonic()
+        sent = 0
+        end = len(body) if limit is None else limit
+        while sent < end:
+            chunk = body[sent:min(end, sent + SEND_CHUNK)]
+            self.wfile.write(chunk)
+            sent += len(chunk)
+            if rate:
+                ahead = sent / rate - (time.monotonic() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+        if limit is not None:
+            self.close_connection = True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        self._count("requests")
+        self.faults.delay()
+
+        if url.path.startswith(MEDIA_PATH):
+            return self._media(url.path[len(MEDIA_PATH):], query)
+
+        if url.path == "/":
+            return self._send_json(200, {"status_code": 0})
+
+        if url.path == SIGN_PATH:
+            return self._sign(query.get("url", ""))
+
+        if url.path == QUERY_USER_PATH:
+            return self._query_user(self.headers.get("Cookie", ""))
+
+        # 模拟单个账号的问题: cookie中带有 replay_fault=limited 时限流，replay_fault=flagged 时返回空结果
+        fault = dict(parse_qsl(self.headers.get("Cookie", "").replace("; ", "&"))).get("replay_fault")
+        if fault == "limited":
+            self._count("rate_limited")
+            return self._send_json(429, {"status_code": 429, "status_msg": "too many requests"})
+        if fault == "flagged":
+            self._count("flagged")
+            return self._send_json(200, {"status_code": 0, "data": [], "aweme_list": [], "has_more": 0, "cursor": 0})
+
+        if not self.faults.allow():
+            self._count("rate_limited")
+            return self._send_json(429, {"status_code": 429, "status_msg": "too many requests"})
+        if self.faults.should_fail():
+            self._count("errors")
+            return self._send_json(500, {"status_code": 500, "status_msg": "injected error"})
+
+        if url.path == SEARCH_PATH:
+            data = self.catalog.search(int(query.get("cursor") or 0), int(query.get("count") or 10))
+        elif url.path == POST_PATH:
+            data = self.catalog.posts(query.get("sec_user_id", ""), int(query.get("max_cursor") or 0),
+                                      int(query.get("count") or 18))
+        elif url.path == DETAIL_PATH:
+            data = self.catalog.detail(query.get("aweme_id", ""))
+        elif url.path == PROFILE_PATH:
+            data = self.catalog.user(query.get("sec_user_id", ""))
+        else:
+            return self._send_json(404, {"status_code": 404, "status_msg": "not found"})
+        self._count("api")
+        self._send_json(200, data)
+
+    def _sign(self, url_path):
+        """模拟本地签名服务的 /xg/path/ 响应"""
+        self._count("sign")
+        params = dict(parse_qsl(url_path))
+        params["X-Bogus"] = hashlib.md5(url_path.encode("utf-8")).hexdigest()[:28]
+        self._send_json(200, {"status_code": "200", "result": [{"params": params}]})
+
+    def _query_user(self, cookie):
+        """带有 ttwid 或 sessionid 的cookie视为有效"""
+        self._count("query_user")
+        names = {part.split("=", 1)[0].strip() for part in cookie.split(";") if "=" in part}
+        if names & {"ttwid", "sessionid"}:
+            return self._send_json(200, {"status_code": 0, "user_uid": "0", "user_uid_type": 0})
+        self._send_json(200, {"status_code": 8, "status_msg": "用户未登录"})
+
+    def _media(self, name, query):
+        name = unquote(name)
+        size = int(query.get("size") or 0)
+        if not size:
+            return self._send_json(404, {"status_code": 404, "status_msg": "not found"})
+        body = self.catalog.media_bytes(name, size)
+
+        fail = self.faults.should_fail()
+        if fail and random.random() < 0.5:
+            self._count("errors")
+            return self._send_json(503, {"status_code": 503, "status_msg": "injected error"})
+
+        start, end, status = 0, size - 1, 200
+        range_header = self.headers.get("Range")
+        if range_header and range_header.startswith("bytes="):
+            first, _, last = range_header[6:].partition("-")
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+            status = 206
+        body = body[start:end + 1]
+
+        self.send_response(status)
+        self.send_header("Content-Type", "video/mp4" if name.endswith(".mp4") else f"image/{name.rsplit('.', 1)[-1]}")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", f'"{self.catalog.media_hash(name, size)}"')
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+
+        self._count("media")
+        if fail:
+            # 发送一部分后断开，模拟网络中断
+            self._count("errors")
+            self._write(body, limit=random.randint(0, len(body)))
+        else:
+            self._write(body)
+
+
+class QuietServer(ThreadingHTTPServer):
+    """客户端断开导致的写入错误是预期行为，不打印堆栈"""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        logger.debug(f"客户端 {client_address} 连接异常")
+
+
+class ReplayServer:
+    """
+    本地回放服务
+
+    用法:
+        with ReplayServer(items=200, latency=0.05) as server:
+            searcher = DouyinSearcher(base_url=server.base_url, use_local_server=False)
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, items=100, users=3, media_size=512 * 1024,
+                 latency=0.0, jitter=0.0, bandwidth=None, error_rate=0.0, rate_limit=None):
+        """
+        Args:
+            host (str, optional): 监听地址. Defaults to "127.0.0.1".
+            port (int, optional): 端口，0表示随机. Defaults to 0.
+            items, users, media_size: 见 Catalog
+            latency, jitter, bandwidth, error_rate, rate_limit: 见 Faults
+        """
+        self.stats = {"lock": threading.Lock()}
+        handler = type("Handler", (ReplayHandler,), {})
+        self.httpd = QuietServer((host, port), handler)
+        self.base_url = f"http://{host}:{self.httpd.server_address[1]}"
+        handler.catalog = Catalog(self.base_url, items, users, media_size)
+        handler.faults = Faults(latency, jitter, parse_rate(bandwidth), error_rate, rate_limit)
+        handler.stats = self.stats
+        self.catalog = handler.catalog
+        self.faults = handler.faults
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def counters(self):
+        """请求计数: requests、api、sign、media、errors、rate_limited"""
+        with self.stats["lock"]:
+            return {k: v for k, v in self.stats.items() if k != "lock"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="抖音接口本地回放服务")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址，默认127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900, help="端口，默认8900")
+    parser.add_argument("--items", type=int, default=100, help="作品总数，默认100")
+    parser.add_argument("--users", type=int, default=3, help="作者数量，默认3")
+    parser.add_argument("--media-size", default="512K", help="最高清晰度视频的大小，默认512K")
+    parser.add_argument("--latency", type=float, default=0, help="每个请求的延迟(毫秒)，默认0")
+    parser.add_argument("--jitter", type=float, default=0, help="随机附加的延迟上限(毫秒)，默认0")
+    parser.add_argument("--bandwidth", help="每个响应的带宽上限，如 2M，默认不限速")
+    parser.add_argument("--error-rate", type=float, default=0, help="请求失败的比例(0-1)，默认0")
+    parser.add_argument("--rate-limit", type=float, help="每秒允许的接口请求数，超出返回429，默认不限")
+    args = parser.parse_args()
+
+    server = ReplayServer(
+        host=args.host,
+        port=args.port,
+        items=args.items,
+        users=args.users,
+        media_size=parse_rate(args.media_size),
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        bandwidth=args.bandwidth,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+    )
+    console.print(f"[bold green]回放服务已启动: {server.base_url}[/bold green]")
+    console.print(f"[bold cyan]作者: {', '.join(server.catalog.users)}[/bold cyan]")
+    console.print(f"[bold cyan]python search_cli.py 测试 --base-url {server.base_url} --signer-url {server.base_url}[/bold cyan]")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        console.print(f"[bold green]请求统计: {server.counters()}[/bold green]")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
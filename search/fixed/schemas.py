@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: aweme_info / aweme_detail / user 的类型化结构，只解码用到的字段
+              安装了msgspec时直接从响应字节解码并跳过未知字段，否则退回 json.loads 后按结构构造
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import json
+import logging
+import dataclasses
+from dataclasses import dataclass
+from typing import List, Optional, get_type_hints, get_origin, get_args, Union
+
+from gallery import IMAGE_POST_TYPE, format_of
+
+logger = logging.getLogger('douyin_search.schemas')
+
+try:
+    import msgspec
+    HAS_MSGSPEC = True
+    # msgspec.ValidationError 也是 DecodeError 的子类
+    DecodeError = (msgspec.DecodeError, json.JSONDecodeError)
+except ImportError:
+    msgspec = None
+    HAS_MSGSPEC = False
+    DecodeError = json.JSONDecodeError
+
+
+# 字段取自 API/ 下的接口样例，接口中可能为null的字段都声明为Optional
+
+@dataclass
+class Statistics:
+    digg_count: Optional[int] = 0
+    comment_count: Optional[int] = 0
+    share_count: Optional[int] = 0
+    collect_count: Optional[int] = 0
+    play_count: Optional[int] = 0
+
+
+@dataclass
+class User:
+    uid: Optional[str] = ""
+    sec_uid: Optional[str] = ""
+    nickname: Optional[str] = None
+    unique_id: Optional[str] = None
+    signature: Optional[str] = None
+    follower_count: Optional[int] = 0
+    aweme_count: Optional[int] = 0
+
+
+@dataclass
+class PlayAddr:
+    uri: Optional[str] = ""
+    url_list: Optional[List[str]] = None
+    width: Optional[int] = 0
+    height: Optional[int] = 0
+    data_size: Optional[int] = None
+    file_hash: Optional[str] = None
+    file_cs: Optional[str] = None
+    url_key: Optional[str] = ""
+
+
+@dataclass
+class BitRate:
+    gear_name: Optional[str] = ""
+    quality_type: Optional[int] = None
+    bit_rate: Optional[int] = 0
+    is_h265: Optional[int] = 0
+    play_addr: Optional[PlayAddr] = None
+
+
+@dataclass
+class Video:
+    play_addr: Optional[PlayAddr] = None
+    bit_rate: Optional[List[BitRate]] = None
+    duration: Optional[int] = 0
+    width: Optional[int] = 0
+    height: Optional[int] = 0
+
+
+@dataclass
+class Image:
+    uri: Optional[str] = ""
+    url_list: Optional[List[str]] = None
+    download_url_list: Optional[List[str]] = None
+    width: Optional[int] = 0
+    height: Optional[int] = 0
+
+
+@dataclass
+class Aweme:
+    aweme_id: Optional[str] = ""
+    desc: Optional[str] = None
+    create_time: Optional[int] = 0
+    aweme_type: Optional[int] = 0
+    is_top: Optional[int] = 0
+    author: Optional[User] = None
+    statistics: Optional[Statistics] = None
+    video: Optional[Video] = None
+    images: Optional[List[Image]] = None
+
+
+@dataclass
+class SearchItem:
+    type: Optional[int] = None
+    aweme_info: Optional[Aweme] = None
+
+
+@dataclass
+class SearchPage:
+    status_code: Optional[int] = 0
+    data: Optional[List[SearchItem]] = None
+    cursor: Optional[int] = 0
+    # 缺少该字段时为None，与明确返回0(没有更多结果)区分
+    has_more: Optional[int] = None
+
+
+@dataclass
+class AwemeListPage:
+    status_code: Optional[int] = 0
+    aweme_list: Optional[List[Aweme]] = None
+    max_cursor: Optional[int] = 0
+    min_cursor: Optional[int] = 0
+    has_more: Optional[int] = 0
+
+
+@dataclass
+class AwemeDetailPage:
+    status_code: Optional[int] = 0
+    aweme_detail: Optional[Aweme] = None
+
+
+@dataclass
+class UserProfilePage:
+    status_code: Optional[int] = 0
+    user: Optional[User] = None
+
+
+# -- 无msgspec时的构造 --------------------------------------------------------
+
+_hints = {}
+
+
+def _fields(cls):
+    if cls not in _hints:
+        hints = get_type_hints(cls)
+        _hints[cls] = [(f.name, hints[f.name]) for f in dataclasses.fields(cls)]
+    return _hints[cls]
+
+
+def _build(tp, value):
+    """按类型注解把json.loads的结果转换为结构，忽略未声明的字段"""
+    if value is None:
+        return None
+    origin = get_origin(tp)
+    if origin is Union:
+        tp = next(arg for arg in get_args(tp) if arg is not type(None))
+        origin = get_origin(tp)
+    if origin is list:
+        item_type = get_args(tp)[0]
+        return [_build(item_type, item) for item in value]
+    if dataclasses.is_dataclass(tp):
+        kwargs = {}
+        for name, hint in _fields(tp):
+            if name in value:
+                kwargs[name] = _build(hint, value[name])
+        return tp(**kwargs)
+    return value
+
+
+def from_dict(cls, data):
+    """
+    从已解码的dict构造结构
+
+    Args:
+        cls (type): 结构类型，如 Aweme
+        data (dict): json.loads 的结果
+
+    Returns:
+        cls: 结构对象
+    """
+    return _build(cls, data)
+
+
+_decoders = {}
+
+
+def decode(data, cls):
+    """
+    从响应字节解码为结构
+
+    Args:
+        data (bytes|str): 响应内容
+        cls (type): 结构类型，如 AwemeListPage
+
+    Returns:
+        cls: 结构对象
+    """
+    if HAS_MSGSPEC:
+        if cls not in _decoders:
+            _decoders[cls] = msgspec.json.Decoder(cls)
+        return _decoders[cls].decode(data)
+    return from_dict(cls, json.loads(data))
+
+
+# -- 字段提取 -----------------------------------------------------------------
+# 作品信息只在这里提取，按dict处理的路径 (DouyinSearcher._extract_video_info、stream_select.extract_variants、
+# gallery.extract_images) 先用 from_dict() 转换为结构再调用这里的函数
+
+def _variant(gear_name, quality_type, bit_rate, is_h265, play_addr, duration):
+    return {
+        "gear_name": gear_name or "",
+        "quality_type": quality_type,
+        "bit_rate": bit_rate or 0,
+        "is_h265": bool(is_h265),
+        "width": play_addr.width or 0,
+        "height": play_addr.height or 0,
+        "data_size": play_addr.data_size,
+        "duration": duration or 0,
+        "file_hash": play_addr.file_hash,
+        "file_cs": play_addr.file_cs,
+        "uri": play_addr.uri or "",
+        "url_key": play_addr.url_key or "",
+        "url_list": play_addr.url_list or [],
+    }
+
+
+def variants_of(video):
+    """从 Video 结构中提取所有可下载的视频流，没有bit_rate列表时退回到默认的play_addr"""
+    if video is None:
+        return []
+    variants = [
+        _variant(item.gear_name, item.quality_type, item.bit_rate, item.is_h265, item.play_addr, video.duration)
+        for item in video.bit_rate or []
+        if item.play_addr and item.play_addr.url_list
+    ]
+    if not variants and video.play_addr and video.play_addr.url_list:
+        variants.append(_variant("default", None, 0, False, video.play_addr, video.duration))
+    return variants
+
+
+def images_of(aweme, watermark=False):
+    """从 Aweme 结构中提取图集的所有图片，watermark 为 True 时使用带水印的download_url_list"""
+    images = []
+    for index, image in enumerate(aweme.images or []):
+        url_list = (image.download_url_list if watermark else image.url_list) or image.url_list or []
+        urls = {}
+        for url in url_list:
+            urls.setdefault(format_of(url), []).append(url)
+        if not urls:
+            continue
+        images.append({
+            "index": index + 1,
+            "uri": image.uri or "",
+            "width": image.width or 0,
+            "height": image.height or 0,
+            "urls": urls,
+        })
+    return images
+
+
+def video_info(aweme):
+    """
+    提取视频信息
+
+    Args:
+        aweme (Aweme): 作品结构
+
+    Returns:
+        dict: 视频信息
+    """
+    statistics = aweme.statistics or Statistics()
+    is_image = bool(aweme.images) or aweme.aweme_type == IMAGE_POST_TYPE
+    return {
+        "aweme_id": aweme.aweme_id or "",
+        "desc": aweme.desc if aweme.desc is not None else "无描述",
+        "create_time": aweme.create_time or 0,
+        "is_top": bool(aweme.is_top),
+        "author": aweme.author.nickname if aweme.author and aweme.author.nickname is not None else "未知作者",
+        "like_count": statistics.digg_count or 0,
+        "comment_count": statistics.comment_count or 0,
+        "share_url": f"https://www.douyin.com/video/{aweme.aweme_id or ''}",
+        "variants": variants_of(aweme.video),
+        "images": images_of(aweme) if is_image else [],
+    }
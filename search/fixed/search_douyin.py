@@ -8,16 +8,27 @@
 -------------------------------------------------
 """
 
+import os
 import re
-import json
+import sys
 import time
 import random
 import logging
 import requests
 import subprocess
+from contextlib import nullcontext
 from urllib.parse import quote, urlencode
-from rich.console import Console
-from rich.progress import Progress
+from download_pool import DownloadPool
+from cdn_hosts import host_of
+from stream_select import StreamPolicy
+from manifest import DownloadManifest, DEFAULT_MANIFEST
+from cookie_store import CookieStore
+import dedup
+import gallery
+from stream_json import ItemStream
+from tracing import tracer
+import schemas
+import progress_output
 
 # 设置日志
 logging.basicConfig(
@@ -26,13 +37,36 @@ logging.basicConfig(
 )
 logger = logging.getLogger('douyin_search')
 
-# Rich控制台显示
-console = Console()
+# Rich控制台显示，无界面模式下静默
+console = progress_output.console
+
+# 接口地址，可以通过环境变量指向本地回放服务 (replay_server.py)
+DEFAULT_BASE_URL = os.environ.get("DOUYIN_BASE_URL", "https://www.douyin.com")
+
+# 本地签名服务地址 (Server/Server.py)
+DEFAULT_SIGNER_URL = os.environ.get("DOUYIN_SIGNER_URL", "http://localhost:8889")
+
+# 流式解析响应时每次读取的字节数
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# 网络检查成功后的有效期(秒)，期间多次调用 download_videos 不再重复检查
+NETWORK_CHECK_TTL = 60
+
+def show_results(videos):
+    """逐条显示搜索结果，无界面模式下只输出数量"""
+    if progress_output.is_headless():
+        progress_output.emit("results", count=len(videos))
+        return
+    console.print("[bold green]搜索结果:[/bold green]")
+    for idx, video in enumerate(videos):
+        console.print(f"[{idx+1}] {video['desc'][:50]}... - 作者: {video['author']} - 点赞: {video['like_count']}")
+
 
 class DouyinSearcher:
     """抖音搜索类，支持通过关键词搜索抖音视频"""
     
-    def __init__(self, cookie=None, auto_cookie=False, use_local_server=True):
+    def __init__(self, cookie=None, auto_cookie=False, use_local_server=True, manifest_path=DEFAULT_MANIFEST,
+                 base_url=None, signer_url=None, page_delay=(1, 3), cookie_pool=None, proxy_pool=None):
         """
         初始化搜索类
         
@@ -40,16 +74,33 @@ class DouyinSearcher:
             cookie (str, optional): 抖音cookie字符串. Defaults to None.
             auto_cookie (bool, optional): 是否自动获取cookie. Defaults to False.
             use_local_server (bool, optional): 是否使用本地签名服务. Defaults to True.
+            manifest_path (str, optional): 下载清单路径，None表示不记录也不跳过已下载的作品. Defaults to DEFAULT_MANIFEST.
+            base_url (str, optional): 接口地址，如本地回放服务 http://127.0.0.1:8900. Defaults to DEFAULT_BASE_URL.
+            signer_url (str, optional): 本地签名服务地址. Defaults to DEFAULT_SIGNER_URL.
+            page_delay (tuple, optional): 翻页之间的随机延迟范围(秒)，避免被反爬. Defaults to (1, 3).
+            cookie_pool (CookiePool, optional): 多账号cookie池，指定时每次请求从池中选择cookie. Defaults to None.
+            proxy_pool (ProxyPool, optional): 代理池，搜索、签名和下载请求都从池中选择代理，同一个cookie固定使用同一个代理. Defaults to None.
         """
-        self.base_url = "https://www.douyin.com"
-        self.search_url = "https://www.douyin.com/search/{}"
-        self.api_search_url = "https://www.douyin.com/aweme/v1/web/search/item/"
+        self.base_url = (base_url or DEFAULT_BASE_URL).rstrip("/")
+        self.search_url = self.base_url + "/search/{}"
+        self.api_search_url = self.base_url + "/aweme/v1/web/search/item/"
+        self.api_post_url = self.base_url + "/aweme/v1/web/aweme/post/"
+        self.api_detail_url = self.base_url + "/aweme/v1/web/aweme/detail/"
         self.use_local_server = use_local_server
+        self.signer_url = (signer_url or DEFAULT_SIGNER_URL).rstrip("/")
+        self.page_delay = page_delay
+        self.manifest = DownloadManifest(manifest_path) if manifest_path else None
+        self.cookie_store = None
+        self.cookie_pool = cookie_pool
+        self.proxy_pool = proxy_pool
+        # 翻页和多次搜索之间复用连接
+        self.session = requests.Session()
+        self._network_checked_at = None
         
         # 默认请求头
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-            "Referer": "https://www.douyin.com/",
+            "Referer": self.base_url + "/",
             "Accept": "application/json, text/plain, */*",
             "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
             "sec-ch-ua": '"Not A(Brand";v="99", "Google Chrome";v="121", "Chromium";v="121"',
@@ -68,78 +119,35 @@ class DouyinSearcher:
             self._auto_get_cookie()
     
     def _auto_get_cookie(self):
-        """尝试使用TikTokDownload的自动cookie功能"""
+        """
+        从cookie缓存获取cookie，缓存为空时才读取cookie文件和扫描浏览器
+        校验和临近过期时的刷新在后台进行，刷新后自动更新请求头
+        """
         logger.info("尝试使用自动cookie功能...")
-        
-        # 先直接测试f2包是否可用
-        try:
-            import sys
-            import importlib.util
-            
-            # 检查f2库是否已安装
-            f2_spec = importlib.util.find_spec("f2")
-            if f2_spec is None:
-                logger.warning("未找到f2库，无法自动获取cookie，请手动提供cookie")
-                logger.info(f"Python路径: {sys.path}")
-                return
-                
-            # 尝试导入f2
-            import f2
-            logger.info(f"成功导入f2库 (路径: {getattr(f2, '__path__', ['Unknown'])})")
-            
-            # 尝试导入cookie模块
-            try:
-                from f2.apps.douyin.utils.cookie import get_cookie_from_browser
-                
-                logger.info("尝试从Chrome浏览器获取cookie")
-                cookie = get_cookie_from_browser(domain=".douyin.com")
-                
-                if cookie:
-                    self.headers["Cookie"] = cookie
-                    logger.info("成功自动获取抖音cookie")
-                    # 只输出cookie的首尾部分，避免隐私问题
-                    cookie_prefix = cookie[:20] if len(cookie) > 20 else cookie
-                    logger.info(f"Cookie开头: {cookie_prefix}...")
-                else:
-                    logger.warning("没有从Chrome浏览器获取到cookie，尝试其他浏览器")
-                    
-                    # 尝试其他浏览器
-                    browsers = ["chrome", "firefox", "edge", "opera", "safari"]
-                    for browser in browsers:
-                        if browser == "chrome":
-                            continue  # 已经尝试过
-                        try:
-                            logger.info(f"尝试从{browser}浏览器获取cookie")
-                            cookie = get_cookie_from_browser(domain=".douyin.com", browser=browser)
-                            if cookie:
-                                self.headers["Cookie"] = cookie
-                                logger.info(f"成功从{browser}浏览器获取抖音cookie")
-                                break
-                        except Exception as e:
-                            logger.warning(f"从{browser}浏览器获取cookie失败: {str(e)}")
-                    
-                    if "Cookie" not in self.headers:
-                        logger.warning("无法自动获取抖音cookie，搜索功能可能受限")
-            except ImportError as e:
-                logger.warning(f"导入f2.apps.douyin.utils.cookie模块失败: {str(e)}")
-                logger.warning("无法使用自动cookie获取功能，请手动提供cookie")
-        except ImportError as e:
-            logger.warning(f"导入f2库失败: {str(e)}")
-            logger.warning("请确保已经安装f2库: pip install f2")
-            logger.warning("无法自动获取cookie，请手动提供cookie")
-        except Exception as e:
-            logger.warning(f"自动获取cookie时发生未知错误: {str(e)}")
-            logger.warning("无法自动获取cookie，请手动提供cookie")
+        self.cookie_store = CookieStore(base_url=self.base_url)
+        cookie = self.cookie_store.get(validate=False)
+        if not cookie:
+            logger.warning("无法自动获取抖音cookie，搜索功能可能受限，可以用 manual_cookie.py 手动获取")
+            return
+
+        self.headers["Cookie"] = cookie
+        # 只输出cookie的开头部分，避免隐私问题
+        logger.info(f"成功自动获取抖音cookie，Cookie开头: {cookie[:20]}...")
+        self.cookie_store.start_refresh(on_refresh=lambda fresh: self.headers.__setitem__("Cookie", fresh))
     
     def _check_network_connection(self):
         """
-        检查网络连接状态
+        检查网络连接状态，成功的结果在 NETWORK_CHECK_TTL 秒内有效
         """
+        checked_at = self._network_checked_at
+        if checked_at is not None and time.monotonic() - checked_at < NETWORK_CHECK_TTL:
+            return True
         try:
             # 尝试访问抖音的域名
-            response = requests.get("https://www.douyin.com", headers=self.headers, timeout=5)
+            response = self.session.get(self.base_url, headers=self.headers, timeout=5)
             if response.status_code == 200:
                 logger.info("网络连接正常")
+                self._network_checked_at = time.monotonic()
                 return True
             else:
                 logger.warning(f"网络连接异常，状态码: {response.status_code}")
@@ -157,6 +165,26 @@ class DouyinSearcher:
             keyword (str): 搜索关键词
             cursor (str, optional): 分页游标. Defaults to "0".
 
+        Returns:
+            dict: 包含签名的参数字典
+        """
+        return self._sign({
+            "keyword": keyword,
+            "count": "10",
+            "cursor": cursor,
+            "type": "1",  # 1表示视频
+            "aid": "6383",
+            "device_platform": "webapp",
+            "from_page": "search"
+        })
+    
+    def _sign(self, params):
+        """
+        为接口参数生成XBogus签名，依次尝试f2库和本地签名服务，都不可用时返回原参数
+        
+        Args:
+            params (dict): 接口参数
+            
         Returns:
             dict: 包含签名的参数字典
         """
@@ -164,19 +192,9 @@ class DouyinSearcher:
             # 尝试导入f2库中的XBogus生成函数
             from f2.apps.douyin.utils.xbogus import get_xbogus
             
-            params = {
-                "keyword": keyword,
-                "count": "10",
-                "cursor": cursor,
-                "type": "1",  # 1表示视频
-                "aid": "6383",
-                "device_platform": "webapp",
-                "from_page": "search"
-            }
-            
             query = urlencode(params)
             xbogus = get_xbogus(query)
-            params["X-Bogus"] = xbogus
+            params = dict(params, **{"X-Bogus": xbogus})
             logger.info(f"使用f2库生成XBogus参数: {xbogus}")
             
             return params
@@ -185,30 +203,24 @@ class DouyinSearcher:
             if self.use_local_server:
                 logger.info("尝试使用本地Server服务生成XBogus参数")
                 try:
-                    params_str = f"keyword={quote(keyword)}&count=10&cursor={cursor}&type=1&aid=6383&device_platform=webapp&from_page=search"
-                    response = requests.get(f"http://localhost:8889/xg/path/?url={quote(params_str)}", timeout=5)
+                    params_str = urlencode(params, quote_via=quote)
+                    # 签名服务在本机时直连，部署在远端时经过代理池
+                    http_get = self.proxy_pool.get if self.proxy_pool else requests.get
+                    response = http_get(f"{self.signer_url}/xg/path/?url={quote(params_str)}", timeout=5)
                     
                     if response.status_code == 200:
                         data = response.json()
                         if data.get("status_code") == "200":
                             result = data.get("result", [{}])[0]
-                            params = result.get("params", {})
-                            logger.info(f"使用本地服务生成XBogus参数: {params.get('X-Bogus', 'None')}")
-                            return params
+                            signed = result.get("params", {})
+                            logger.info(f"使用本地服务生成XBogus参数: {signed.get('X-Bogus', 'None')}")
+                            return signed
                 except Exception as e:
-                    logger.warning(f"无法使用本地Server服务生成签名，原因: {str(e)}，搜索可能失败")
+                    logger.warning(f"无法使用本地Server服务生成签名，原因: {str(e)}，请求可能失败")
             
             # 退化方案：返回基本参数
-            logger.info("使用基本参数进行搜索")
-            return {
-                "keyword": keyword,
-                "count": "10",
-                "cursor": cursor,
-                "type": "1",
-                "aid": "6383",
-                "device_platform": "webapp",
-                "from_page": "search"
-            }
+            logger.info("使用基本参数进行请求")
+            return params
     
     def search(self, keyword, max_count=20, max_retries=3):
         """
@@ -227,22 +239,45 @@ class DouyinSearcher:
         results = []
         cursor = "0"
         retry_count = 0
+        # 使用cookie池时每个cookie都有机会重试一次
+        retry_limit = max_retries + (len(self.cookie_pool) - 1 if self.cookie_pool else 0)
         
-        with Progress() as progress:
+        with progress_output.progress("search") as progress, tracer.span("search", keyword=keyword, max_count=max_count) as search_span:
             search_task = progress.add_task("[cyan]搜索中...", total=max_count)
             
             while len(results) < max_count:
+                lease = None
+                proxy = None
+                response = None
                 try:
                     # 生成请求参数
-                    params = self._generate_signature(keyword, cursor)
+                    with tracer.span("sign", cursor=cursor):
+                        params = self._generate_signature(keyword, cursor)
+                    
+                    # 使用cookie池时每次请求从池中选择cookie
+                    headers = self.headers
+                    if self.cookie_pool:
+                        lease = self.cookie_pool.acquire()
+                        if lease:
+                            headers = dict(self.headers, Cookie=lease.cookie)
+                    
+                    # 使用代理池时按cookie固定出口，cookie换了代理也跟着换
+                    if self.proxy_pool:
+                        proxy = self.proxy_pool.acquire(lease.name if lease else "default")
                     
                     # 发送请求
-                    response = requests.get(
-                        self.api_search_url, 
-                        headers=self.headers,
-                        params=params,
-                        timeout=10
-                    )
+                    started = time.monotonic()
+                    with tracer.span("request", cursor=cursor, cookie=lease.name if lease else "",
+                                     proxy=proxy.name if proxy else "") as span:
+                        response = self.session.get(
+                            self.api_search_url, 
+                            headers=headers,
+                            params=params,
+                            timeout=10,
+                            stream=True,
+                            proxies=proxy.proxies if proxy else None
+                        )
+                        span.set(status=response.status_code)
                     
                     # 添加更多调试信息
                     logger.info(f"请求URL: {response.url}")
@@ -251,87 +286,305 @@ class DouyinSearcher:
                     # 检查响应状态
                     if response.status_code != 200:
                         logger.warning(f"搜索请求失败，状态码: {response.status_code}")
+                        self._report_cookie(lease, response.status_code)
+                        self._report_proxy(proxy, response, started)
                         retry_count += 1
-                        if retry_count >= max_retries:
+                        if retry_count >= retry_limit:
                             break
-                        time.sleep(2 + random.random() * 3)
+                        self._sleep(2 + random.random() * 3, "retry")
                         continue
                     
-                    # 解析响应数据
+                    # 逐个解析作品，提取完需要的字段后即丢弃
+                    data = {}
+                    count = 0
                     try:
-                        data = response.json()
-                        logger.debug(f"响应数据: {str(data)[:200]}...")  # 输出前200个字符用于调试
-                    except json.JSONDecodeError:
-                        logger.error("响应不是有效的JSON")
-                        logger.debug(f"响应内容: {response.text[:500]}...")  # 输出前500个字符
+                        for video_info in self._iter_search_page(response, data):
+                            count += 1
+                            if len(results) >= max_count:
+                                break
+                            
+                            # 仅添加有效ID的视频结果
+                            if video_info and video_info["aweme_id"]:
+                                results.append(video_info)
+                                progress.update(search_task, advance=1)
+                        logger.debug(f"响应字段: {str(data)[:200]}...")  # 输出前200个字符用于调试
+                    except schemas.DecodeError as e:
+                        logger.error(f"响应不是有效的JSON: {str(e)}")
+                        # 被风控的cookie常常得到空响应
+                        self._report_cookie(lease, 200, empty=True)
                         retry_count += 1
-                        if retry_count >= max_retries:
+                        if retry_count >= retry_limit:
                             break
-                        time.sleep(2 + random.random() * 3)
+                        self._sleep(2 + random.random() * 3, "retry")
                         continue
+                    finally:
+                        response.close()
+                        self._report_proxy(proxy, response, started)
                     
-                    # 提取视频信息
-                    items = data.get("data", [])
-                    if not items:
-                        logger.info("没有更多结果或搜索结束")
+                    # has_more为0说明已到结果末尾，此时的空页不是cookie的问题
+                    finished = data.get("has_more") == 0
+                    self._report_cookie(lease, 200, empty=not count and not finished)
+                    if len(results) >= max_count:
                         break
-                    
-                    # 处理每个视频项
-                    for item in items:
-                        if len(results) >= max_count:
-                            break
-                            
-                        # 确保是视频类型
-                        if item.get("type") != 1:  # 1代表视频
-                            continue
-                            
-                        aweme = item.get("aweme_info", {})
-                        if not aweme:
+                    if finished:
+                        logger.info("搜索结束，没有更多结果")
+                        break
+                    if not count:
+                        # 空结果可能是cookie被风控，池中还有其他cookie时换一个重试
+                        if lease and self.cookie_pool.available():
+                            logger.warning(f"cookie {lease.name} 得到空结果，换一个cookie重试")
+                            retry_count += 1
+                            if retry_count >= retry_limit:
+                                break
                             continue
-                            
-                        # 提取需要的信息
-                        video_info = {
-                            "aweme_id": aweme.get("aweme_id", ""),
-                            "desc": aweme.get("desc", "无描述"),
-                            "create_time": aweme.get("create_time", 0),
-                            "author": aweme.get("author", {}).get("nickname", "未知作者"),
-                            "like_count": aweme.get("statistics", {}).get("digg_count", 0),
-                            "comment_count": aweme.get("statistics", {}).get("comment_count", 0),
-                            "share_url": f"https://www.douyin.com/video/{aweme.get('aweme_id', '')}"
-                        }
-                        
-                        # 仅添加有效ID的结果
-                        if video_info["aweme_id"]:
-                            results.append(video_info)
-                            progress.update(search_task, advance=1)
+                        logger.info("没有更多结果或搜索结束")
+                        break
+                    # 重试次数按页计算，换cookie重试成功后不占用后面页的重试次数
+                    retry_count = 0
                     
                     # 更新游标
                     cursor = str(data.get("cursor", 0))
-                    if cursor == "0" or not items:
+                    if cursor == "0":
                         logger.info("搜索结束，没有更多结果")
                         break
                         
                     # 添加随机延迟，避免被反爬
-                    time.sleep(1 + random.random() * 2)
+                    self.wait_page_delay()
                     
                 except Exception as e:
                     logger.error(f"搜索过程中出错: {str(e)}")
+                    self._report_cookie(lease, None)
+                    # 拿到响应之后的错误与代理无关
+                    if response is None and proxy:
+                        self.proxy_pool.report(proxy, None)
                     retry_count += 1
-                    if retry_count >= max_retries:
+                    if retry_count >= retry_limit:
                         break
-                    time.sleep(2 + random.random() * 3)
+                    self._sleep(2 + random.random() * 3, "retry")
+            
+            search_span.set(results=len(results), retries=retry_count)
         
         console.print(f"[bold green]搜索完成，共找到 {len(results)} 个视频[/bold green]")
+        progress_output.emit("search", keyword=keyword, count=len(results), retries=retry_count)
         return results
     
-    def download_videos(self, video_list, download_dir=None, save_to_file=True):
+    def _iter_search_page(self, response, meta):
         """
-        使用TikTokDownload下载视频
+        逐个产出搜索结果页中的视频信息
+        
+        安装了msgspec时按类型化结构直接从响应字节解码，只解码用到的字段；
+        否则边接收边增量解析。非视频类型的结果产出None。
+        
+        Args:
+            response (requests.Response): 以stream=True发出的搜索请求
+            meta (dict): 解析完成后写入cursor、has_more等顶层字段
+            
+        Yields:
+            dict|None: 视频信息
+        """
+        if schemas.HAS_MSGSPEC:
+            with tracer.span("request.body") as span:
+                body = response.content
+                span.set(bytes=len(body))
+            with tracer.span("decode", parser="msgspec"):
+                page = schemas.decode(body, schemas.SearchPage)
+            for item in page.data or []:
+                # 1代表视频
+                with tracer.span("extract"):
+                    video_info = schemas.video_info(item.aweme_info) if item.type == 1 and item.aweme_info else None
+                yield video_info
+            meta.update(cursor=page.cursor, has_more=page.has_more)
+            return
+        
+        # 流式解析时接收和解码交替进行，decode包含接收响应体的时间
+        stream = ItemStream(response.iter_content(STREAM_CHUNK_SIZE), keys=("data",))
+        items = iter(stream)
+        while True:
+            with tracer.span("decode", parser="stream"):
+                item = next(items, None)
+            if item is None:
+                break
+            aweme = item.get("aweme_info", {})
+            with tracer.span("extract"):
+                video_info = self._extract_video_info(aweme) if item.get("type") == 1 and aweme else None
+            yield video_info
+        meta.update(stream.meta)
+
+    def _api_get(self, url, params):
+        """
+        签名后请求接口，使用cookie池和代理池时记录结果
+        
+        Args:
+            url (str): 接口地址
+            params (dict): 未签名的参数
+            
+        Returns:
+            tuple: (响应内容, 使用的cookie)，调用方解析后用 _report_cookie() 记录是否为空结果
+            
+        Raises:
+            requests.exceptions.RequestException: 网络错误
+            RuntimeError: 状态码不是200
+        """
+        with tracer.span("sign"):
+            params = self._sign(params)
+        lease = self.cookie_pool.acquire() if self.cookie_pool else None
+        headers = dict(self.headers, Cookie=lease.cookie) if lease else self.headers
+        proxy = self.proxy_pool.acquire(lease.name if lease else "default") if self.proxy_pool else None
+        
+        started = time.monotonic()
+        try:
+            with tracer.span("request", url=url, cookie=lease.name if lease else "",
+                             proxy=proxy.name if proxy else "") as span:
+                response = self.session.get(url, headers=headers, params=params, timeout=10,
+                                            proxies=proxy.proxies if proxy else None)
+                body = response.content
+                span.set(status=response.status_code, bytes=len(body))
+        except requests.exceptions.RequestException:
+            self._report_cookie(lease, None)
+            if proxy:
+                self.proxy_pool.report(proxy, None)
+            raise
+        self._report_proxy(proxy, response, started)
+        if response.status_code != 200:
+            self._report_cookie(lease, response.status_code)
+            raise RuntimeError(f"请求 {url} 失败，状态码: {response.status_code}")
+        return body, lease
+
+    def fetch_detail(self, aweme_id):
+        """
+        获取单个作品的信息
+        
+        Args:
+            aweme_id (str): 作品ID
+            
+        Returns:
+            dict|None: 视频信息，格式同搜索结果，作品不存在时返回None
+        """
+        body, lease = self._api_get(self.api_detail_url, {
+            "aweme_id": aweme_id,
+            "aid": "6383",
+            "device_platform": "webapp"
+        })
+        try:
+            with tracer.span("decode"):
+                page = schemas.decode(body, schemas.AwemeDetailPage)
+        except schemas.DecodeError:
+            self._report_cookie(lease, 200, empty=True)
+            raise
+        self._report_cookie(lease, 200)
+        return schemas.video_info(page.aweme_detail) if page.aweme_detail else None
+
+    def fetch_user_page(self, sec_uid, max_cursor=0, count=18):
+        """
+        获取用户作品列表的一页
+        
+        Args:
+            sec_uid (str): 用户的sec_uid
+            max_cursor (int, optional): 上一页返回的max_cursor，0表示从最新的作品开始. Defaults to 0.
+            count (int, optional): 每页数量. Defaults to 18.
+            
+        Returns:
+            dict: {"videos": 视频信息列表, "max_cursor": 下一页的游标, "has_more": 是否还有下一页}
+        """
+        body, lease = self._api_get(self.api_post_url, {
+            "sec_user_id": sec_uid,
+            "max_cursor": max_cursor,
+            "count": count,
+            "aid": "6383",
+            "device_platform": "webapp"
+        })
+        try:
+            with tracer.span("decode"):
+                page = schemas.decode(body, schemas.AwemeListPage)
+        except schemas.DecodeError:
+            self._report_cookie(lease, 200, empty=True)
+            raise
+        self._report_cookie(lease, 200)
+        with tracer.span("extract"):
+            videos = [schemas.video_info(aweme) for aweme in page.aweme_list or []]
+        return {"videos": videos, "max_cursor": page.max_cursor or 0, "has_more": bool(page.has_more)}
+
+    def iter_user_posts(self, sec_uid, max_count=None):
+        """
+        按 max_cursor 逐页获取用户的作品，从最新的开始
+        
+        Args:
+            sec_uid (str): 用户的sec_uid
+            max_count (int, optional): 最多获取的作品数，None表示全部. Defaults to None.
+            
+        Yields:
+            dict: 视频信息
+        """
+        max_cursor = 0
+        fetched = 0
+        while True:
+            page = self.fetch_user_page(sec_uid, max_cursor)
+            for video in page["videos"]:
+                if max_count is not None and fetched >= max_count:
+                    return
+                fetched += 1
+                yield video
+            if not page["has_more"] or not page["videos"]:
+                return
+            max_cursor = page["max_cursor"]
+            self.wait_page_delay()
+
+    def wait_page_delay(self):
+        """翻页之间按 page_delay 随机等待，避免被反爬"""
+        low, high = self.page_delay
+        self._sleep(low + random.random() * (high - low), "page_delay")
+
+    def _report_cookie(self, lease, status, empty=False):
+        """把请求结果记入cookie池的健康度"""
+        if lease:
+            self.cookie_pool.report(lease, status, empty)
+
+    def _report_proxy(self, proxy, response, started):
+        """把请求结果和传输的字节数记入代理池"""
+        if proxy:
+            self.proxy_pool.report(proxy, response.status_code, response.raw.tell(),
+                                   time.monotonic() - started, response.elapsed.total_seconds())
+
+    def _sleep(self, seconds, reason):
+        """等待，记录为sleep阶段"""
+        if seconds <= 0:
+            return
+        with tracer.span("sleep", reason=reason, seconds=round(seconds, 3)):
+            time.sleep(seconds)
+
+    def _extract_video_info(self, aweme):
+        """
+        从aweme_info中提取需要的字段
+        
+        Args:
+            aweme (dict): 搜索结果或作品列表中的aweme_info
+            
+        Returns:
+            dict: 视频信息
+        """
+        return schemas.video_info(schemas.from_dict(schemas.Aweme, aweme))
+
+    def download_videos(self, video_list, download_dir=None, save_to_file=True,
+                        concurrency=4, per_host=2, bandwidth_limit=None, connections=1,
+                        stream_policy="best", force=False, on_mismatch="retry", image_format="webp", pool=None):
+        """
+        并发下载视频和图集，有播放地址的直接从CDN下载，否则调用TikTokDownload下载
         
         Args:
             video_list (list): 视频信息列表
             download_dir (str, optional): 下载目录. Defaults to None.
             save_to_file (bool, optional): 是否将视频信息保存到文件. Defaults to True.
+            concurrency (int, optional): 同时下载的视频数. Defaults to 4.
+            per_host (int, optional): 每个CDN主机的并发上限. Defaults to 2.
+            bandwidth_limit (int|str, optional): 所有下载共享的带宽上限，如 "2M". Defaults to None.
+            connections (int, optional): 单个大文件并行下载的连接数. Defaults to 1.
+            stream_policy (str|StreamPolicy, optional): 视频流选择策略，如 "smallest"、"max-size=50M". Defaults to "best".
+            force (bool, optional): 忽略下载清单，重新下载已下载过的作品. Defaults to False.
+            on_mismatch (str, optional): 大小或MD5与接口给出的data_size/file_hash不符时的处理:
+                retry(重新下载一次，仍失败则隔离)、quarantine(隔离)、mark(保留并标记). Defaults to "retry".
+            image_format (str, optional): 图集作品的首选图片格式，webp 或 jpeg. Defaults to "webp".
+            pool (DownloadPool, optional): 复用已有的下载池（如守护进程中常驻的下载池），
+                指定时忽略并发、限速等下载池参数，结束后不关闭. Defaults to None.
             
         Returns:
             list: 下载结果列表
@@ -342,9 +595,31 @@ class DouyinSearcher:
             
         console.print(f"[bold green]准备处理 {len(video_list)} 个视频[/bold green]")
         
+        # 下载前按策略选择每个视频的清晰度
+        if not isinstance(stream_policy, StreamPolicy):
+            stream_policy = StreamPolicy.parse(stream_policy)
+        best_policy = StreamPolicy("best")
+        selected = {}
+        selected_bytes = best_bytes = 0
+        for video in video_list:
+            if video.get("images"):
+                # 图集作品的video字段是配乐幻灯片，下载图片而不是视频
+                continue
+            variants = video.get("variants") or []
+            variant = stream_policy.select(variants)
+            if variant:
+                selected[video["aweme_id"]] = variant
+                selected_bytes += variant["data_size"] or 0
+                best_bytes += best_policy.select(variants)["data_size"] or 0
+        if selected and best_bytes and str(stream_policy) != "best":
+            console.print(
+                f"[bold green]清晰度策略 {stream_policy}: 共 {selected_bytes / 1024 / 1024:.1f}MB"
+                f"（最高画质为 {best_bytes / 1024 / 1024:.1f}MB）[/bold green]"
+            )
+        
         # 始终保存到文件，便于手动下载
         output_file = "douyin_videos.txt"
-        with open(output_file, "w", encoding="utf-8") as f:
+        with tracer.span("export", items=len(video_list)), open(output_file, "w", encoding="utf-8") as f:
             f.write("# 抖音视频搜索结果\n")
             f.write("# 可以使用TikTokTool.py手动下载这些视频\n\n")
             
@@ -355,7 +630,14 @@ class DouyinSearcher:
                 f.write(f"   描述: {video['desc'][:100]}\n")
                 f.write(f"   链接: {video_url}\n")
                 f.write(f"   点赞数: {video.get('like_count', 0)}\n")
-                f.write(f"   作者: {video.get('author', '未知')}\n\n")
+                f.write(f"   作者: {video.get('author', '未知')}\n")
+                variant = selected.get(video_id)
+                if video.get("images"):
+                    f.write(f"   图集: {len(video['images'])} 张\n")
+                elif variant:
+                    size_mb = (variant["data_size"] or 0) / 1024 / 1024
+                    f.write(f"   清晰度: {variant['gear_name']} {variant['width']}x{variant['height']} {size_mb:.1f}MB\n")
+                f.write("\n")
         
         console.print(f"[bold green]已将视频信息保存到 {output_file}[/bold green]")
         
@@ -374,97 +656,190 @@ class DouyinSearcher:
                 "message": "已保存信息到文件，请手动下载"
             } for video in video_list]
         
+        # 跳过下载清单中已有的作品（任意清晰度），在任何网络请求之前完成
+        results = []
+        if self.manifest and not force:
+            pending = set(self.manifest.missing([video["aweme_id"] for video in video_list]))
+            for video in video_list:
+                if video["aweme_id"] not in pending:
+                    record = self.manifest.get(video["aweme_id"])[0]
+                    results.append({
+                        "video_id": video["aweme_id"],
+                        "desc": video["desc"][:30],
+                        "success": True,
+                        "skipped": True,
+                        "message": "已下载，跳过",
+                        "path": record["path"],
+                        "variant": record["variant"]
+                    })
+            video_list = [video for video in video_list if video["aweme_id"] in pending]
+            if results:
+                console.print(f"[bold cyan]下载清单中已有 {len(results)} 个视频，跳过[/bold cyan]")
+            if not video_list:
+                console.print(f"[bold green]下载完成: {len(results)}/{len(results)} 成功[/bold green]")
+                progress_output.emit("download", total=len(results), success=len(results), skipped=len(results))
+                return results
+        
         # 如果需要自动下载，则尝试下载
         try:
-            # 获取当前运行的Python解释器路径
-            import sys
-            python_executable = sys.executable
-            logger.info(f"使用Python解释器: {python_executable}")
-            
             # 先检查网络连接
             self._check_network_connection()
             
-            results = []
-            with Progress() as progress:
-                download_task = progress.add_task("[cyan]下载中...", total=len(video_list))
-                
-                for idx, video in enumerate(video_list):
+            futures = []
+            progress_output.notify("download_start", videos=len(video_list))
+            with tracer.span("download", videos=len(video_list)), nullcontext(pool) if pool else DownloadPool(
+                concurrency=concurrency,
+                per_host=per_host,
+                bandwidth_limit=bandwidth_limit,
+                host_overrides={host_of(self.base_url): 1},
+                headers={"User-Agent": self.headers["User-Agent"]},
+                connections=connections,
+                on_mismatch=on_mismatch,
+                proxy_pool=self.proxy_pool
+            ) as pool:
+                for video in video_list:
                     video_id = video["aweme_id"]
+                    description = f"{video_id} {video['desc'][:15]}"
                     
-                    console.print(f"[{idx+1}/{len(video_list)}] 开始下载: {video['desc'][:30]}...")
-                    
-                    # 构建命令
-                    cmd = [python_executable, "TikTokTool.py", "1"]  # 选择抖音
-                    
-                    # 添加下载目录参数
-                    if download_dir:
-                        cmd.extend(["--dir", download_dir])
-                    
-                    # 添加视频ID
-                    cmd.extend(["--vid", video_id])
+                    # 图集作品的所有图片并发下载，全部完成后整体写入作品目录
+                    if video.get("images"):
+                        post = gallery.submit_post(
+                            pool, video_id, video["images"], download_dir or "Download", image_format
+                        )
+                        futures.append((video, post))
+                        continue
                     
-                    # 执行命令 - 修复编码问题
-                    try:
-                        # 主要修复：使用UTF-8编码处理子进程输出
-                        process = subprocess.Popen(
-                            cmd,
-                            stdout=subprocess.PIPE,
-                            stderr=subprocess.PIPE,
-                            cwd="E:\\code_learning\\douyindownload\\TikTokDownload",
-                            text=False,  # 改为二进制模式
-                            encoding=None  # 不设置编码
+                    # 搜索结果中带有播放地址时直接从CDN下载，否则交给TikTokTool.py处理
+                    variant = selected.get(video_id)
+                    if variant:
+                        path = os.path.join(download_dir or "Download", f"{video_id}.mp4")
+                        # 其他关键词或用户下已经下载过同一内容时直接复用，不再请求CDN
+                        reused = self.manifest and dedup.reuse(
+                            self.manifest, path, variant["file_hash"], variant["uri"], variant["gear_name"]
                         )
-                        
-                        # 获取命令输出结果（二进制模式）
-                        stdout, stderr = process.communicate()
-                        
-                        # 手动使用UTF-8解码（如果解码失败则使用忽略错误的方式）
-                        try:
-                            stdout_str = stdout.decode('utf-8') if stdout else ""
-                        except UnicodeDecodeError:
-                            stdout_str = stdout.decode('utf-8', errors='ignore') if stdout else ""
-                            
-                        try:
-                            stderr_str = stderr.decode('utf-8') if stderr else ""
-                        except UnicodeDecodeError:
-                            stderr_str = stderr.decode('utf-8', errors='ignore') if stderr else ""
-                        
-                        success = process.returncode == 0
-                        results.append({
-                            "video_id": video_id,
-                            "desc": video["desc"][:30],
-                            "success": success,
-                            "message": "下载成功" if success else "下载失败"
-                        })
-                        
-                        if success:
-                            logger.info(f"视频 {video_id} 下载成功")
-                        else:
-                            logger.warning(f"视频 {video_id} 下载失败: {stderr_str[:500]}...")
-                            
-                    except Exception as e:
-                        logger.error(f"下载过程中出错: {str(e)}")
+                        if reused:
+                            self.manifest.record(
+                                video_id,
+                                variant["gear_name"],
+                                reused["path"],
+                                size=reused["size"],
+                                hash=reused["hash"],
+                                expected_size=variant["data_size"],
+                                expected_hash=variant["file_hash"],
+                                uri=variant["uri"],
+                                storage=reused["storage"]
+                            )
+                            results.append({
+                                "video_id": video_id,
+                                "desc": video["desc"][:30],
+                                "success": True,
+                                "skipped": True,
+                                "message": f"内容已存在，复用 {reused['source']}",
+                                "path": reused["path"],
+                                "variant": variant["gear_name"],
+                                "size": reused["size"]
+                            })
+                            continue
+                        future = pool.fetch(
+                            variant["url_list"],
+                            path,
+                            description,
+                            expected_size=variant["data_size"],
+                            expected_hash=variant["file_hash"]
+                        )
+                    else:
+                        future = pool.submit(
+                            description,
+                            self._download_with_tool,
+                            video_id,
+                            download_dir,
+                            host=host_of(self.base_url)
+                        )
+                    futures.append((video, future))
+            
+            for video, future in futures:
+                video_id = video["aweme_id"]
+                try:
+                    result = future.result()
+                    if isinstance(future, gallery.PostDownload):
+                        if result["success"] and self.manifest:
+                            self.manifest.record(
+                                video_id, f"images-{image_format}", result["path"], size=result["size"]
+                            )
+                        result.update({"video_id": video_id, "desc": video["desc"][:30], "variant": f"images-{image_format}"})
+                        results.append(result)
+                        continue
+                    if isinstance(result, dict) and "success" in result:
+                        result["desc"] = video["desc"][:30]
+                        if result["success"] and self.manifest:
+                            # TikTokTool.py 不返回文件路径，标记为外部下载，verify 不核对这些记录
+                            self.manifest.record(video_id, "tiktoktool", None, storage=dedup.STORAGE_EXTERNAL)
+                        results.append(result)
+                        continue
+                    variant = selected[video_id]
+                    if result["quarantined"]:
+                        # 隔离的文件不写入清单，下次运行会重新下载
                         results.append({
                             "video_id": video_id,
                             "desc": video["desc"][:30],
                             "success": False,
-                            "message": f"下载异常: {str(e)}"
+                            "message": f"校验失败，已隔离: {result['verify_error']}",
+                            "path": result["path"],
+                            "variant": variant["gear_name"],
+                            "verified": False
                         })
+                        continue
                     
-                    # 更新进度
-                    progress.update(download_task, advance=1)
-                    
-                    # 添加随机延迟，避免被反爬
-                    time.sleep(1 + random.random() * 2)
+                    logger.info(f"视频 {video_id} 下载成功")
+                    if self.manifest:
+                        # 接口没有file_hash或uri不同的重复内容，下载后按MD5合并
+                        storage = dedup.STORAGE_FILE
+                        if result["verified"] is not False:
+                            storage = dedup.collapse(self.manifest, result["path"], result["md5"])
+                        self.manifest.record(
+                            video_id,
+                            variant["gear_name"],
+                            result["path"],
+                            size=result["size"],
+                            hash=result["md5"],
+                            source_url=result["url"],
+                            expected_size=variant["data_size"],
+                            expected_hash=variant["file_hash"],
+                            verified=result["verified"],
+                            verify_error=result["verify_error"],
+                            uri=variant["uri"],
+                            storage=storage
+                        )
+                    results.append({
+                        "video_id": video_id,
+                        "desc": video["desc"][:30],
+                        "success": True,
+                        "message": "下载成功" if result["verified"] is not False else f"下载成功，校验未通过: {result['verify_error']}",
+                        "path": result["path"],
+                        "variant": variant["gear_name"],
+                        "size": result["size"],
+                        "verified": result["verified"]
+                    })
+                except Exception as e:
+                    logger.error(f"下载过程中出错: {str(e)}")
+                    results.append({
+                        "video_id": video_id,
+                        "desc": video["desc"][:30],
+                        "success": False,
+                        "message": f"下载异常: {str(e)}"
+                    })
             
             # 统计下载结果
             success_count = sum(1 for r in results if r["success"])
             console.print(f"[bold green]下载完成: {success_count}/{len(results)} 成功[/bold green]")
+            progress_output.emit("download", total=len(results), success=success_count,
+                                 skipped=sum(1 for r in results if r.get("skipped")))
             
             return results
             
         except Exception as e:
             logger.error(f"自动下载失败: {str(e)}")
+            progress_output.emit("download", total=len(video_list), success=0, error=str(e))
             console.print(f"[bold red]自动下载失败: {str(e)}[/bold red]")
             console.print("[bold yellow]请使用文件中的信息手动下载视频。[/bold yellow]")
             
@@ -476,6 +851,53 @@ class DouyinSearcher:
                 "message": f"下载失败: {str(e)}"
             } for video in video_list]
 
+    def _download_with_tool(self, video_id, download_dir=None):
+        """
+        调用TikTokTool.py下载单个视频，在下载池的工作线程中执行
+        
+        Args:
+            video_id (str): 视频ID
+            download_dir (str, optional): 下载目录. Defaults to None.
+            
+        Returns:
+            dict: 下载结果
+        """
+        # 构建命令
+        cmd = [sys.executable, "TikTokTool.py", "1"]  # 选择抖音
+        
+        # 添加下载目录参数
+        if download_dir:
+            cmd.extend(["--dir", download_dir])
+        
+        # 添加视频ID
+        cmd.extend(["--vid", video_id])
+        
+        # 主要修复：使用UTF-8编码处理子进程输出
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd="E:\\code_learning\\douyindownload\\TikTokDownload",
+            text=False,  # 改为二进制模式
+            encoding=None  # 不设置编码
+        )
+        
+        # 获取命令输出结果（二进制模式），手动使用UTF-8解码并忽略无法解码的字节
+        _, stderr = process.communicate()
+        stderr_str = stderr.decode('utf-8', errors='ignore') if stderr else ""
+        
+        success = process.returncode == 0
+        if success:
+            logger.info(f"视频 {video_id} 下载成功")
+        else:
+            logger.warning(f"视频 {video_id} 下载失败: {stderr_str[:500]}...")
+        
+        return {
+            "video_id": video_id,
+            "success": success,
+            "message": "下载成功" if success else "下载失败"
+        }
+
     def search_and_download(self, keyword, max_count=20, download_dir=None):
         """
         一键搜索并下载视频
@@ -496,9 +918,7 @@ class DouyinSearcher:
             return [], []
         
         # 显示搜索结果
-        console.print("[bold green]搜索结果:[/bold green]")
-        for idx, video in enumerate(search_results):
-            console.print(f"[{idx+1}] {video['desc'][:50]}... - 作者: {video['author']} - 点赞: {video['like_count']}")
+        show_results(search_results)
         
         # 询问是否下载
         confirmation = input("\n是否下载这些视频? (y/n): ").strip().lower()
@@ -534,9 +954,7 @@ if __name__ == "__main__":
     
     if search_results:
         # 显示搜索结果
-        console.print("[bold green]搜索结果:[/bold green]")
-        for idx, video in enumerate(search_results):
-            console.print(f"[{idx+1}] {video['desc'][:50]}... - 作者: {video['author']} - 点赞: {video['like_count']}")
+        show_results(search_results)
         
         # 检查是否仅保存
         if args.save_only:
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 增量解析接口返回的JSON，逐个产出 aweme_list / data 中的作品，解析完即可丢弃
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import json
+import codecs
+import logging
+
+logger = logging.getLogger('douyin_search.stream_json')
+
+# 默认流式处理的顶层列表字段
+ITEM_KEYS = ("aweme_list", "data")
+
+_WHITESPACE = " \t\n\r"
+
+# 缓冲区中已消费的部分超过该长度时丢弃
+_COMPACT_AT = 1 << 16
+
+
+class ItemStream:
+    """
+    顶层JSON对象的增量解析器
+
+    只把顶层对象中 keys 对应的列表拆成单个元素产出，每个元素仍由 json 模块的C实现解析，
+    其余顶层字段(cursor、has_more等)解析后放在 meta 中，迭代结束后可用。
+    内存中同时只保留一个元素和一个读取块，而不是整棵JSON树。
+
+    用法:
+        stream = ItemStream(response.iter_content(65536))
+        for item in stream:
+            ...
+        cursor = stream.meta.get("cursor")
+    """
+
+    def __init__(self, chunks, keys=ITEM_KEYS):
+        """
+        Args:
+            chunks (iterable): 字节块或字符串块，如 response.iter_content()
+            keys (tuple, optional): 需要逐个产出元素的顶层列表字段. Defaults to ITEM_KEYS.
+        """
+        self.keys = set(keys)
+        self.meta = {}
+        self.key = None
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self._items = self._parse()
+
+    # -- 缓冲区 -------------------------------------------------------------
+
+    def _read(self):
+        """读取下一块数据，没有更多数据时返回False"""
+        if self._eof:
+            return False
+        if self._pos > _COMPACT_AT:
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+        for chunk in self._chunks:
+            if isinstance(chunk, bytes):
+                chunk = self._decoder.decode(chunk)
+            if chunk:
+                self._buf += chunk
+                return True
+        self._buf += self._decoder.decode(b"", final=True)
+        self._eof = True
+        return False
+
+    def _peek(self):
+        """跳过空白，返回下一个字符，数据结束时返回空字符串"""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._read():
+                return ""
+
+    def _expect(self, chars):
+        char = self._peek()
+        if not char or char not in chars:
+            raise json.JSONDecodeError(f"Expecting one of {chars!r}", self._buf, self._pos)
+        self._pos += 1
+        return char
+
+    def _value(self):
+        """解析下一个完整的JSON值"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._read():
+                    continue
+                raise
+            # 值正好结束在缓冲区末尾时可能被截断(例如数字)，再读一块确认
+            if end == len(self._buf) and not self._eof and self._read():
+                continue
+            self._pos = end
+            return value
+
+    # -- 解析 ---------------------------------------------------------------
+
+    def __iter__(self):
+        return self._items
+
+    def _parse(self):
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+
+        while True:
+            key = self._value()
+            if not isinstance(key, str):
+                raise json.JSONDecodeError("Expecting property name", self._buf, self._pos)
+            self._expect(":")
+
+            if key in self.keys and self.key is None and self._peek() == "[":
+                self.key = key
+                self._pos += 1
+                if self._peek() == "]":
+                    self._pos += 1
+                else:
+                    while True:
+                        yield self._value()
+                        if self._expect(",]") == "]":
+                            break
+            else:
+                self.meta[key] = self._value()
+
+            if self._expect(",}") == "}":
+                return
+
+    def drain(self):
+        """跳过剩余的元素，只解析顶层字段，返回 meta"""
+        for _ in self:
+            pass
+        return self.meta
+
+
+def iter_items(chunks, keys=ITEM_KEYS):
+    """
+    逐个产出顶层列表中的元素
+
+    Args:
+        chunks (iterable): 字节块或字符串块
+        keys (tuple, optional): 顶层列表字段. Defaults to ITEM_KEYS.
+
+    Yields:
+        dict: 列表中的元素
+    """
+    return iter(ItemStream(chunks, keys))
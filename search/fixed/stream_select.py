@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 根据bit_rate列表按画质/码率/大小选择下载的视频流
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import re
+import logging
+
+import schemas
+
+logger = logging.getLogger('douyin_search.stream')
+
+# 可用的选择策略
+POLICIES = ("best", "smallest", "max-size", "bitrate")
+
+
+def _parse_amount(value, base):
+    """解析 "50M"、"800k" 这类数值，base为1024(字节)或1000(比特)"""
+    match = re.fullmatch(r"\s*([\d.]+)\s*([kKmMgG]?)[bB]?\s*", str(value))
+    if not match:
+        raise ValueError(f"无法解析的数值: {value}")
+    number, unit = match.groups()
+    return int(float(number) * base ** {"": 0, "k": 1, "m": 2, "g": 3}[unit.lower()])
+
+
+def extract_variants(video):
+    """
+    从aweme的video字段中提取所有可下载的视频流，字段提取见 schemas.variants_of()
+
+    Args:
+        video (dict): aweme_info["video"]
+
+    Returns:
+        list: 视频流列表，每项包含 gear_name、quality_type、bit_rate、
+              width、height、data_size、duration(毫秒)、file_hash、uri、url_list 等字段
+    """
+    return schemas.variants_of(schemas.from_dict(schemas.Video, video))
+
+
+class StreamPolicy:
+    """
+    视频流选择策略
+
+    - best: 分辨率最高，其次码率最高
+    - smallest: 文件最小
+    - max-size: 不超过指定大小的流中画质最高的，都超过时选最小的
+    - bitrate: 不超过目标码率的流中码率最高的，都超过时选码率最低的
+    """
+
+    def __init__(self, mode="best", max_size=None, target_bitrate=None):
+        """
+        Args:
+            mode (str, optional): 策略名称，见POLICIES. Defaults to "best".
+            max_size (int, optional): max-size策略的大小上限(字节). Defaults to None.
+            target_bitrate (int, optional): bitrate策略的目标码率(bit/s). Defaults to None.
+        """
+        if mode not in POLICIES:
+            raise ValueError(f"未知的视频流选择策略: {mode}，可选: {', '.join(POLICIES)}")
+        if mode == "max-size" and not max_size:
+            raise ValueError("max-size策略需要指定大小上限，例如 max-size=50M")
+        if mode == "bitrate" and not target_bitrate:
+            raise ValueError("bitrate策略需要指定目标码率，例如 bitrate=1000k")
+        self.mode = mode
+        self.max_size = max_size
+        self.target_bitrate = target_bitrate
+
+    @classmethod
+    def parse(cls, text):
+        """
+        从命令行字符串解析策略
+
+        Args:
+            text (str): 如 "best"、"smallest"、"max-size=50M"、"bitrate=1000k"
+
+        Returns:
+            StreamPolicy: 策略对象
+        """
+        mode, _, value = (text or "best").strip().partition("=")
+        mode = mode.strip().lower()
+        if mode == "max-size":
+            return cls(mode, max_size=_parse_amount(value, 1024))
+        if mode == "bitrate":
+            return cls(mode, target_bitrate=_parse_amount(value, 1000))
+        return cls(mode)
+
+    def __str__(self):
+        if self.mode == "max-size":
+            return f"max-size={self.max_size}"
+        if self.mode == "bitrate":
+            return f"bitrate={self.target_bitrate}"
+        return self.mode
+
+    @staticmethod
+    def _quality(variant):
+        return (variant["width"] * variant["height"], variant["bit_rate"])
+
+    @staticmethod
+    def _size(variant):
+        """文件大小 (字节)，缺少data_size时按 码率 × 时长 估算，都没有时返回None"""
+        if variant["data_size"]:
+            return variant["data_size"]
+        if variant["bit_rate"] and variant.get("duration"):
+            # duration 单位为毫秒
+            return variant["bit_rate"] * variant["duration"] // 8000
+        return None
+
+    @classmethod
+    def _size_order(cls, variant):
+        # 无法估算大小的视频流排在后面，它们之间只按码率比较，不和字节数混比
+        size = cls._size(variant)
+        return (0, size) if size is not None else (1, variant["bit_rate"])
+
+    def select(self, variants):
+        """
+        按策略从视频流列表中选择一个
+
+        Args:
+            variants (list): extract_variants() 的返回值
+
+        Returns:
+            dict|None: 选中的视频流，列表为空时返回None
+        """
+        if not variants:
+            return None
+
+        if self.mode == "best":
+            return max(variants, key=self._quality)
+
+        if self.mode == "smallest":
+            return min(variants, key=self._size_order)
+
+        if self.mode == "max-size":
+            fitting = [v for v in variants if (self._size(v) or float("inf")) <= self.max_size]
+            if fitting:
+                return max(fitting, key=self._quality)
+            return min(variants, key=self._size_order)
+
+        fitting = [v for v in variants if v["bit_rate"] and v["bit_rate"] <= self.target_bitrate]
+        if fitting:
+            return max(fitting, key=lambda v: v["bit_rate"])
+        return min(variants, key=lambda v: v["bit_rate"] or float("inf"))
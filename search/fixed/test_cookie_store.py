@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: cookie缓存后台刷新的回归测试，运行: python -m pytest test_cookie_store.py 或 python test_cookie_store.py
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import sys
+import time
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cookie_store import CookieStore, REFRESH_MARGIN, REFRESH_RETRY, VALIDATE_INTERVAL
+
+
+class RefreshBackoffTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = CookieStore(path=os.path.join(self.tmp.name, "cookie_store.json"), cookie_file=None,
+                                 browsers=())
+        self.calls = 0
+
+        def fetch(exclude=None):
+            self.calls += 1
+            return None
+
+        self.store.fetch = fetch
+        # 缓存的cookie已进入刷新窗口
+        self.store.put("sessionid=abc", "test", expires_at=time.time() + REFRESH_MARGIN / 2, valid=True)
+
+    def tearDown(self):
+        self.store.stop_refresh()
+        self.tmp.cleanup()
+
+    def test_failed_refresh_does_not_retry_immediately(self):
+        self.store.start_refresh()
+        time.sleep(0.5)
+        self.store.stop_refresh()
+        self.assertEqual(self.calls, 1)
+        self.assertGreater(self.store._next_check(self.store.load()), REFRESH_RETRY - 5)
+
+    def test_retry_interval_backs_off(self):
+        self.store._failures = 20
+        self.store.start_refresh()
+        time.sleep(0.2)
+        self.store.stop_refresh()
+        self.assertEqual(self.calls, 1)
+        self.assertLessEqual(self.store._next_check(self.store.load()), VALIDATE_INTERVAL)
+        self.assertGreater(self.store._next_check(self.store.load()), VALIDATE_INTERVAL - 5)
+
+
+class IndeterminateValidateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = CookieStore(path=os.path.join(self.tmp.name, "cookie_store.json"), cookie_file=None,
+                                 browsers=())
+        self.calls = 0
+
+        def validate(cookie, timeout=3):
+            # 网络错误、非200或非JSON响应
+            self.calls += 1
+            return None
+
+        self.store.validate = validate
+        # 未进入刷新窗口、从未校验过的cookie，会立即校验
+        self.store.put("sessionid=abc", "test", expires_at=time.time() + REFRESH_MARGIN * 3)
+
+    def tearDown(self):
+        self.store.stop_refresh()
+        self.tmp.cleanup()
+
+    def test_indeterminate_validate_does_not_spin(self):
+        self.store.start_refresh()
+        time.sleep(0.5)
+        self.store.stop_refresh()
+        self.assertEqual(self.calls, 1)
+        self.assertGreater(self.store._next_check(self.store.load()), 0)
+        self.assertEqual(self.store.load()["cookie"], "sessionid=abc")
+
+
+if __name__ == "__main__":
+    unittest.main()
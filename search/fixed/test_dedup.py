@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 按内容去重的回归测试，运行: python -m pytest test_dedup.py 或 python test_dedup.py
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import sys
+import errno
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import dedup
+from manifest import DownloadManifest
+
+
+class ReuseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.manifest = DownloadManifest(os.path.join(self.tmp.name, "download_manifest.db"))
+        self.source = os.path.join(self.tmp.name, "a", "1.mp4")
+        os.makedirs(os.path.dirname(self.source))
+        with open(self.source, "wb") as f:
+            f.write(b"video")
+        self.manifest.record("1", "normal_720_0", self.source, size=5, hash="c" * 32, uri="v0200", storage="file")
+        self.target = os.path.join(self.tmp.name, "b", "2.mp4")
+
+    def tearDown(self):
+        self.manifest.close()
+        self.tmp.cleanup()
+
+    def test_hardlinks_matching_content(self):
+        reused = dedup.reuse(self.manifest, self.target, file_hash="c" * 32)
+        self.assertEqual(reused["storage"], dedup.STORAGE_HARDLINK)
+        self.assertEqual(reused["path"], self.target)
+        self.assertTrue(os.path.samefile(self.source, self.target))
+
+    def test_matches_uri_only_with_same_variant(self):
+        self.assertIsNone(dedup.reuse(self.manifest, self.target, uri="v0200", variant="normal_1080_0"))
+        self.assertIsNotNone(dedup.reuse(self.manifest, self.target, uri="v0200", variant="normal_720_0"))
+
+    def test_falls_back_to_reference_when_link_fails(self):
+        # 跨文件系统或不支持硬链接：不复制文件，清单中引用已有文件
+        with mock.patch("dedup.os.link", side_effect=OSError(errno.EXDEV, "Invalid cross-device link")):
+            reused = dedup.reuse(self.manifest, self.target, file_hash="c" * 32)
+        self.assertEqual(reused["storage"], dedup.STORAGE_REFERENCE)
+        self.assertEqual(reused["path"], self.source)
+        self.assertFalse(os.path.exists(self.target))
+        self.assertFalse(os.path.exists(self.target + ".link"))
+
+    def test_no_match_when_source_file_is_gone(self):
+        os.remove(self.source)
+        self.assertIsNone(dedup.reuse(self.manifest, self.target, file_hash="c" * 32))
+
+    def test_collapse_keeps_file_when_link_fails(self):
+        os.makedirs(os.path.dirname(self.target))
+        with open(self.target, "wb") as f:
+            f.write(b"video")
+        with mock.patch("dedup.os.link", side_effect=OSError(errno.EXDEV, "Invalid cross-device link")):
+            self.assertEqual(dedup.collapse(self.manifest, self.target, "c" * 32), dedup.STORAGE_FILE)
+        self.assertFalse(os.path.samefile(self.source, self.target))
+        self.assertEqual(dedup.collapse(self.manifest, self.target, "c" * 32), dedup.STORAGE_HARDLINK)
+        self.assertTrue(os.path.samefile(self.source, self.target))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 本机作品领取和下载期间续期的回归测试，运行: python -m pytest test_job_queue.py 或 python test_job_queue.py
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from job_queue import ManifestSeenSet
+from queue_worker import Handlers
+
+
+class ManifestClaimTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, "job_queue.db")
+        # 两个实例相当于同一台机器上的两个工作进程
+        self.a = ManifestSeenSet(path=path)
+        self.b = ManifestSeenSet(path=path)
+
+    def tearDown(self):
+        self.a.close()
+        self.b.close()
+        self.tmp.cleanup()
+
+    def test_claimed_ids_are_not_claimed_again(self):
+        self.assertEqual(self.a.claim(["1", "2"], "a"), ["1", "2"])
+        self.assertEqual(self.b.claim(["2", "3"], "b"), ["3"])
+
+    def test_release_and_record_free_the_claim(self):
+        self.a.claim(["1", "2"], "a")
+        self.a.release(["1"], "a")
+        self.a.record(["2"], "a")
+        self.assertEqual(self.b.claim(["1", "2"], "b"), ["1", "2"])
+
+    def test_expired_claim_can_be_taken(self):
+        self.a.claim(["1"], "a", ttl=0.1)
+        time.sleep(0.2)
+        self.assertEqual(self.b.claim(["1"], "b"), ["1"])
+
+    def test_owner_keeps_its_claim(self):
+        self.a.claim(["1"], "a")
+        self.assertEqual(self.a.claim(["1"], "a"), ["1"])
+        # 其他进程释放不了别人的领取
+        self.b.release(["1"], "b")
+        self.assertEqual(self.b.claim(["1"], "b"), [])
+
+    def test_reclaim_renews_the_claim(self):
+        self.a.claim(["1"], "a", ttl=0.3)
+        time.sleep(0.2)
+        self.assertEqual(self.a.claim(["1"], "a", ttl=0.3), ["1"])
+        time.sleep(0.2)
+        self.assertEqual(self.b.claim(["1"], "b"), [])
+
+
+class HandlersRenewTest(unittest.TestCase):
+    """一次下载超过领取时间时，心跳续期保证其他进程领不到同一个作品"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, "job_queue.db")
+        self.seen = ManifestSeenSet(path=path)
+        self.other = ManifestSeenSet(path=path)
+
+    def tearDown(self):
+        self.seen.close()
+        self.other.close()
+        self.tmp.cleanup()
+
+    def test_held_claims_are_renewed_during_download(self):
+        test = self
+        stolen = []
+
+        class Searcher:
+            def download_videos(self, videos, **kwargs):
+                for _ in range(3):
+                    time.sleep(0.2)
+                    handle.renew()
+                stolen.extend(test.other.claim([video["aweme_id"] for video in videos], "other"))
+                return [{"video_id": video["aweme_id"], "success": True, "size": 1} for video in videos]
+
+        options = argparse.Namespace(lease=0.3, dir=None, quality="best", on_mismatch="retry", image_format="webp")
+        handle = Handlers(Searcher(), None, self.seen, "a", options)
+        result = handle._download([{"aweme_id": "1", "desc": ""}, {"aweme_id": "2", "desc": ""}], {})
+        self.assertEqual(stolen, [])
+        self.assertEqual(result["downloaded"], 2)
+        self.assertEqual(handle._held, set())
+        # 下载成功后领取已删除
+        self.assertEqual(self.other.claim(["1", "2"], "other"), ["1", "2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
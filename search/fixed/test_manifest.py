@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 下载清单的回归测试，运行: python -m pytest test_manifest.py 或 python test_manifest.py
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dedup import STORAGE_EXTERNAL
+from manifest import DownloadManifest
+
+
+class ManifestTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, "download_manifest.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _file(self, name, content=b"video"):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def test_missing_keeps_order_and_ignores_file_state(self):
+        with DownloadManifest(self.db) as manifest:
+            path = self._file("2.mp4")
+            manifest.record("2", "normal_720_0", path, size=5)
+            manifest.record("4", "normal_720_0", self._file("4.mp4"), size=5)
+            os.remove(path)
+            # 只查清单，文件丢失的记录要用 verify --fix 删除后才会重新下载
+            self.assertEqual(manifest.missing(["5", "4", "3", "2", "1"]), ["5", "3", "1"])
+            self.assertEqual(manifest.missing(["4"], variant="normal_1080_0"), ["4"])
+            self.assertEqual(len(manifest.verify(fix=True)["missing"]), 1)
+            self.assertEqual(manifest.missing(["2", "4"]), ["2"])
+
+    def test_find_content_skips_missing_files(self):
+        with DownloadManifest(self.db) as manifest:
+            gone = self._file("old.mp4")
+            kept = self._file("new.mp4")
+            manifest.record("1", "normal_720_0", gone, size=5, hash="a" * 32)
+            manifest.record("2", "normal_720_0", kept, size=5, hash="a" * 32)
+            os.remove(gone)
+            self.assertEqual(manifest.find_content(file_hash="a" * 32)["path"], kept)
+            self.assertIsNone(manifest.find_content(file_hash="a" * 32, exclude_path=kept))
+            os.remove(kept)
+            self.assertIsNone(manifest.find_content(file_hash="a" * 32))
+
+    def test_find_content_skips_unverified(self):
+        with DownloadManifest(self.db) as manifest:
+            manifest.record("1", "normal_720_0", self._file("1.mp4"), hash="b" * 32, verified=False)
+            self.assertIsNone(manifest.find_content(file_hash="b" * 32))
+
+    def test_migrates_old_tiktoktool_rows_to_external(self):
+        # 旧版本的清单：没有 storage 等列，TikTokTool.py 下载的作品路径为空字符串
+        conn = sqlite3.connect(self.db)
+        conn.execute("""
+            CREATE TABLE downloads (
+                aweme_id TEXT NOT NULL, variant TEXT NOT NULL, path TEXT, size INTEGER, hash TEXT,
+                source_url TEXT, downloaded_at REAL NOT NULL, PRIMARY KEY (aweme_id, variant)
+            )
+        """)
+        conn.execute("INSERT INTO downloads VALUES ('1', 'tiktoktool', '', NULL, NULL, NULL, 0)")
+        conn.execute("INSERT INTO downloads VALUES ('2', 'normal_720_0', ?, 5, NULL, NULL, 0)", (self._file("2.mp4"),))
+        conn.commit()
+        conn.close()
+
+        with DownloadManifest(self.db) as manifest:
+            row = manifest.get("1")[0]
+            self.assertIsNone(row["path"])
+            self.assertEqual(row["storage"], STORAGE_EXTERNAL)
+            self.assertIsNone(manifest.get("2")[0]["storage"])
+            report = manifest.verify(fix=True)
+            self.assertEqual((report["ok"], report["external"], report["missing"]), (1, 1, []))
+            # 外部下载的记录不会被 verify --fix 删除
+            self.assertEqual(manifest.missing(["1", "2"]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
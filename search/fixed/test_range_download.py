@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 断点续传和边下载边校验的回归测试，运行: python -m pytest test_range_download.py 或 python test_range_download.py
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import re
+import sys
+import json
+import hashlib
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from range_download import RangeDownloader, InlineHasher
+
+URL = "http://cdn.example.com/video.mp4"
+
+
+class FakeResponse:
+
+    def __init__(self, body, status_code, headers):
+        self.body = body
+        self.status_code = status_code
+        self.headers = headers
+        self.url = URL
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+    def raise_for_status(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+class FakeSession:
+    """按Range请求头返回206分段；ranges=False 时像不支持续传的服务器一样总是返回完整的200响应"""
+
+    def __init__(self, data, ranges=True, etag='"v1"'):
+        self.data = data
+        self.ranges = ranges
+        self.etag = etag
+        self.requested = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requested.append(headers.get("Range"))
+        if not self.ranges:
+            return FakeResponse(self.data, 200, {"Content-Length": str(len(self.data)), "ETag": self.etag})
+        start, end = re.fullmatch(r"bytes=(\d+)-(\d*)", headers["Range"]).groups()
+        start, end = int(start), int(end) + 1 if end else len(self.data)
+        return FakeResponse(self.data[start:end], 206, {
+            "Content-Range": f"bytes {start}-{end - 1}/{len(self.data)}",
+            "ETag": self.etag,
+        })
+
+
+class ResumeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "video.mp4")
+        self.data = os.urandom(300 * 1024)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _interrupted(self, written, etag='"v1"'):
+        """模拟写入了开头 written 字节后被中断的下载"""
+        with open(self.path + ".part", "wb") as f:
+            f.write(self.data[:written])
+        with open(self.path + ".part.json", "w", encoding="utf-8") as f:
+            json.dump({"size": len(self.data), "etag": etag, "ranges": [[0, written]]}, f)
+
+    def _read(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def test_resumes_from_recorded_range(self):
+        self._interrupted(100 * 1024)
+        session = FakeSession(self.data)
+        result = RangeDownloader(session=session).download(URL, self.path)
+        self.assertEqual(session.requested, [f"bytes={100 * 1024}-"])
+        self.assertTrue(result["resumed"])
+        self.assertEqual(self._read(), self.data)
+        self.assertFalse(os.path.exists(self.path + ".part"))
+        self.assertFalse(os.path.exists(self.path + ".part.json"))
+
+    def test_sidecar_without_part_starts_over(self):
+        self._interrupted(100 * 1024)
+        os.remove(self.path + ".part")
+        session = FakeSession(self.data)
+        result = RangeDownloader(session=session).download(URL, self.path)
+        self.assertEqual(session.requested, ["bytes=0-"])
+        self.assertFalse(result["resumed"])
+        self.assertEqual(self._read(), self.data)
+
+    def test_corrupt_sidecar_starts_over(self):
+        self._interrupted(100 * 1024)
+        with open(self.path + ".part.json", "w", encoding="utf-8") as f:
+            f.write("{not json")
+        session = FakeSession(self.data)
+        RangeDownloader(session=session).download(URL, self.path)
+        self.assertEqual(session.requested, ["bytes=0-"])
+        self.assertEqual(self._read(), self.data)
+
+    def test_server_ignoring_range_restarts_from_zero(self):
+        # .part 中是旧内容，服务器返回200时不能拼接在后面
+        self._interrupted(100 * 1024)
+        with open(self.path + ".part", "r+b") as f:
+            f.write(b"\0" * 100 * 1024)
+        session = FakeSession(self.data, ranges=False)
+        result = RangeDownloader(session=session).download(URL, self.path)
+        self.assertEqual(self._read(), self.data)
+        self.assertEqual(result["size"], len(self.data))
+        self.assertEqual(result["md5"], hashlib.md5(self.data).hexdigest())
+
+    def test_resumed_download_hashes_existing_prefix(self):
+        self._interrupted(100 * 1024)
+        result = RangeDownloader(session=FakeSession(self.data)).download(
+            URL, self.path, expected_size=len(self.data), expected_hash=hashlib.md5(self.data).hexdigest())
+        self.assertTrue(result["verified"])
+        self.assertEqual(result["md5"], hashlib.md5(self.data).hexdigest())
+
+
+class InlineHasherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = os.urandom(1000)
+        self.tmp = tempfile.TemporaryFile()
+        self.tmp.write(self.data)
+
+    def tearDown(self):
+        self.tmp.close()
+
+    def test_sequential_writes_need_no_catch_up(self):
+        hasher = InlineHasher()
+        for start in range(0, 1000, 100):
+            hasher.update(start, self.data[start:start + 100])
+        self.assertEqual(hasher.catch_up(self.tmp, 1000), 0)
+        self.assertEqual(hasher.hexdigest(), hashlib.md5(self.data).hexdigest())
+
+    def test_out_of_order_writes_are_caught_up(self):
+        hasher = InlineHasher()
+        # 并行下载时后面的区间先到，只有紧接已哈希前缀的数据直接参与计算
+        hasher.update(500, self.data[500:])
+        hasher.update(0, self.data[:300])
+        self.assertEqual(hasher.offset, 300)
+        self.assertEqual(hasher.catch_up(self.tmp, 1000), 700)
+        self.assertEqual(hasher.hexdigest(), hashlib.md5(self.data).hexdigest())
+
+    def test_overlapping_write_hashes_only_new_bytes(self):
+        hasher = InlineHasher()
+        hasher.update(0, self.data[:300])
+        # 重试时重新写入了已哈希的一部分
+        hasher.update(200, self.data[200:600])
+        self.assertEqual(hasher.offset, 600)
+        hasher.catch_up(self.tmp, 1000)
+        self.assertEqual(hasher.hexdigest(), hashlib.md5(self.data).hexdigest())
+
+
+if __name__ == "__main__":
+    unittest.main()
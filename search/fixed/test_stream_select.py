@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 视频流选择策略的回归测试，运行: python -m pytest test_stream_select.py 或 python test_stream_select.py
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stream_select import StreamPolicy, extract_variants
+
+
+def _gear(name, bit_rate, height, data_size=None):
+    return {
+        "gear_name": name,
+        "bit_rate": bit_rate,
+        "play_addr": {"uri": name, "url_list": [f"http://cdn.example.com/{name}.mp4"],
+                      "width": height * 9 // 16, "height": height, "data_size": data_size},
+    }
+
+
+class SizeTest(unittest.TestCase):
+
+    def setUp(self):
+        # 60秒的视频：只有1080p带data_size (3MB)；540p按码率估算约为 1.5MB
+        self.variants = extract_variants({"duration": 60000, "bit_rate": [
+            _gear("normal_1080_0", 2000000, 1080, data_size=3 * 1024 * 1024),
+            _gear("normal_540_0", 200000, 540),
+        ]})
+
+    def test_estimates_size_from_bitrate_and_duration(self):
+        self.assertEqual(StreamPolicy._size(self.variants[1]), 200000 * 60000 // 8000)
+        # 码率(bps)比data_size(字节)小，但不能直接混比
+        self.assertEqual(StreamPolicy.parse("smallest").select(self.variants)["gear_name"], "normal_540_0")
+
+    def test_max_size_uses_estimate(self):
+        self.assertEqual(StreamPolicy.parse("max-size=2M").select(self.variants)["gear_name"], "normal_540_0")
+        self.assertEqual(StreamPolicy.parse("max-size=4M").select(self.variants)["gear_name"], "normal_1080_0")
+
+    def test_unknown_size_sorts_after_known(self):
+        variants = extract_variants({"bit_rate": [
+            _gear("normal_1080_0", 2000000, 1080, data_size=3 * 1024 * 1024),
+            _gear("normal_540_0", 200000, 540),
+        ]})
+        self.assertIsNone(StreamPolicy._size(variants[1]))
+        self.assertEqual(StreamPolicy.parse("smallest").select(variants)["gear_name"], "normal_1080_0")
+
+
+if __name__ == "__main__":
+    unittest.main()
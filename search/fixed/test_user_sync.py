@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 用户增量同步各阶段切换的回归测试，运行: python -m pytest test_user_sync.py 或 python test_user_sync.py
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from user_sync import SyncStore, UserSync, FULL, INCREMENTAL, RESUME
+
+
+class FakeCrawler:
+    """
+    按 UserCrawler.crawl_user 的翻页规则模拟一个用户的作品列表
+
+    作品按发布时间从新到旧排列，每页 page_size 个作品；和接口一样 max_cursor 是本页最后一个作品的发布时间，
+    发布新作品不会影响已记下的翻页位置
+    """
+
+    users = 1
+
+    def __init__(self, page_size=2):
+        self.page_size = page_size
+        self.posts = []
+        self.fetched = []
+
+    def publish(self, *create_times):
+        for create_time in create_times:
+            self.posts.insert(0, {"aweme_id": str(create_time), "create_time": create_time})
+
+    def crawl_user(self, sec_uid, max_count=None, since=0, start_cursor=0, max_pages=None):
+        pages = 0
+        aweme_ids = []
+        newest = None
+        complete = False
+        max_cursor = start_cursor
+        while True:
+            rest = [v for v in self.posts if not max_cursor or v["create_time"] < max_cursor]
+            page = rest[:self.page_size]
+            pages += 1
+            reached = since and any(v["create_time"] <= since for v in page)
+            videos = [v for v in page if v["create_time"] > since] if since else page
+            aweme_ids.extend(v["aweme_id"] for v in videos)
+            for video in videos:
+                if newest is None or video["create_time"] > newest["create_time"]:
+                    newest = {"aweme_id": video["aweme_id"], "create_time": video["create_time"]}
+            if page:
+                max_cursor = page[-1]["create_time"]
+            if reached or len(rest) <= self.page_size:
+                complete = True
+                break
+            if max_pages and pages >= max_pages:
+                break
+        self.fetched.extend(aweme_ids)
+        return {
+            "sec_uid": sec_uid,
+            "pages": pages,
+            "videos": len(aweme_ids),
+            "aweme_ids": aweme_ids,
+            "results": [{"video_id": aweme_id, "success": True} for aweme_id in aweme_ids],
+            "error": None,
+            "elapsed": 0,
+            "newest": newest,
+            "max_cursor": max_cursor,
+            "complete": complete,
+        }
+
+
+class SyncModeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = SyncStore(os.path.join(self.tmp.name, "user_sync.db"))
+        self.crawler = FakeCrawler()
+        self.sync = UserSync(self.crawler, self.store, full_every=0, max_pages=2)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_full_resume_incremental(self):
+        self.crawler.publish(*range(91, 101))
+        self.assertEqual(self.sync.sync_user("u")["mode"], FULL)
+        self.assertEqual(self.sync.mode(self.store.get("u")), RESUME)
+        self.assertEqual(self.sync.sync_user("u")["mode"], RESUME)
+        self.assertEqual(self.sync.sync_user("u")["mode"], RESUME)
+        state = self.store.get("u")
+        self.assertTrue(state["complete"])
+        self.assertEqual(self.sync.mode(state), INCREMENTAL)
+        self.assertEqual(sorted(self.crawler.fetched), sorted(str(t) for t in range(91, 101)))
+
+    def test_incremental_catches_up_past_page_limit(self):
+        self.crawler.publish(91, 92)
+        self.sync.sync_user("u")
+        self.assertEqual(self.sync.mode(self.store.get("u")), INCREMENTAL)
+
+        # 两次同步之间发布的作品超过 max_pages 页
+        self.crawler.publish(*range(101, 108))
+        self.assertEqual(self.sync.sync_user("u")["mode"], INCREMENTAL)
+        state = self.store.get("u")
+        self.assertEqual(state["newest_create_time"], 107)
+        self.assertTrue(state["gap_cursor"])
+
+        self.crawler.publish(108)
+        self.sync.sync_user("u")
+        self.sync.sync_user("u")
+        state = self.store.get("u")
+        self.assertEqual((state["gap_cursor"], state["gap_since"]), (0, 0))
+        self.assertEqual(state["newest_create_time"], 108)
+        # 每个作品恰好获取一次
+        self.assertEqual(sorted(self.crawler.fetched), sorted(str(t) for t in [91, 92, *range(101, 109)]))
+
+
+if __name__ == "__main__":
+    unittest.main()
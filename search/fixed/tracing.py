@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 轻量的阶段耗时追踪，记录签名、请求、解码、提取、等待、导出和下载等阶段的span，
+              可导出为JSONL或OpenTelemetry(OTLP/JSON)格式，运行结束时打印汇总表
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+from rich.table import Table
+from progress_output import console
+
+logger = logging.getLogger('douyin_search.tracing')
+
+# 导出格式
+EXPORT_FORMATS = ("jsonl", "otlp")
+
+
+class Span:
+    """一个阶段的耗时记录"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "thread", "attributes", "error")
+
+    def __init__(self, name, trace_id, span_id, parent_id, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.thread = threading.current_thread().name
+        self.attributes = attributes
+        self.error = None
+
+    def set(self, **attributes):
+        """追加属性，如字节数、状态码"""
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start_ns / 1e9,
+            "end": self.end_ns / 1e9 if self.end_ns else None,
+            "duration_ms": round(self.duration_ms, 3),
+            "thread": self.thread,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NullSpan:
+    """未启用追踪时使用，所有操作都是空操作"""
+
+    span_id = None
+
+    def set(self, **attributes):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """
+    span记录器
+
+    span按线程维护父子关系；提交到线程池的任务通过 parent 参数显式指定父span。
+    未启用时 span() 直接返回空操作，开销只有一次属性判断。
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.spans = []
+        self.trace_id = os.urandom(16).hex()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def current(self):
+        """当前线程正在进行的span，没有时返回None"""
+        stack = self._stack() if self.enabled else None
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def span(self, name, parent=None, **attributes):
+        """
+        记录一个阶段
+
+        Args:
+            name (str): 阶段名，如 "sign"、"request"、"download.file"
+            parent (Span, optional): 父span，默认为当前线程正在进行的span. Defaults to None.
+            **attributes: 附加属性
+
+        Yields:
+            Span: 可以在阶段内用 set() 追加属性
+        """
+        if not self.enabled:
+            yield _NULL_SPAN
+            return
+
+        stack = self._stack()
+        if parent is None and stack:
+            parent = stack[-1]
+        span = Span(name, self.trace_id, os.urandom(8).hex(), parent.span_id if parent else None, attributes)
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            stack.pop()
+            with self._lock:
+                self.spans.append(span)
+
+    def reset(self):
+        with self._lock:
+            self.spans = []
+        self.trace_id = os.urandom(16).hex()
+
+    # -- 导出 ---------------------------------------------------------------
+
+    def export(self, path, fmt="jsonl"):
+        """
+        导出所有span
+
+        Args:
+            path (str): 文件路径，追加写入
+            fmt (str, optional): jsonl(每行一个span) 或 otlp(每行一个OTLP/JSON ExportTraceServiceRequest). Defaults to "jsonl".
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"未知的导出格式: {fmt}，可选: {', '.join(EXPORT_FORMATS)}")
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start_ns)
+
+        with open(path, "a", encoding="utf-8") as f:
+            if fmt == "jsonl":
+                for span in spans:
+                    f.write(json.dumps(span.to_dict(), ensure_ascii=False) + "\n")
+            else:
+                f.write(json.dumps(_to_otlp(spans), ensure_ascii=False) + "\n")
+        logger.info(f"已导出 {len(spans)} 个span到 {path}")
+
+    # -- 汇总 ---------------------------------------------------------------
+
+    def summary(self):
+        """
+        按阶段名汇总
+
+        Returns:
+            list: 每项为 {"name", "count", "total_ms", "mean_ms", "p95_ms", "max_ms", "errors"}，按总耗时排序
+        """
+        groups = {}
+        with self._lock:
+            for span in self.spans:
+                groups.setdefault(span.name, []).append(span)
+
+        rows = []
+        for name, spans in groups.items():
+            durations = sorted(s.duration_ms for s in spans)
+            total = sum(durations)
+            rows.append({
+                "name": name,
+                "count": len(durations),
+                "total_ms": total,
+                "mean_ms": total / len(durations),
+                "p95_ms": durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+                "max_ms": durations[-1],
+                "errors": sum(1 for s in spans if s.error),
+            })
+        return sorted(rows, key=lambda r: r["total_ms"], reverse=True)
+
+    def print_summary(self):
+        """打印各阶段耗时汇总表"""
+        rows = self.summary()
+        if not rows:
+            return
+        table = Table(title="阶段耗时")
+        for column in ["阶段", "次数", "总计(ms)", "平均(ms)", "P95(ms)", "最大(ms)", "错误"]:
+            table.add_column(column)
+        for row in rows:
+            table.add_row(
+                row["name"], str(row["count"]), f"{row['total_ms']:.1f}", f"{row['mean_ms']:.1f}",
+                f"{row['p95_ms']:.1f}", f"{row['max_ms']:.1f}", str(row["errors"])
+            )
+        console.print(table)
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _to_otlp(spans):
+    """转换为OTLP/JSON格式，可由OpenTelemetry Collector的otlpjsonfile接收器读取"""
+    records = []
+    for span in spans:
+        attributes = dict(span.attributes, **{"thread.name": span.thread})
+        record = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items()],
+            # 1: OK, 2: ERROR
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        }
+        if span.parent_id:
+            record["parentSpanId"] = span.parent_id
+        records.append(record)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "douyin_search"}}]},
+            "scopeSpans": [{"scope": {"name": "douyin_search.tracing"}, "spans": records}],
+        }]
+    }
+
+
+# 全局追踪器，默认不启用
+tracer = Tracer()
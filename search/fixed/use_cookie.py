@@ -8,35 +8,18 @@ import os
 import sys
 import subprocess
 from rich.console import Console
+from cookie_store import DEFAULT_COOKIE_FILE, load_cookie_from_file
 
 console = Console()
 
-def load_cookie_from_file(filename="douyin_cookie.txt"):
-    """从文件加载Cookie"""
-    try:
-        if os.path.exists(filename):
-            with open(filename, "r", encoding="utf-8") as f:
-                cookie = f.read().strip()
-            if cookie:
-                console.print(f"[green]已从 {filename} 加载Cookie[/green]")
-                return cookie
-        console.print(f"[yellow]Cookie文件 {filename} 不存在或为空[/yellow]")
-    except Exception as e:
-        console.print(f"[red]加载Cookie失败: {str(e)}[/red]")
-    
-    return None
-
 def main():
     # 获取当前脚本所在目录的绝对路径
     script_dir = os.path.dirname(os.path.abspath(__file__))
     
-    # 构建cookie文件的绝对路径
-    cookie_file = os.path.join(script_dir, "douyin_cookie.txt")
-    
     # 加载cookie
-    cookie = load_cookie_from_file(cookie_file)
+    cookie = load_cookie_from_file(DEFAULT_COOKIE_FILE)
     if not cookie:
-        console.print("[bold red]无法加载cookie，请确保douyin_cookie.txt文件存在且不为空[/bold red]")
+        console.print("[bold red]无法加载cookie，请先运行 manual_cookie.py 或确保douyin_cookie.txt文件存在且不为空[/bold red]")
         return 1
     
     # 获取关键词参数
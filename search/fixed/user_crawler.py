@@ -0,0 +1,313 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 用户作品并发抓取，每个用户按 max_cursor 依次翻页，同时预取后面的页并把已获取的页交给下载池，
+              多个用户同时抓取，所有用户共用接口并发上限和下载池的并发、单主机和带宽限制
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import sys
+import time
+import logging
+import argparse
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+
+import progress_output
+from rich.table import Table
+from progress_output import console
+from cdn_hosts import host_of
+from download_pool import DownloadPool
+from manifest import DEFAULT_MANIFEST
+from search_douyin import DouyinSearcher
+from cookie_pool import CookiePool
+from proxy_pool import ProxyPool, DEFAULT_CHECK_INTERVAL
+
+logger = logging.getLogger('douyin_search.crawler')
+
+# 默认同时抓取的用户数
+DEFAULT_USERS = 4
+
+# 默认每个用户最多领先下载的页数
+DEFAULT_PREFETCH = 2
+
+# 默认所有用户同时进行的作品列表请求数
+DEFAULT_API_CONCURRENCY = 4
+
+
+class UserCrawler:
+    """
+    用户作品抓取
+
+    翻页本身是串行的：第N+1页的 max_cursor 来自第N页的响应。每个用户由一个线程翻页，
+    每获取一页就交给下载线程调用 download_videos，自己接着签名和请求下一页，
+    已获取但还没有下载完的页最多 prefetch 页，超过时等待最早的页下载完成，避免作品列表远远跑在下载前面。
+    同时抓取 users 个用户，接口请求受 api_concurrency 限制，下载由共用的下载池按并发、单主机和带宽限制调度。
+    """
+
+    def __init__(self, searcher, pool=None, users=DEFAULT_USERS, prefetch=DEFAULT_PREFETCH,
+                 api_concurrency=DEFAULT_API_CONCURRENCY, download_options=None):
+        """
+        Args:
+            searcher (DouyinSearcher): 搜索器，提供 fetch_user_page 和 download_videos
+            pool (DownloadPool, optional): 共用的下载池，需已进入上下文；None表示只获取作品列表不下载. Defaults to None.
+            users (int, optional): 同时抓取的用户数. Defaults to DEFAULT_USERS.
+            prefetch (int, optional): 每个用户最多领先下载的页数，1表示下载完一页才请求下一页. Defaults to DEFAULT_PREFETCH.
+            api_concurrency (int, optional): 所有用户同时进行的作品列表请求数. Defaults to DEFAULT_API_CONCURRENCY.
+            download_options (dict, optional): 传给 download_videos 的其他参数，如 download_dir、stream_policy. Defaults to None.
+        """
+        self.searcher = searcher
+        self.pool = pool
+        self.users = max(1, users)
+        self.prefetch = max(1, prefetch)
+        self.download_options = dict(download_options or {}, save_to_file=False)
+        self._api = threading.BoundedSemaphore(max(1, api_concurrency))
+        self._downloads = ThreadPoolExecutor(max_workers=self.users * self.prefetch, thread_name_prefix="crawl-dl")
+
+    def close(self):
+        self._downloads.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def crawl(self, sec_uids, max_count=None):
+        """
+        抓取多个用户的作品
+
+        Args:
+            sec_uids (list): 用户的sec_uid
+            max_count (int, optional): 每个用户最多获取的作品数，None表示全部. Defaults to None.
+
+        Returns:
+            list: 每个用户的结果，见 crawl_user()，顺序与 sec_uids 相同
+        """
+        with ThreadPoolExecutor(max_workers=self.users, thread_name_prefix="crawl-user") as executor:
+            return list(executor.map(lambda sec_uid: self.crawl_user(sec_uid, max_count), sec_uids))
+
+    def crawl_user(self, sec_uid, max_count=None, since=0, start_cursor=0, max_pages=None):
+        """
+        抓取一个用户的作品，翻页出错时停止翻页，已交给下载池的页仍会下载完
+
+        Args:
+            sec_uid (str): 用户的sec_uid
+            max_count (int, optional): 最多获取的作品数，None表示全部. Defaults to None.
+            since (int, optional): 只获取发布时间晚于此时间(秒)的作品，遇到不晚于此时间的非置顶作品时停止翻页，
+                                   0表示不限. Defaults to 0.
+            start_cursor (int, optional): 开始翻页的 max_cursor，用于从上次中断的位置继续，0表示从最新开始. Defaults to 0.
+            max_pages (int, optional): 最多请求的页数，None表示不限. Defaults to None.
+
+        Returns:
+            dict: {"sec_uid", "pages", "videos": 获取的作品数, "aweme_ids", "results": 下载结果,
+                   "error": 翻页错误或None, "elapsed": 耗时(秒),
+                   "newest": 获取到的最新作品 {"aweme_id", "create_time"} 或None,
+                   "max_cursor": 最后一页的 max_cursor, "complete": 是否翻到了末尾或已知的作品}
+        """
+        started = time.monotonic()
+        # 已获取但还没有下载完的页数
+        window = threading.BoundedSemaphore(self.prefetch)
+        pending = []
+        aweme_ids = []
+        pages = 0
+        error = None
+        newest = None
+        complete = False
+        max_cursor = start_cursor
+        try:
+            while True:
+                window.acquire()
+                try:
+                    with self._api:
+                        page = self.searcher.fetch_user_page(sec_uid, max_cursor)
+                except BaseException:
+                    window.release()
+                    raise
+                pages += 1
+                videos = page["videos"]
+                # 置顶作品不按发布时间排列，不能作为到达已知作品的依据
+                reached = since and any(v["create_time"] <= since and not v.get("is_top") for v in videos)
+                if since:
+                    videos = [v for v in videos if v["create_time"] > since]
+                truncated = max_count is not None and len(videos) > max_count - len(aweme_ids)
+                if truncated:
+                    videos = videos[:max_count - len(aweme_ids)]
+                aweme_ids.extend(video["aweme_id"] for video in videos)
+                for video in videos:
+                    if newest is None or video["create_time"] > newest["create_time"]:
+                        newest = {"aweme_id": video["aweme_id"], "create_time": video["create_time"]}
+
+                if videos and self.pool is not None:
+                    future = self._downloads.submit(self._download, videos)
+                    future.add_done_callback(lambda _: window.release())
+                    pending.append(future)
+                else:
+                    window.release()
+                progress_output.notify("user_page", sec_uid=sec_uid, page=pages, videos=len(videos))
+
+                if truncated:
+                    # 这一页没有取完，从这一页继续时需要重新请求它
+                    break
+                max_cursor = page["max_cursor"]
+                if reached or not page["has_more"] or not page["videos"]:
+                    complete = True
+                    break
+                if max_count is not None and len(aweme_ids) >= max_count or max_pages and pages >= max_pages:
+                    break
+                self.searcher.wait_page_delay()
+        except Exception as e:
+            logger.error(f"用户 {sec_uid} 第{pages + 1}页获取失败: {e}")
+            error = str(e)
+
+        results = []
+        for future in pending:
+            try:
+                results.extend(future.result())
+            except Exception as e:
+                logger.error(f"用户 {sec_uid} 的作品下载失败: {e}")
+                error = error or str(e)
+        elapsed = time.monotonic() - started
+        logger.info(f"用户 {sec_uid} 完成: {pages} 页，{len(aweme_ids)} 个作品，{elapsed:.1f}s")
+        return {
+            "sec_uid": sec_uid,
+            "pages": pages,
+            "videos": len(aweme_ids),
+            "aweme_ids": aweme_ids,
+            "results": results,
+            "error": error,
+            "elapsed": round(elapsed, 3),
+            "newest": newest,
+            "max_cursor": max_cursor,
+            "complete": complete,
+        }
+
+    def _download(self, videos):
+        return self.searcher.download_videos(videos, pool=self.pool, **self.download_options)
+
+
+def print_summary(summaries):
+    table = Table(title="用户作品抓取")
+    for column in ["sec_uid", "页数", "作品数", "下载成功", "失败", "耗时(s)", "错误"]:
+        table.add_column(column)
+    for s in summaries:
+        success = sum(1 for r in s["results"] if r["success"])
+        table.add_row(s["sec_uid"], str(s["pages"]), str(s["videos"]), str(success),
+                      str(len(s["results"]) - success), f"{s['elapsed']:.1f}", s["error"] or "")
+    console.print(table)
+
+
+def _read_users(values, path):
+    users = list(values or [])
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            users.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    return users
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并发抓取多个用户的作品并下载")
+    parser.add_argument("sec_uids", nargs="*", help="用户的sec_uid")
+    parser.add_argument("--file", help="从文件读取sec_uid，每行一个")
+    parser.add_argument("-c", "--count", type=int, help="每个用户最多获取的作品数，默认全部")
+    parser.add_argument("-u", "--users", type=int, default=DEFAULT_USERS, help=f"同时抓取的用户数，默认{DEFAULT_USERS}")
+    parser.add_argument("--prefetch", type=int, default=DEFAULT_PREFETCH,
+                        help=f"每个用户最多领先下载的页数，默认{DEFAULT_PREFETCH}")
+    parser.add_argument("--api-concurrency", type=int, default=DEFAULT_API_CONCURRENCY,
+                        help=f"所有用户同时进行的作品列表请求数，默认{DEFAULT_API_CONCURRENCY}")
+    parser.add_argument("--no-download", action="store_true", help="只获取作品列表，不下载")
+    parser.add_argument("-d", "--dir", help="下载目录")
+    parser.add_argument("--quality", default="best", help="清晰度选择策略，默认best")
+    parser.add_argument("--image-format", choices=["webp", "jpeg"], default="webp", help="图集作品的首选图片格式")
+    parser.add_argument("--force", action="store_true", help="忽略下载清单，重新下载")
+    parser.add_argument("-j", "--concurrency", type=int, default=8, help="所有用户共用的下载并发数，默认8")
+    parser.add_argument("--per-host", type=int, default=2, help="每个CDN主机的并发上限，默认2")
+    parser.add_argument("--limit-rate", help="所有下载共享的带宽上限，如 500K、2M，默认不限速")
+    parser.add_argument("--connections", type=int, default=1, help="单个大文件并行下载的连接数，默认1")
+    parser.add_argument("--on-mismatch", choices=["retry", "quarantine", "mark"], default="retry",
+                        help="大小或MD5与接口不符时的处理，默认retry")
+    parser.add_argument("--page-delay", type=float, nargs=2, default=(1, 3), metavar=("MIN", "MAX"),
+                        help="同一个用户翻页之间的随机延迟范围(秒)，默认1 3")
+    parser.add_argument("--cookie", help="抖音cookie")
+    parser.add_argument("--auto-cookie", action="store_true", help="自动获取cookie，优先使用cookie缓存")
+    parser.add_argument("--cookie-pool", metavar="PATH", help="多账号cookie池，见 search_cli.py --cookie-pool")
+    parser.add_argument("--proxy-pool", metavar="FILE", help="代理池文件，见 search_cli.py --proxy-pool")
+    parser.add_argument("--proxy-check-interval", type=int, default=DEFAULT_CHECK_INTERVAL,
+                        help=f"代理健康检查间隔(秒)，默认{DEFAULT_CHECK_INTERVAL}")
+    parser.add_argument("--no-server", action="store_true", help="不使用本地签名服务器")
+    parser.add_argument("--base-url", help="接口地址，默认https://www.douyin.com，可指向本地回放服务 replay_server.py")
+    parser.add_argument("--signer-url", help="本地签名服务地址，默认http://localhost:8889")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST, help="下载清单路径")
+    parser.add_argument("--no-manifest", action="store_true", help="不使用下载清单")
+    parser.add_argument("--headless", action="store_true", help="无界面模式，输出JSON进度行")
+    parser.add_argument("--debug", action="store_true", help="启用调试模式")
+    args = parser.parse_args()
+
+    sec_uids = _read_users(args.sec_uids, args.file)
+    if not sec_uids:
+        parser.error("请指定sec_uid或 --file")
+    progress_output.configure(headless=args.headless)
+    if args.debug:
+        logging.getLogger('douyin_search').setLevel(logging.DEBUG)
+
+    proxy_pool = None
+    if args.proxy_pool:
+        proxy_pool = ProxyPool.from_file(
+            args.proxy_pool,
+            check_url=(args.base_url or "https://www.douyin.com").rstrip("/") + "/",
+            check_interval=args.proxy_check_interval
+        ).start()
+    searcher = DouyinSearcher(
+        cookie=args.cookie,
+        auto_cookie=args.auto_cookie,
+        use_local_server=not args.no_server,
+        manifest_path=None if args.no_manifest else args.manifest,
+        base_url=args.base_url,
+        signer_url=args.signer_url,
+        page_delay=tuple(args.page_delay),
+        cookie_pool=CookiePool.from_path(args.cookie_pool) if args.cookie_pool else None,
+        proxy_pool=proxy_pool
+    )
+    pool = None
+    if not args.no_download:
+        pool = DownloadPool(
+            concurrency=args.concurrency,
+            per_host=args.per_host,
+            bandwidth_limit=args.limit_rate,
+            host_overrides={host_of(searcher.base_url): 1},
+            headers={"User-Agent": searcher.headers["User-Agent"]},
+            connections=args.connections,
+            on_mismatch=args.on_mismatch,
+            proxy_pool=proxy_pool
+        )
+    download_options = {
+        "download_dir": args.dir,
+        "stream_policy": args.quality,
+        "force": args.force,
+        "image_format": args.image_format,
+    }
+
+    try:
+        crawler = UserCrawler(searcher, pool, args.users, args.prefetch, args.api_concurrency, download_options)
+        with pool if pool is not None else nullcontext(), crawler:
+            summaries = crawler.crawl(sec_uids, args.count)
+    finally:
+        if proxy_pool:
+            proxy_pool.stop()
+
+    failed = sum(1 for s in summaries for r in s["results"] if not r["success"])
+    errors = sum(1 for s in summaries if s["error"])
+    if args.headless:
+        progress_output.emit("crawl", users=len(summaries), videos=sum(s["videos"] for s in summaries),
+                             failed=failed, errors=errors)
+    else:
+        print_summary(summaries)
+    return 0 if not failed and not errors else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,385 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 用户作品增量同步，记录每个用户已同步到的最新作品和翻页位置 (SQLite)，
+              再次同步时只翻到已知的作品为止，定期做一次完整同步
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+
+import progress_output
+from rich.table import Table
+from progress_output import console
+from cdn_hosts import host_of
+from download_pool import DownloadPool
+from manifest import DEFAULT_MANIFEST
+from search_douyin import DouyinSearcher
+from cookie_pool import CookiePool
+from proxy_pool import ProxyPool, DEFAULT_CHECK_INTERVAL
+from user_crawler import UserCrawler, DEFAULT_USERS, DEFAULT_PREFETCH, DEFAULT_API_CONCURRENCY, _read_users
+
+logger = logging.getLogger('douyin_search.sync')
+
+# 默认保存在脚本目录下
+DEFAULT_STORE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "user_sync.db")
+
+# 默认每隔多少天做一次完整同步
+DEFAULT_FULL_EVERY = 30
+
+# 同步方式
+FULL = "full"
+INCREMENTAL = "incremental"
+RESUME = "resume"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    sec_uid            TEXT PRIMARY KEY,
+    newest_aweme_id    TEXT,
+    newest_create_time INTEGER NOT NULL DEFAULT 0,
+    max_cursor         INTEGER NOT NULL DEFAULT 0,
+    complete           INTEGER NOT NULL DEFAULT 0,
+    gap_cursor         INTEGER NOT NULL DEFAULT 0,
+    gap_since          INTEGER NOT NULL DEFAULT 0,
+    videos             INTEGER NOT NULL DEFAULT 0,
+    last_sync          REAL,
+    last_full_sync     REAL,
+    last_error         TEXT
+);
+"""
+
+# 旧版本的数据库中没有的列
+MIGRATIONS = {
+    "gap_cursor": "INTEGER NOT NULL DEFAULT 0",
+    "gap_since": "INTEGER NOT NULL DEFAULT 0",
+}
+
+
+class SyncStore:
+    """
+    用户同步状态
+
+    每个用户一行：已同步的最新作品 (newest_aweme_id/newest_create_time)、
+    历史作品翻到的位置 (max_cursor，complete=1 表示已翻到末尾)、
+    增量同步达到页数上限时没有翻完的新作品 (从 gap_cursor 翻到发布时间不晚于 gap_since 为止)、累计获取的作品数和同步时间。
+    可以在多个线程之间共享。
+    """
+
+    def __init__(self, path=DEFAULT_STORE):
+        """
+        Args:
+            path (str, optional): 数据库文件路径. Defaults to DEFAULT_STORE.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self._conn.commit()
+
+    def _migrate(self):
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(users)")}
+        for name, column_type in MIGRATIONS.items():
+            if name not in columns:
+                self._conn.execute(f"ALTER TABLE users ADD COLUMN {name} {column_type}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get(self, sec_uid):
+        """返回一个用户的同步状态，没有同步过时返回None"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM users WHERE sec_uid = ?", (sec_uid,)).fetchone()
+        return dict(row) if row else None
+
+    def update(self, sec_uid, **fields):
+        """更新一个用户的同步状态，没有记录时新建"""
+        columns = ", ".join(fields)
+        placeholders = ", ".join("?" for _ in fields)
+        updates = ", ".join(f"{name} = excluded.{name}" for name in fields)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO users (sec_uid, {columns}) VALUES (?, {placeholders}) "
+                f"ON CONFLICT(sec_uid) DO UPDATE SET {updates}",
+                (sec_uid, *fields.values())
+            )
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) AS users, SUM(complete) AS complete, SUM(videos) AS videos, "
+                "SUM(last_error IS NOT NULL) AS errors FROM users"
+            ).fetchone()
+        return {key: row[key] or 0 for key in row.keys()}
+
+
+class UserSync:
+    """
+    用户作品增量同步
+
+    第一次同步或到了完整同步的时间时从最新的作品翻到末尾；之后只获取比已同步的最新作品更新的作品，
+    遇到已知的作品就停止翻页，没有新作品的用户只需要请求一页。完整同步达到页数上限时记下翻页位置，
+    之后的同步先获取新作品，再从该位置继续翻历史作品，可以用 max_pages 把第一次同步分到多次完成。
+    增量同步达到页数上限还没有翻到已知作品时，同样推进最新作品并记下翻到的位置 (gap_cursor)，
+    之后的同步在获取新作品后从该位置继续，直到翻到原来的最新作品，新作品很多时也能逐次追上。
+
+    翻页出错或有下载失败时不推进对应的状态，下次同步会重新获取这些作品，已下载的由下载清单跳过。
+    """
+
+    def __init__(self, crawler, store, full_every=DEFAULT_FULL_EVERY, max_pages=None):
+        """
+        Args:
+            crawler (UserCrawler): 用户作品抓取
+            store (SyncStore): 同步状态
+            full_every (float, optional): 完整同步的间隔(天)，0表示不定期完整同步. Defaults to DEFAULT_FULL_EVERY.
+            max_pages (int, optional): 每个用户每次翻页最多请求的页数，None表示不限. Defaults to None.
+        """
+        self.crawler = crawler
+        self.store = store
+        self.full_every = full_every
+        self.max_pages = max_pages
+
+    def mode(self, state, full=False, now=None):
+        """选择同步方式：FULL、INCREMENTAL 或 RESUME（先获取新作品再继续翻历史作品）"""
+        now = time.time() if now is None else now
+        if full or not state or not state["newest_create_time"]:
+            return FULL
+        if not state["complete"]:
+            return RESUME if state["max_cursor"] else FULL
+        if self.full_every and now - (state["last_full_sync"] or 0) >= self.full_every * 86400:
+            return FULL
+        return INCREMENTAL
+
+    def sync(self, sec_uids, full=False):
+        """
+        同步多个用户
+
+        Returns:
+            list: 每个用户的结果，见 sync_user()，顺序与 sec_uids 相同
+        """
+        with ThreadPoolExecutor(max_workers=self.crawler.users, thread_name_prefix="sync-user") as executor:
+            return list(executor.map(lambda sec_uid: self.sync_user(sec_uid, full), sec_uids))
+
+    def sync_user(self, sec_uid, full=False):
+        """
+        同步一个用户
+
+        Returns:
+            dict: {"sec_uid", "mode", "pages", "videos": 新获取的作品数, "results": 下载结果,
+                   "error": 错误或None, "elapsed": 耗时(秒)}
+        """
+        started = time.monotonic()
+        state = self.store.get(sec_uid)
+        mode = self.mode(state, full)
+        newest = state["newest_create_time"] if state else 0
+        # 上次增量同步没有翻完的新作品的位置，完整同步会覆盖这一段
+        gap = state["gap_cursor"] if state and mode != FULL else 0
+        now = time.time()
+        fields = {"last_sync": now}
+
+        if mode == FULL:
+            passes = [self.crawler.crawl_user(sec_uid, max_pages=self.max_pages)]
+        else:
+            passes = [self.crawler.crawl_user(sec_uid, since=newest, max_pages=self.max_pages)]
+        head = passes[0]
+        if self._ok(head) and head["newest"] and head["newest"]["create_time"] > newest:
+            if head["complete"] or mode == FULL:
+                fields.update(newest_aweme_id=head["newest"]["aweme_id"],
+                              newest_create_time=head["newest"]["create_time"])
+            elif not gap:
+                # 达到页数上限还没有翻到已知作品：记下翻到的位置，之后从这里继续翻到原来的最新作品；
+                # 上一段还没有翻完时不推进，否则会有两段没有获取的作品，先把上一段翻完
+                fields.update(newest_aweme_id=head["newest"]["aweme_id"],
+                              newest_create_time=head["newest"]["create_time"],
+                              gap_cursor=head["max_cursor"], gap_since=newest)
+        if mode == FULL and self._ok(head):
+            fields.update(self._history(head, now), gap_cursor=0, gap_since=0)
+
+        if gap and not head["error"]:
+            catch_up = self.crawler.crawl_user(sec_uid, since=state["gap_since"], start_cursor=gap,
+                                               max_pages=self.max_pages)
+            passes.append(catch_up)
+            if self._ok(catch_up) and catch_up["complete"]:
+                fields.update(gap_cursor=0, gap_since=0)
+            elif self._ok(catch_up):
+                fields.update(gap_cursor=catch_up["max_cursor"])
+
+        if mode == RESUME and not head["error"]:
+            history = self.crawler.crawl_user(sec_uid, start_cursor=state["max_cursor"], max_pages=self.max_pages)
+            passes.append(history)
+            if self._ok(history):
+                fields.update(self._history(history, now))
+
+        videos = sum(p["videos"] for p in passes)
+        error = next((p["error"] for p in passes if p["error"]), None)
+        fields.update(videos=(state["videos"] if state else 0) + videos, last_error=error)
+        self.store.update(sec_uid, **fields)
+
+        elapsed = time.monotonic() - started
+        logger.info(f"用户 {sec_uid} 同步完成({mode}): {sum(p['pages'] for p in passes)} 页，{videos} 个新作品")
+        progress_output.notify("user_sync", sec_uid=sec_uid, mode=mode, videos=videos)
+        return {
+            "sec_uid": sec_uid,
+            "mode": mode,
+            "pages": sum(p["pages"] for p in passes),
+            "videos": videos,
+            "results": [r for p in passes for r in p["results"]],
+            "error": error,
+            "elapsed": round(elapsed, 3),
+        }
+
+    @staticmethod
+    def _ok(crawled):
+        return not crawled["error"] and all(r["success"] for r in crawled["results"])
+
+    @staticmethod
+    def _history(crawled, now):
+        """翻历史作品后的状态：翻到末尾时标记完成，否则记下翻页位置"""
+        if crawled["complete"]:
+            return {"complete": 1, "max_cursor": 0, "last_full_sync": now}
+        return {"complete": 0, "max_cursor": crawled["max_cursor"]}
+
+
+def print_summary(summaries, stats):
+    table = Table(title="用户作品同步")
+    for column in ["sec_uid", "方式", "页数", "新作品", "下载成功", "失败", "耗时(s)", "错误"]:
+        table.add_column(column)
+    for s in summaries:
+        success = sum(1 for r in s["results"] if r["success"])
+        table.add_row(s["sec_uid"], s["mode"], str(s["pages"]), str(s["videos"]), str(success),
+                      str(len(s["results"]) - success), f"{s['elapsed']:.1f}", s["error"] or "")
+    console.print(table)
+    console.print(f"共 {sum(s['pages'] for s in summaries)} 页，{sum(s['videos'] for s in summaries)} 个新作品；"
+                  f"已记录 {stats['users']} 个用户，{stats['complete']} 个已完整同步")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="增量同步多个用户的作品，只获取上次同步之后发布的作品")
+    parser.add_argument("sec_uids", nargs="*", help="用户的sec_uid")
+    parser.add_argument("--file", help="从文件读取sec_uid，每行一个")
+    parser.add_argument("--store", default=DEFAULT_STORE, help="同步状态数据库路径")
+    parser.add_argument("--full", action="store_true", help="忽略已同步的位置，完整同步所有作品")
+    parser.add_argument("--full-every", type=float, default=DEFAULT_FULL_EVERY,
+                        help=f"每隔多少天完整同步一次，0表示不定期完整同步，默认{DEFAULT_FULL_EVERY}")
+    parser.add_argument("--max-pages", type=int,
+                        help="每个用户每次翻页最多请求的页数，未翻完的历史作品在之后的同步中继续，默认不限")
+    parser.add_argument("-u", "--users", type=int, default=DEFAULT_USERS, help=f"同时同步的用户数，默认{DEFAULT_USERS}")
+    parser.add_argument("--prefetch", type=int, default=DEFAULT_PREFETCH,
+                        help=f"每个用户最多领先下载的页数，默认{DEFAULT_PREFETCH}")
+    parser.add_argument("--api-concurrency", type=int, default=DEFAULT_API_CONCURRENCY,
+                        help=f"所有用户同时进行的作品列表请求数，默认{DEFAULT_API_CONCURRENCY}")
+    parser.add_argument("--no-download", action="store_true", help="只获取作品列表，不下载")
+    parser.add_argument("-d", "--dir", help="下载目录")
+    parser.add_argument("--quality", default="best", help="清晰度选择策略，默认best")
+    parser.add_argument("--image-format", choices=["webp", "jpeg"], default="webp", help="图集作品的首选图片格式")
+    parser.add_argument("--force", action="store_true", help="忽略下载清单，重新下载")
+    parser.add_argument("-j", "--concurrency", type=int, default=8, help="所有用户共用的下载并发数，默认8")
+    parser.add_argument("--per-host", type=int, default=2, help="每个CDN主机的并发上限，默认2")
+    parser.add_argument("--limit-rate", help="所有下载共享的带宽上限，如 500K、2M，默认不限速")
+    parser.add_argument("--connections", type=int, default=1, help="单个大文件并行下载的连接数，默认1")
+    parser.add_argument("--on-mismatch", choices=["retry", "quarantine", "mark"], default="retry",
+                        help="大小或MD5与接口不符时的处理，默认retry")
+    parser.add_argument("--page-delay", type=float, nargs=2, default=(1, 3), metavar=("MIN", "MAX"),
+                        help="同一个用户翻页之间的随机延迟范围(秒)，默认1 3")
+    parser.add_argument("--cookie", help="抖音cookie")
+    parser.add_argument("--auto-cookie", action="store_true", help="自动获取cookie，优先使用cookie缓存")
+    parser.add_argument("--cookie-pool", metavar="PATH", help="多账号cookie池，见 search_cli.py --cookie-pool")
+    parser.add_argument("--proxy-pool", metavar="FILE", help="代理池文件，见 search_cli.py --proxy-pool")
+    parser.add_argument("--proxy-check-interval", type=int, default=DEFAULT_CHECK_INTERVAL,
+                        help=f"代理健康检查间隔(秒)，默认{DEFAULT_CHECK_INTERVAL}")
+    parser.add_argument("--no-server", action="store_true", help="不使用本地签名服务器")
+    parser.add_argument("--base-url", help="接口地址，默认https://www.douyin.com，可指向本地回放服务 replay_server.py")
+    parser.add_argument("--signer-url", help="本地签名服务地址，默认http://localhost:8889")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST, help="下载清单路径")
+    parser.add_argument("--no-manifest", action="store_true", help="不使用下载清单")
+    parser.add_argument("--headless", action="store_true", help="无界面模式，输出JSON进度行")
+    parser.add_argument("--debug", action="store_true", help="启用调试模式")
+    args = parser.parse_args()
+
+    sec_uids = _read_users(args.sec_uids, args.file)
+    if not sec_uids:
+        parser.error("请指定sec_uid或 --file")
+    progress_output.configure(headless=args.headless)
+    if args.debug:
+        logging.getLogger('douyin_search').setLevel(logging.DEBUG)
+
+    proxy_pool = None
+    if args.proxy_pool:
+        proxy_pool = ProxyPool.from_file(
+            args.proxy_pool,
+            check_url=(args.base_url or "https://www.douyin.com").rstrip("/") + "/",
+            check_interval=args.proxy_check_interval
+        ).start()
+    searcher = DouyinSearcher(
+        cookie=args.cookie,
+        auto_cookie=args.auto_cookie,
+        use_local_server=not args.no_server,
+        manifest_path=None if args.no_manifest else args.manifest,
+        base_url=args.base_url,
+        signer_url=args.signer_url,
+        page_delay=tuple(args.page_delay),
+        cookie_pool=CookiePool.from_path(args.cookie_pool) if args.cookie_pool else None,
+        proxy_pool=proxy_pool
+    )
+    pool = None
+    if not args.no_download:
+        pool = DownloadPool(
+            concurrency=args.concurrency,
+            per_host=args.per_host,
+            bandwidth_limit=args.limit_rate,
+            host_overrides={host_of(searcher.base_url): 1},
+            headers={"User-Agent": searcher.headers["User-Agent"]},
+            connections=args.connections,
+            on_mismatch=args.on_mismatch,
+            proxy_pool=proxy_pool
+        )
+    download_options = {
+        "download_dir": args.dir,
+        "stream_policy": args.quality,
+        "force": args.force,
+        "image_format": args.image_format,
+    }
+
+    try:
+        crawler = UserCrawler(searcher, pool, args.users, args.prefetch, args.api_concurrency, download_options)
+        with SyncStore(args.store) as store, pool if pool is not None else nullcontext(), crawler:
+            summaries = UserSync(crawler, store, args.full_every, args.max_pages).sync(sec_uids, args.full)
+            stats = store.stats()
+    finally:
+        if proxy_pool:
+            proxy_pool.stop()
+
+    failed = sum(1 for s in summaries for r in s["results"] if not r["success"])
+    errors = sum(1 for s in summaries if s["error"])
+    if args.headless:
+        progress_output.emit("sync", users=len(summaries), pages=sum(s["pages"] for s in summaries),
+                             videos=sum(s["videos"] for s in summaries), failed=failed, errors=errors)
+    else:
+        print_summary(summaries, stats)
+    return 0 if not failed and not errors else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,545 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@Description: 关键词和用户的定时轮询，代替每个目标启动一次进程的外部cron
+              每个目标有自己的轮询间隔，按目标错开起始时间并加随机抖动，上次发现新作品的目标优先并缩短间隔，
+              用户走增量同步 (user_sync.py)，关键词只下载不在下载清单中的作品，调度状态保存在SQLite中
+@Date       : 2026/10/19
+@Author     : Claude
+@License    : MIT License
+-------------------------------------------------
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import random
+import signal
+import sqlite3
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import progress_output
+from rich.table import Table
+from progress_output import console
+from cdn_hosts import host_of
+from download_pool import DownloadPool
+from manifest import DEFAULT_MANIFEST
+from search_douyin import DouyinSearcher
+from cookie_pool import CookiePool
+from proxy_pool import ProxyPool, DEFAULT_CHECK_INTERVAL
+from user_crawler import UserCrawler, DEFAULT_PREFETCH, DEFAULT_API_CONCURRENCY
+from user_sync import SyncStore, UserSync, DEFAULT_STORE, DEFAULT_FULL_EVERY
+
+logger = logging.getLogger('douyin_search.watch')
+
+# 默认保存在脚本目录下
+DEFAULT_STATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "watch.db")
+
+TARGET_KINDS = ("user", "keyword")
+
+# 默认轮询间隔(秒)
+DEFAULT_INTERVAL = 3600
+
+# 默认抖动比例，实际间隔在 interval*(1±jitter) 之间
+DEFAULT_JITTER = 0.1
+
+# 上次轮询发现新作品时，下次间隔乘以该系数
+DEFAULT_HOT_FACTOR = 0.5
+
+# 默认同时进行的轮询数
+DEFAULT_WORKERS = 4
+
+# 关键词每次搜索的默认作品数
+DEFAULT_KEYWORD_COUNT = 20
+
+# 启动时已过期的目标分散到这段时间(秒)内执行，避免重启后同时轮询所有目标
+CATCHUP_WINDOW = 300
+
+# 调度循环最长的等待时间(秒)，新加入的目标最迟在这段时间后被发现
+MAX_WAIT = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS targets (
+    kind       TEXT NOT NULL,
+    key        TEXT NOT NULL,
+    interval   REAL NOT NULL,
+    count      INTEGER,
+    next_run   REAL NOT NULL,
+    last_run   REAL,
+    last_new   INTEGER NOT NULL DEFAULT 0,
+    polls      INTEGER NOT NULL DEFAULT 0,
+    found      INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    added_at   REAL NOT NULL,
+    PRIMARY KEY (kind, key)
+);
+CREATE INDEX IF NOT EXISTS idx_targets_next_run ON targets(next_run);
+"""
+
+
+def parse_interval(value):
+    """解析轮询间隔，如 900、15m、2h、1d，返回秒数"""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*", str(value).lower())
+    if not match:
+        raise ValueError(f"无效的间隔: {value}")
+    return float(match.group(1)) * {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}[match.group(2)]
+
+
+def format_interval(seconds):
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size and seconds % size == 0:
+            return f"{int(seconds // size)}{unit}"
+    return f"{seconds:.0f}s"
+
+
+def phase(kind, key):
+    """目标在轮询周期内的固定相位 [0, 1)，同一目标总是相同，不同目标均匀分布"""
+    return zlib.crc32(f"{kind}:{key}".encode("utf-8")) / 2 ** 32
+
+
+class WatchStore:
+    """
+    轮询目标和调度状态
+
+    每个目标一行：轮询间隔、下次轮询时间、上次轮询发现的新作品数、累计轮询次数和新作品数。
+    进程重启后从这里继续调度。可以在多个线程之间共享。
+    """
+
+    def __init__(self, path=DEFAULT_STATE):
+        """
+        Args:
+            path (str, optional): 数据库文件路径. Defaults to DEFAULT_STATE.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def add(self, kind, keys, interval=DEFAULT_INTERVAL, count=None):
+        """
+        添加目标，已存在的目标更新间隔和作品数
+
+        新目标的第一次轮询按相位排在 interval 内的固定位置，大量目标同时加入时也均匀分布在一个周期内
+
+        Returns:
+            int: 新增的目标数
+        """
+        now = time.time()
+        rows = [(kind, key, interval, count, now + phase(kind, key) * interval, now) for key in keys]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO targets (kind, key, interval, count, next_run, added_at) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            added = self._conn.total_changes - before
+            # 已有目标缩短间隔时，下次轮询不晚于新的间隔；间隔不变或变长时保持原来的时间（SET中的interval为原值）
+            self._conn.executemany(
+                "UPDATE targets SET interval = ?, count = ?, "
+                "next_run = CASE WHEN ? < interval THEN MIN(next_run, ?) ELSE next_run END WHERE kind = ? AND key = ?",
+                [(interval, count, interval, next_run, kind, key) for kind, key, interval, count, next_run, _ in rows]
+            )
+            self._conn.commit()
+        return added
+
+    def remove(self, kind, keys):
+        with self._lock:
+            removed = self._conn.executemany(
+                "DELETE FROM targets WHERE kind = ? AND key = ?", [(kind, key) for key in keys]
+            ).rowcount
+            self._conn.commit()
+        return removed
+
+    def targets(self, limit=None):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM targets ORDER BY next_run LIMIT ?", (-1 if limit is None else limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def due(self, now, limit, exclude=()):
+        """
+        已到轮询时间的目标，上次发现新作品的排在前面，其余按到期时间先后
+
+        Args:
+            now (float): 当前时间
+            limit (int): 最多返回的数量
+            exclude (iterable, optional): 正在轮询的 (kind, key)，不返回. Defaults to ().
+        """
+        exclude = set(exclude)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM targets WHERE next_run <= ? ORDER BY last_new > 0 DESC, next_run LIMIT ?",
+                (now, limit + len(exclude))
+            ).fetchall()
+        return [dict(row) for row in rows if (row["kind"], row["key"]) not in exclude][:limit]
+
+    def next_run(self, exclude=()):
+        """最早的下次轮询时间，没有目标时返回None"""
+        exclude = set(exclude)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT kind, key, next_run FROM targets ORDER BY next_run LIMIT ?", (len(exclude) + 1,)
+            ).fetchall()
+        return next((row["next_run"] for row in rows if (row["kind"], row["key"]) not in exclude), None)
+
+    def spread_overdue(self, now, window=CATCHUP_WINDOW):
+        """
+        把已过期的目标按相位分散到 window 秒内，进程停止较长时间后重启时不会同时轮询所有目标
+
+        Returns:
+            int: 重新安排的目标数
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT kind, key, interval FROM targets WHERE next_run < ?", (now,)).fetchall()
+            self._conn.executemany(
+                "UPDATE targets SET next_run = ? WHERE kind = ? AND key = ?",
+                [(now + phase(row["kind"], row["key"]) * min(row["interval"], window), row["kind"], row["key"])
+                 for row in rows]
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def finish(self, kind, key, ran_at, next_run, new, error=None):
+        """记录一次轮询的结果和下次轮询时间"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE targets SET last_run = ?, next_run = ?, last_new = ?, polls = polls + 1, "
+                "found = found + ?, last_error = ? WHERE kind = ? AND key = ?",
+                (ran_at, next_run, new, new, error, kind, key)
+            )
+            self._conn.commit()
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) AS targets, SUM(next_run <= ?) AS due, SUM(last_new > 0) AS hot, "
+                "SUM(last_error IS NOT NULL) AS errors, SUM(polls) AS polls, SUM(found) AS found, "
+                "SUM(3600.0 / interval) AS polls_per_hour FROM targets",
+                (now,)
+            ).fetchone()
+        return {key: row[key] or 0 for key in row.keys()}
+
+
+class Pollers:
+    """
+    各类型目标的轮询函数，返回 {"videos": 获取的作品数, "new": 新作品数, "error": 错误或None}
+
+    用户通过 UserSync 增量同步，只翻到已知的作品为止；关键词搜索后只下载不在下载清单中的作品；新作品数只计本次下载成功的作品
+    """
+
+    def __init__(self, searcher, pool, sync, download_options):
+        self.searcher = searcher
+        self.pool = pool
+        self.sync = sync
+        self.download_options = dict(download_options, save_to_file=False)
+
+    def __call__(self, target):
+        return getattr(self, target["kind"])(target)
+
+    def user(self, target):
+        result = self.sync.sync_user(target["key"])
+        failed = sum(1 for r in result["results"] if not r["success"])
+        # 下载失败时 UserSync 不推进同步位置，同样的作品每次都会重新获取，只计本次下载成功的作品
+        return {
+            "videos": result["videos"],
+            "new": sum(1 for r in result["results"] if r["success"] and not r.get("skipped")),
+            "error": result["error"] or (f"{failed} 个作品下载失败" if failed else None),
+        }
+
+    def keyword(self, target):
+        videos = self.searcher.search(target["key"], target["count"] or DEFAULT_KEYWORD_COUNT)
+        ids = [video["aweme_id"] for video in videos]
+        if self.searcher.manifest is not None and not self.download_options.get("force"):
+            fresh = set(self.searcher.manifest.missing(ids))
+        else:
+            fresh = set(ids)
+        pending = [video for video in videos if video["aweme_id"] in fresh]
+        results = self.searcher.download_videos(pending, pool=self.pool, **self.download_options) if pending else []
+        failed = sum(1 for r in results if not r["success"])
+        # 只计本次下载成功的作品，一直下载失败的作品每次都不在清单中，不能让目标一直保持高频
+        new = sum(1 for r in results if r["success"] and not r.get("skipped"))
+        return {"videos": len(videos), "new": new, "error": f"{failed} 个作品下载失败" if failed else None}
+
+
+class Watcher:
+    """
+    轮询调度
+
+    调度线程从状态库中取出已到期的目标交给 workers 个轮询线程，同一目标不会同时轮询。
+    轮询结束后下次时间为 interval*(1±jitter)，发现了新作品时再乘以 hot_factor；
+    到期的目标多于空闲线程时，上次发现新作品的目标先执行。
+    """
+
+    def __init__(self, store, pollers, workers=DEFAULT_WORKERS, jitter=DEFAULT_JITTER, hot_factor=DEFAULT_HOT_FACTOR):
+        """
+        Args:
+            store (WatchStore): 轮询目标和调度状态
+            pollers (callable): 接收目标(dict)，返回 {"videos", "new", "error"}
+            workers (int, optional): 同时进行的轮询数. Defaults to DEFAULT_WORKERS.
+            jitter (float, optional): 间隔的随机抖动比例. Defaults to DEFAULT_JITTER.
+            hot_factor (float, optional): 发现新作品后下次间隔的系数. Defaults to DEFAULT_HOT_FACTOR.
+        """
+        self.store = store
+        self.pollers = pollers
+        self.workers = max(1, workers)
+        self.jitter = min(max(jitter, 0), 0.9)
+        self.hot_factor = hot_factor
+        self._wake = threading.Event()
+
+    def next_delay(self, interval, new):
+        """下次轮询前等待的秒数"""
+        if new:
+            interval *= self.hot_factor
+        return interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def run(self, stop, once=False):
+        """
+        持续调度直到 stop 被设置，返回时进行中的轮询已结束
+
+        Args:
+            stop (threading.Event): 停止信号
+            once (bool, optional): 只轮询当前已到期的目标，全部结束后返回. Defaults to False.
+        """
+        if not once:
+            spread = self.store.spread_overdue(time.time())
+            if spread:
+                logger.info(f"{spread} 个已过期的目标分散到 {CATCHUP_WINDOW}s 内轮询")
+        started = time.time()
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="watch") as executor:
+            while not stop.is_set():
+                self._wake.clear()
+                running = {name: future for name, future in running.items() if not future.done()}
+                free = self.workers - len(running)
+                # once 模式只处理启动时已到期的目标，轮询后重新安排的不再执行
+                now = started if once else time.time()
+                due = self.store.due(now, free, running) if free > 0 else []
+                for target in due:
+                    name = (target["kind"], target["key"])
+                    running[name] = executor.submit(self.poll, target)
+                    running[name].add_done_callback(lambda _: self._wake.set())
+                if once and not running:
+                    break
+                next_run = self.store.next_run(running)
+                timeout = MAX_WAIT if next_run is None else min(MAX_WAIT, max(0, next_run - time.time()))
+                if free <= len(due):
+                    # 没有空闲线程时只需要等轮询结束
+                    timeout = MAX_WAIT
+                self._wake.wait(timeout)
+            if running:
+                logger.info(f"等待 {len(running)} 个进行中的轮询结束")
+
+    def poll(self, target):
+        """轮询一个目标并安排下次轮询"""
+        started = time.time()
+        try:
+            result = self.pollers(target)
+        except Exception as e:
+            logger.error(f"{target['kind']} {target['key']} 轮询失败: {e}")
+            result = {"videos": 0, "new": 0, "error": str(e)}
+        delay = self.next_delay(target["interval"], result["new"])
+        self.store.finish(target["kind"], target["key"], started, time.time() + delay, result["new"], result["error"])
+        elapsed = time.time() - started
+        logger.info(f"{target['kind']} {target['key']}: {result['videos']} 个作品，{result['new']} 个新作品，"
+                    f"{elapsed:.1f}s，{delay:.0f}s 后再次轮询")
+        progress_output.emit("watch", kind=target["kind"], key=target["key"], videos=result["videos"],
+                             new=result["new"], error=result["error"], elapsed=round(elapsed, 3),
+                             next_in=round(delay, 1))
+        return result
+
+
+def print_targets(targets, stats):
+    now = time.time()
+    table = Table(title="轮询目标", caption=f"共 {stats['targets']} 个，已到期 {stats['due']}，上次有新作品 {stats['hot']}，"
+                                          f"约 {stats['polls_per_hour']:.0f} 次/小时")
+    for column in ["类型", "目标", "间隔", "下次", "上次新作品", "轮询次数", "累计新作品", "错误"]:
+        table.add_column(column)
+    for t in targets:
+        wait = t["next_run"] - now
+        table.add_row(t["kind"], t["key"], format_interval(t["interval"]),
+                      f"{wait:.0f}s后" if wait > 0 else "已到期", str(t["last_new"]), str(t["polls"]),
+                      str(t["found"]), t["last_error"] or "")
+    console.print(table)
+
+
+def _read_keys(values, path):
+    keys = list(values or [])
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            keys.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    return keys
+
+
+def _build(args):
+    """创建轮询用的搜索器、下载池和用户增量同步"""
+    proxy_pool = None
+    if args.proxy_pool:
+        proxy_pool = ProxyPool.from_file(
+            args.proxy_pool,
+            check_url=(args.base_url or "https://www.douyin.com").rstrip("/") + "/",
+            check_interval=args.proxy_check_interval
+        ).start()
+    searcher = DouyinSearcher(
+        cookie=args.cookie,
+        auto_cookie=args.auto_cookie,
+        use_local_server=not args.no_server,
+        manifest_path=None if args.no_manifest else args.manifest,
+        base_url=args.base_url,
+        signer_url=args.signer_url,
+        page_delay=tuple(args.page_delay),
+        cookie_pool=CookiePool.from_path(args.cookie_pool) if args.cookie_pool else None,
+        proxy_pool=proxy_pool
+    )
+    pool = DownloadPool(
+        concurrency=args.concurrency,
+        per_host=args.per_host,
+        bandwidth_limit=args.limit_rate,
+        host_overrides={host_of(searcher.base_url): 1},
+        headers={"User-Agent": searcher.headers["User-Agent"]},
+        show_progress=False,
+        connections=args.connections,
+        on_mismatch=args.on_mismatch,
+        proxy_pool=proxy_pool
+    )
+    download_options = {
+        "download_dir": args.dir,
+        "stream_policy": args.quality,
+        "force": args.force,
+        "image_format": args.image_format,
+    }
+    crawler = UserCrawler(searcher, pool, args.workers, args.prefetch, args.api_concurrency, download_options)
+    sync_store = SyncStore(args.sync_store)
+    sync = UserSync(crawler, sync_store, args.full_every, args.max_pages)
+    return Pollers(searcher, pool, sync, download_options), pool, crawler, sync_store, proxy_pool
+
+
+def run(args):
+    # 长期运行没有交互界面，进度和轮询结果为JSON行；非 --headless 时只输出日志
+    progress_output.configure(headless=True, stream=None if args.headless else open(os.devnull, "w"))
+    if args.debug:
+        logging.getLogger('douyin_search').setLevel(logging.DEBUG)
+
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+    pollers, pool, crawler, sync_store, proxy_pool = _build(args)
+    try:
+        with WatchStore(args.state) as store, pool, crawler, sync_store:
+            stats = store.stats()
+            if not stats["targets"]:
+                logger.warning("没有轮询目标，先用 watch.py add 添加")
+            logger.info(f"开始轮询 {stats['targets']} 个目标，约 {stats['polls_per_hour']:.0f} 次/小时，{args.workers} 个轮询线程")
+            Watcher(store, pollers, args.workers, args.jitter, args.hot_factor).run(stop, args.once)
+    finally:
+        if proxy_pool:
+            proxy_pool.stop()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="定时轮询关键词和用户，下载新作品")
+    parser.add_argument("--state", default=DEFAULT_STATE, help="轮询目标和调度状态的数据库路径")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="添加或修改轮询目标")
+    add.add_argument("kind", choices=TARGET_KINDS, help="user(sec_uid)或keyword(关键词)")
+    add.add_argument("keys", nargs="*", help="sec_uid或关键词")
+    add.add_argument("--file", help="从文件读取，每行一个")
+    add.add_argument("-i", "--interval", type=parse_interval, default=DEFAULT_INTERVAL,
+                     help="轮询间隔，如 900、15m、2h、1d，默认1h")
+    add.add_argument("-c", "--count", type=int, help=f"keyword每次搜索的作品数，默认{DEFAULT_KEYWORD_COUNT}")
+
+    remove = commands.add_parser("remove", help="删除轮询目标")
+    remove.add_argument("kind", choices=TARGET_KINDS)
+    remove.add_argument("keys", nargs="*")
+    remove.add_argument("--file", help="从文件读取，每行一个")
+
+    listing = commands.add_parser("list", help="列出轮询目标，按下次轮询时间排序")
+    listing.add_argument("--limit", type=int, default=50, help="最多列出的数量，默认50")
+    listing.add_argument("--json", action="store_true", help="输出JSON，便于监控采集")
+
+    runner = commands.add_parser("run", help="持续轮询")
+    runner.add_argument("-w", "--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"同时进行的轮询数，默认{DEFAULT_WORKERS}")
+    runner.add_argument("--jitter", type=float, default=DEFAULT_JITTER,
+                        help=f"间隔的随机抖动比例，默认{DEFAULT_JITTER}")
+    runner.add_argument("--hot-factor", type=float, default=DEFAULT_HOT_FACTOR,
+                        help=f"发现新作品后下次间隔的系数，默认{DEFAULT_HOT_FACTOR}")
+    runner.add_argument("--once", action="store_true", help="只轮询当前已到期的目标，结束后退出")
+    runner.add_argument("--sync-store", default=DEFAULT_STORE, help="用户增量同步状态的数据库路径")
+    runner.add_argument("--full-every", type=float, default=DEFAULT_FULL_EVERY,
+                        help=f"用户每隔多少天完整同步一次，默认{DEFAULT_FULL_EVERY}")
+    runner.add_argument("--max-pages", type=int, help="用户每次轮询最多请求的页数，默认不限")
+    runner.add_argument("--prefetch", type=int, default=DEFAULT_PREFETCH,
+                        help=f"每个用户最多领先下载的页数，默认{DEFAULT_PREFETCH}")
+    runner.add_argument("--api-concurrency", type=int, default=DEFAULT_API_CONCURRENCY,
+                        help=f"同时进行的作品列表请求数，默认{DEFAULT_API_CONCURRENCY}")
+    runner.add_argument("-d", "--dir", help="下载目录")
+    runner.add_argument("--quality", default="best", help="清晰度选择策略，默认best")
+    runner.add_argument("--image-format", choices=["webp", "jpeg"], default="webp", help="图集作品的首选图片格式")
+    runner.add_argument("--force", action="store_true", help="忽略下载清单，重新下载")
+    runner.add_argument("-j", "--concurrency", type=int, default=8, help="所有目标共用的下载并发数，默认8")
+    runner.add_argument("--per-host", type=int, default=2, help="每个CDN主机的并发上限，默认2")
+    runner.add_argument("--limit-rate", help="所有下载共享的带宽上限，如 500K、2M，默认不限速")
+    runner.add_argument("--connections", type=int, default=1, help="单个大文件并行下载的连接数，默认1")
+    runner.add_argument("--on-mismatch", choices=["retry", "quarantine", "mark"], default="retry",
+                        help="大小或MD5与接口不符时的处理，默认retry")
+    runner.add_argument("--page-delay", type=float, nargs=2, default=(1, 3), metavar=("MIN", "MAX"),
+                        help="同一个用户翻页之间的随机延迟范围(秒)，默认1 3")
+    runner.add_argument("--cookie", help="抖音cookie")
+    runner.add_argument("--auto-cookie", action="store_true", help="自动获取cookie，优先使用cookie缓存")
+    runner.add_argument("--cookie-pool", metavar="PATH", help="多账号cookie池，见 search_cli.py --cookie-pool")
+    runner.add_argument("--proxy-pool", metavar="FILE", help="代理池文件，见 search_cli.py --proxy-pool")
+    runner.add_argument("--proxy-check-interval", type=int, default=DEFAULT_CHECK_INTERVAL,
+                        help=f"代理健康检查间隔(秒)，默认{DEFAULT_CHECK_INTERVAL}")
+    runner.add_argument("--no-server", action="store_true", help="不使用本地签名服务器")
+    runner.add_argument("--base-url", help="接口地址，默认https://www.douyin.com，可指向本地回放服务 replay_server.py")
+    runner.add_argument("--signer-url", help="本地签名服务地址，默认http://localhost:8889")
+    runner.add_argument("--manifest", default=DEFAULT_MANIFEST, help="下载清单路径")
+    runner.add_argument("--no-manifest", action="store_true", help="不使用下载清单，关键词的每个搜索结果都算作新作品")
+    runner.add_argument("--headless", action="store_true", help="输出JSON进度行和每次轮询的结果")
+    runner.add_argument("--debug", action="store_true", help="启用调试模式")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        return run(args)
+
+    with WatchStore(args.state) as store:
+        if args.command == "add":
+            keys = _read_keys(args.keys, args.file)
+            added = store.add(args.kind, keys, args.interval, args.count)
+            console.print(f"[bold green]新增 {added} 个目标，更新 {len(keys) - added} 个[/bold green]")
+        elif args.command == "remove":
+            console.print(f"[bold green]已删除 {store.remove(args.kind, _read_keys(args.keys, args.file))} 个目标[/bold green]")
+        elif args.command == "list":
+            if args.json:
+                print(json.dumps({"stats": store.stats(), "targets": store.targets(args.limit)}, ensure_ascii=False))
+            else:
+                print_targets(store.targets(args.limit), store.stats())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())